@@ -11,17 +11,34 @@ import telegram
 from telegram.ext import Application, CommandHandler, MessageHandler, filters
 import json
 import aiohttp
+from aiohttp import web
 from dotenv import load_dotenv
 import os
 import time
 import builtins
-from collections import deque
-from pymongo import MongoClient
+from collections import deque, OrderedDict
+from pymongo import MongoClient, monitoring
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, DuplicateKeyError
 from decimal import Decimal, ROUND_DOWN, getcontext
 from binance.client import Client
 import re
 import functools
+import hashlib
+from urllib.parse import urlsplit, parse_qs
+import bisect
+import io
+import threading
+import traceback
+import tracemalloc
+import gc
+from email.utils import parsedate_to_datetime
+import math
+import contextlib
+import contextvars
+import random
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
 
 load_dotenv()
 
@@ -33,12 +50,98 @@ CONFIG = {
     "MAIN_LOOP_SLEEP_SECONDS": 300,
     "MONITOR_LOOP_SLEEP_SECONDS": 3,
     "API_RETRY_ATTEMPTS": 3,
-    "API_RETRY_DELAYS": [1, 3, 5],  # saniye
+    "API_BACKOFF_BASE_SECONDS": 1,  # Tam jitter'lı üstel bekleme: random(0, min(üst sınır, taban * 2^deneme))
+    "API_BACKOFF_MAX_SECONDS": 10,
+    "API_RETRY_AFTER_MAX_SECONDS": 60,  # Retry-After bundan uzunsa beklenmez, istek başarısız sayılır
+    "SCAN_DEADLINE_SECONDS": 240,  # Bir sinyal taramasının (sembol listesi → gönderim) toplam süre bütçesi
+    "SYMBOL_DEADLINE_SECONDS": 20,  # Tek sembolün hat içindeki (veri çekme → doğrulama) süre bütçesi
+    "CIRCUIT_BREAKER_ENABLED": True,  # Binance uç noktası başına devre kesici
+    "CIRCUIT_BREAKER_WINDOW_SECONDS": 60,  # Hata oranının hesaplandığı kayan pencere
+    "CIRCUIT_BREAKER_MIN_REQUESTS": 10,  # Pencerede bu kadar istek olmadan devre açılmaz
+    "CIRCUIT_BREAKER_ERROR_RATE": 0.5,  # Penceredeki hata oranı bunu aşarsa devre açılır
+    "CIRCUIT_BREAKER_OPEN_SECONDS": 30,  # Devre açıldıktan sonra ilk prob isteğine kadar bekleme
+    "CIRCUIT_BREAKER_MAX_OPEN_SECONDS": 300,  # Başarısız prob sonrası bekleme ikiye katlanır, en fazla bu kadar
+    "CIRCUIT_BREAKER_PROBE_TIMEOUT": 5,  # Prob isteği zaman aşımı (saniye)
+    "HEDGED_REQUESTS_ENABLED": False,  # Gecikmeye duyarlı isteklerde yedek host'a ikinci istek (hedge)
+    "FAPI_HOSTS": ["https://fapi.binance.com", "https://fapi1.binance.com", "https://fapi2.binance.com"],
+    "HEDGE_DELAY_PERCENTILE": 0.95,  # Birincil host bu yüzdelik gecikmeyi aşınca yedek istek gönderilir
+    "HEDGE_DEFAULT_DELAY_SECONDS": 0.3,  # Yeterli ölçüm yokken kullanılan hedge gecikmesi
+    "HEDGE_MIN_DELAY_SECONDS": 0.05,
+    "HEDGE_MIN_SAMPLES": 20,  # Yüzdelik hesabı için gereken en az ölçüm
+    "HEDGE_LATENCY_SAMPLES": 200,  # Host başına tutulan son gecikme ölçümü
+    "HEDGE_FAILURE_PENALTY_SECONDS": 5,  # Başarısız isteğin gecikme ölçümüne eklenen ceza
     "MONITOR_SLEEP_EMPTY": 5,
     "MONITOR_SLEEP_ERROR": 10,
     "MONITOR_SLEEP_NORMAL": 3,
+    "TELEGRAM_GLOBAL_RATE_PER_SECOND": 30,  # Telegram'ın bot başına genel sınırı (~30 mesaj/sn)
+    "TELEGRAM_PRIVATE_CHAT_INTERVAL": 1.0,  # Aynı özel sohbete en fazla saniyede 1 mesaj
+    "TELEGRAM_GROUP_CHAT_INTERVAL": 3.0,  # Aynı gruba en fazla dakikada 20 mesaj
+    "TELEGRAM_BROADCAST_CONCURRENCY": 25,  # Toplu gönderimde aynı anda açık istek sayısı
+    "TELEGRAM_MAX_ATTEMPTS": 3,  # Sohbet başına deneme (429 retry_after beklemeleri dahil)
+    "TELEGRAM_LANE_WEIGHTS": {"entry": 3, "info": 1},  # Çıkış (exit) kuyruğu her zaman önce; kalan hız bu ağırlıklarla paylaşılır
+    "OUTBOX_POLL_SECONDS": 5,  # Bildirim kuyruğu (outbox) yoklama aralığı - yeni kayıt gelince hemen uyanır
+    "OUTBOX_MAX_ATTEMPTS": 8,  # Bu kadar denemeden sonra bildirim 'failed' olarak bırakılır
+    "OUTBOX_RETRY_BASE_SECONDS": 5,  # Başarısız gönderimlerin jitter'lı üstel bekleme tabanı
+    "OUTBOX_RETRY_MAX_SECONDS": 300,
+    "OUTBOX_RETENTION_HOURS": 24,  # Teslim edilen kayıtlar (idempotency anahtarları) bu süre saklanır
+    "DASHBOARD_EDIT_INTERVAL_SECONDS": 15,  # Sabitlenmiş panel mesajı sohbet başına en fazla bu aralıkla düzenlenir
+    "DASHBOARD_TICK_SECONDS": 2,  # Panel metninin fiyat akışından yeniden oluşturulma aralığı
+    "STATUS_API_ENABLED": os.getenv("STATUS_API_ENABLED", "false").lower() == "true",  # Salt okunur HTTP/JSON durum API'si
+    "STATUS_API_HOST": os.getenv("STATUS_API_HOST", "127.0.0.1"),
+    "STATUS_API_PORT": int(os.getenv("STATUS_API_PORT", "8080")),
+    "STATUS_API_GZIP": True,  # İstemci Accept-Encoding: gzip gönderirse yanıtı sıkıştır
+    "STATUS_API_STALE_SECONDS": 900,  # Döngüler bu süredir anlık görüntü yayınlamadıysa /health 503 döner
+    "METRICS_ENABLED": os.getenv("METRICS_ENABLED", "false").lower() == "true",  # /metrics (Prometheus); kapalıyken ölçümler no-op
+    "LOOP_LAG_MONITOR_ENABLED": True,  # Event loop gecikme ölçümü ve bloklayan kodun yığınını yakalama
+    "LOOP_LAG_INTERVAL_SECONDS": 0.25,  # Gecikme ölçüm aralığı
+    "LOOP_LAG_WINDOW_SAMPLES": 2400,  # Yüzdelikler için tutulan son ölçüm sayısı (~10 dk)
+    "LOOP_STALL_THRESHOLD_SECONDS": 0.5,  # Bu süreden uzun bloklamalar yığınıyla kaydedilir
+    "LOOP_STALL_SAMPLE_SECONDS": 0.1,  # Örnekleyici thread'in loop'u yoklama aralığı
+    "LOOP_STALL_HISTORY": 50,  # Saklanan son bloklama kaydı sayısı
+    "PROFILER_DEFAULT_SECONDS": 30,  # /profile süresi (argüman verilmezse)
+    "PROFILER_MAX_SECONDS": 300,
+    "PROFILER_INTERVAL_SECONDS": 0.01,  # Thread yığınlarını örnekleme aralığı (~100 Hz)
+    "PROFILER_TASK_INTERVAL_SECONDS": 0.1,  # asyncio task'larının bekleme yığınlarını örnekleme aralığı
+    "PROFILER_TOP_N": 15,  # Özetteki en sıcak fonksiyon sayısı
+    "MEMORY_PRUNE_INTERVAL_SECONDS": 300,  # Uzun ömürlü sözlüklerin budanma aralığı
+    "MEMORY_SYMBOL_STATE_TTL_HOURS": 24,  # Evrenden bu süredir çıkmış (pozisyonsuz) sembollerin önceki sinyalleri silinir
+    "MEMORY_TRACEMALLOC_ENABLED": os.getenv("MEMORY_TRACEMALLOC_ENABLED", "false").lower() == "true",  # Açılışta tracemalloc (/memory trace on ile de açılır)
+    "MEMORY_TRACEMALLOC_FRAMES": 1,  # Ayırma başına saklanan yığın derinliği (1 = en ucuz)
+    "MEMORY_REPORT_TOP_N": 10,  # /memory raporundaki en büyük ayırıcı / büyüme satırı sayısı
+    "MONITOR_MIN_INTERVAL_SECONDS": 0.5,  # TP/SL'ye çok yakın pozisyonların kontrol aralığı
+    "MONITOR_MAX_INTERVAL_SECONDS": 60,  # Seviyelerden uzak pozisyonların en seyrek kontrol aralığı
+    "MONITOR_INTERVAL_SAFETY": 0.1,  # Aralık = güvenlik × (mesafe / 1m ATR)^2 dakika (0.3 ATR → ~0.5s, 3 ATR → ~54s)
     "MAX_SIGNALS_PER_RUN": 5,  # Bir döngüde maksimum bulunacak sinyal sayısı
     "COOLDOWN_MINUTES": 30,  # Çok fazla sinyal bulunduğunda bekleme süresi
+    "MAX_KLINE_LOOKBACK": 1000,  # Sinyal hesaplamasında istenebilecek en fazla mum sayısı
+    "WARMUP_TOLERANCE": 1e-3,  # EMA/RSI başlangıç etkisinin kabul edilen üst sınırı
+    "WARMUP_SIGNAL_MARGIN": 60,  # Isınma sonrası sinyal olayı aramak için ek mum sayısı
+    "SIGNAL_MEMO_MAX_SYMBOLS": 150,  # Sinyal önbelleğinin tutacağı sembol sayısı (evren boyutu + pay)
+    "WS_CANDLE_STORE_ENABLED": True,  # Tarama mumlarını WebSocket kline akışlarından bellekte tut
+    "WS_KLINE_BASE_URL": "wss://fstream.binance.com/stream",  # Binance Futures birleşik akış adresi
+    "WS_MAX_STREAMS_PER_CONNECTION": 200,  # Bağlantı başına en fazla akış sayısı
+    "WS_SUBSCRIBE_BATCH_SIZE": 50,  # Tek SUBSCRIBE mesajındaki akış sayısı
+    "WS_SUBSCRIBE_INTERVAL_SECONDS": 0.25,  # SUBSCRIBE mesajları arası bekleme (mesaj limiti için)
+    "WS_STALE_SECONDS": 30,  # Bu süre mesaj gelmezse bağlantı bayat sayılır ve yeniden kurulur
+    "WS_RECONNECT_DELAYS": [1, 2, 5, 10, 30],  # Yeniden bağlanma beklemeleri (saniye)
+    "WS_BACKFILL_CONCURRENCY": 5,  # Aynı anda çalışan REST doldurma isteği sayısı
+    "WS_BACKFILL_WEIGHT_PER_MINUTE": 1200,  # Doldurmaların dakikada harcayabileceği Binance ağırlığı (limit 2400; kalanı taramaya)
+    "BATCH_SIGNAL_MODE": True,  # Tüm evrenin indikatörlerini zaman dilimi başına tek seferde hesapla
+    "BATCH_FETCH_CONCURRENCY": 10,  # Toplu mum çekiminde eşzamanlı istek sayısı
+    # Toplu indikatör hesaplaması için işçi süreç sayısı (0 = ana süreçte hesapla).
+    # Sınırlama: ana süreçte pymongo, loop-stall örnekleyici ve /profile thread'leri çalıştığı için
+    # işçiler fork ile değil forkserver ile (yoksa spawn) başlatılır. forkserver süreci modülü bir kez
+    # içe aktarır (Binance istemcisi dahil); ilk havuz kullanımı bu yüzden birkaç saniye sürebilir.
+    "INDICATOR_WORKER_PROCESSES": 0,
+    "INDICATOR_WORKER_MIN_SYMBOLS": 20,  # Bu sayının altındaki yığınlar işçilere dağıtılmaz
+    "SCAN_BATCH_SIZE": 10,  # Her batch'ten en hacimli tek sinyal gönderilir
+    "PIPELINE_QUEUE_SIZE": 20,  # Tarama hattındaki aşamalar arası kuyruk kapasitesi
+    "PIPELINE_FETCH_WORKERS": 8,  # Veri çekme aşaması eşzamanlılığı
+    "PIPELINE_COMPUTE_WORKERS": 2,  # İndikatör hesaplama aşaması eşzamanlılığı
+    "PIPELINE_RULE_WORKERS": 4,  # Kural + 15m mum + fiyat/hacim doğrulama aşaması eşzamanlılığı
+    "SCHEDULER_CLOSE_DELAY_SECONDS": 3,  # Mum kapanışından sonra Binance'in mumu kesinleştirmesi için bekleme
+    "SCHEDULER_JITTER_SECONDS": 2,  # Uyanma anına eklenecek rastgele gecikme üst sınırı
+    "SCHEDULER_REUSE_UNROLLED_TIMEFRAMES": False,  # True ise mumu kapanmayan zaman dilimlerinin sinyalleri önceki taramadan alınır
 
 }
 
@@ -201,65 +304,491 @@ def validate_user_id(user_id_str):
         return False, "❌ Geçersiz user_id. Lütfen sayısal bir değer girin."
 
 async def send_command_response(update, message, parse_mode='Markdown'):
-    """Komut yanıtını gönderir"""
+    """Komut yanıtını gönderir (bilgi kuyruğundan - TP/SL ve sinyal mesajlarının arkasında)"""
+    await acquire_telegram_slot(update.effective_chat.id, "info")
     await update.message.reply_text(message, parse_mode=parse_mode)
 
+# ---------------------------------------------------------------------------
+# Metrikler (Prometheus metin formatı, durum API'sinin /metrics ucunda)
+# METRICS_ENABLED kapalıyken kayıt fonksiyonları ilk satırda döner; sıcak yoldaki
+# maliyet tek bir sözlük okumasıdır.
+# ---------------------------------------------------------------------------
+
+METRIC_PREFIX = "crypto_signal_"
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+METRIC_DEFINITIONS = {
+    "scan_cycle_seconds": ("histogram", "Sinyal tarama döngüsünün süresi"),
+    "scan_stage_seconds": ("histogram", "Tarama aşaması süresi (fetch, decode, indicators, rule, ...)"),
+    "binance_requests_total": ("counter", "Binance REST yanıtları (uç nokta, HTTP durumu)"),
+    "binance_request_weight_total": ("counter", "Binance istek ağırlığı (belgelenen değerlere göre)"),
+    "binance_used_weight_1m": ("gauge", "Binance'in bildirdiği son 1 dakikalık kullanılan ağırlık"),
+    "binance_retries_total": ("counter", "Binance yeniden denemeleri"),
+    "signal_memo_requests_total": ("counter", "Sinyal önbelleği sorguları (hit / miss)"),
+    "monitor_check_seconds": ("histogram", "Pozisyon başına TP/SL kontrol süresi"),
+    "monitor_schedule_lag_seconds": ("histogram", "Planlanan kontrol anından gecikme"),
+    "tpsl_detection_delay_seconds": ("histogram", "Fiyatın seviyeyi geçmesinden close_position çağrısına kadar (üst sınır)"),
+    "telegram_send_seconds": ("histogram", "Telegram sendMessage isteği süresi"),
+    "telegram_messages_total": ("counter", "Telegram sendMessage yanıtları (öncelik, HTTP durumu)"),
+    "mongo_operation_seconds": ("histogram", "MongoDB komut süresi"),
+    "mongo_errors_total": ("counter", "Başarısız MongoDB komutları"),
+    "active_signals": ("gauge", "Aktif sinyal sayısı"),
+    "monitored_symbols": ("gauge", "İzleme zamanlayıcısındaki sembol sayısı"),
+    "outbox_inflight": ("gauge", "Teslimatı süren bildirim sayısı"),
+    "event_loop_lag_seconds": ("histogram", "Event loop zamanlama gecikmesi"),
+    "event_loop_lag_quantile_seconds": ("gauge", "Son pencerede event loop gecikmesi yüzdelikleri"),
+    "event_loop_stalls_total": ("counter", "Eşiği aşan event loop bloklamaları (en içteki kod konumu)"),
+    "process_resident_memory_bytes": ("gauge", "Sürecin yerleşik bellek kullanımı (RSS)"),
+    "state_map_entries": ("gauge", "Uzun ömürlü bellek içi sözlüklerin kayıt sayısı"),
+    "state_evictions_total": ("counter", "Budama ile silinen kayıtlar (sözlük)"),
+    "candle_store_bytes": ("gauge", "Mum deposu ve paylaşımlı bellek bloklarının numpy bayt toplamı"),
+    "tracemalloc_traced_bytes": ("gauge", "tracemalloc ile izlenen Python ayırmaları (izleme açıksa)"),
+}
+metric_values = {}  # {(ad, etiketler): değer} - counter ve gauge
+metric_histograms = {}  # {(ad, etiketler): [kova sayıları, toplam, adet]}
+_NULL_METRIC_TIMER = contextlib.nullcontext()
+
+def metric_inc(name, value=1, **labels):
+    if not CONFIG["METRICS_ENABLED"]:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    metric_values[key] = metric_values.get(key, 0) + value
+
+def metric_set(name, value, **labels):
+    if not CONFIG["METRICS_ENABLED"]:
+        return
+    metric_values[(name, tuple(sorted(labels.items())))] = value
+
+def metric_observe(name, value, **labels):
+    if not CONFIG["METRICS_ENABLED"]:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    histogram = metric_histograms.get(key)
+    if histogram is None:
+        histogram = metric_histograms[key] = [[0] * len(METRIC_BUCKETS), 0.0, 0]
+    index = bisect.bisect_left(METRIC_BUCKETS, value)
+    if index < len(METRIC_BUCKETS):
+        histogram[0][index] += 1
+    histogram[1] += value
+    histogram[2] += 1
+
+@contextlib.contextmanager
+def _metric_timer(name, labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric_observe(name, time.perf_counter() - started, **labels)
+
+def metric_timer(name, **labels):
+    """Bloğun süresini histograma yazar; metrikler kapalıysa boş bağlam döner"""
+    if not CONFIG["METRICS_ENABLED"]:
+        return _NULL_METRIC_TIMER
+    return _metric_timer(name, labels)
+
+def metric_timed(name, **labels):
+    """Fonksiyon süresini histograma yazan dekoratör"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metric_timer(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class MongoMetricsListener(monitoring.CommandListener):
+    """pymongo komut olaylarından MongoDB işlem sürelerini ölçer"""
+    def started(self, event):
+        pass
+    
+    def succeeded(self, event):
+        metric_observe("mongo_operation_seconds", event.duration_micros / 1e6, command=event.command_name)
+    
+    def failed(self, event):
+        metric_observe("mongo_operation_seconds", event.duration_micros / 1e6, command=event.command_name)
+        metric_inc("mongo_errors_total", command=event.command_name)
+
+def _metric_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in items)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + "}"
+
+def collect_metric_gauges():
+    """Kazıma anında okunan anlık durum göstergeleri"""
+    metric_set("active_signals", len(active_signals))
+    metric_set("monitored_symbols", len(monitor_next_check))
+    metric_set("outbox_inflight", len(outbox_inflight))
+    for name, value in loop_lag_percentiles().items():
+        if name != "max":
+            metric_set("event_loop_lag_quantile_seconds", value, quantile=name)
+    rss = process_rss_bytes()
+    if rss is not None:
+        metric_set("process_resident_memory_bytes", rss)
+    for name, count in state_map_sizes().items():
+        metric_set("state_map_entries", count, map=name)
+    metric_set("candle_store_bytes", candle_store_bytes())
+    if tracemalloc.is_tracing():
+        metric_set("tracemalloc_traced_bytes", tracemalloc.get_traced_memory()[0])
+
+def render_metrics():
+    """Tüm metrikleri Prometheus metin formatında döndürür"""
+    collect_metric_gauges()
+    lines = []
+    for name, (kind, help_text) in METRIC_DEFINITIONS.items():
+        full_name = METRIC_PREFIX + name
+        if kind == "histogram":
+            series = [(labels, data) for (metric, labels), data in metric_histograms.items() if metric == name]
+        else:
+            series = [(labels, value) for (metric, labels), value in metric_values.items() if metric == name]
+        if not series:
+            continue
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for labels, data in sorted(series, key=lambda item: item[0]):
+            if kind != "histogram":
+                lines.append(f"{full_name}{_metric_labels(labels)} {data}")
+                continue
+            counts, total, count = data
+            cumulative = 0
+            for bound, bucket_count in zip(METRIC_BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f"{full_name}_bucket{_metric_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{full_name}_bucket{_metric_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{full_name}_sum{_metric_labels(labels)} {total}")
+            lines.append(f"{full_name}_count{_metric_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+def binance_request_weight(url):
+    """Binance'in belgelediği istek ağırlığı (yaklaşık; bilinmeyen uçlar için 1)"""
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    if parts.path.endswith("/klines"):
+        limit = int(query.get("limit", ["500"])[0])
+        return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+    if parts.path.endswith("/ticker/24hr"):
+        return 1 if "symbol" in query else 40
+    if parts.path.endswith("/ticker/price"):
+        return 1 if "symbol" in query else 2
+    return 1
+
+# ---------------------------------------------------------------------------
+# Süre bütçeleri (deadline)
+# Taramanın bitiş anı bir ContextVar'da tutulur; oluşturulan task'lar bunu miras alır.
+# Taramadan bağımsız uzun ömürlü task'lar (akış bağlantıları, doldurmalar, Telegram dağıtıcısı)
+# create_background_task ile boş bağlamda başlatılır, böylece ilk taramanın süresi onlara taşınmaz.
+# API istekleri kalan süreye göre zaman aşımını kısaltır ve bütçe bitince yeniden denemez.
+# deadline_scope ise bloğu süre dolunca iptal eder (geride kalan işleri kesmek için).
+# ---------------------------------------------------------------------------
+
+class ScanDeadlineExceeded(Exception):
+    """Tarama veya sembol süre bütçesi aşıldı"""
+
+scan_deadline = contextvars.ContextVar("scan_deadline", default=None)
+
+def create_background_task(coro):
+    """Uzun ömürlü task'ı boş bir bağlamla başlatır (çağıranın tarama süre bütçesini miras almaz)"""
+    return asyncio.create_task(coro, context=contextvars.Context())
+
+def start_scan_budget(seconds):
+    """Geçerli task (ve ondan doğan task'lar) için tarama süre bütçesini başlatır"""
+    scan_deadline.set(asyncio.get_running_loop().time() + seconds)
+
+def clear_scan_budget():
+    """Tarama süre bütçesini kaldırır"""
+    scan_deadline.set(None)
+
+def remaining_scan_budget():
+    """Kalan süre (saniye); bütçe yoksa None"""
+    deadline = scan_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - asyncio.get_running_loop().time()
+
+@contextlib.asynccontextmanager
+async def deadline_scope(seconds=None):
+    """Blok için (dış bütçeyi aşmayan) süre sınırı koyar; süre dolunca blok TimeoutError ile iptal edilir"""
+    loop = asyncio.get_running_loop()
+    deadline = scan_deadline.get()
+    if seconds is not None:
+        deadline = loop.time() + seconds if deadline is None else min(deadline, loop.time() + seconds)
+    token = scan_deadline.set(deadline)
+    try:
+        async with asyncio.timeout_at(deadline):
+            yield deadline
+    finally:
+        scan_deadline.reset(token)
+
+async def _sleep_within_budget(delay):
+    """Yeniden deneme beklemesi; bekleme bütçeyi aşacaksa beklemeden ScanDeadlineExceeded fırlatır"""
+    remaining = remaining_scan_budget()
+    if remaining is not None and delay >= remaining:
+        raise ScanDeadlineExceeded(f"yeniden deneme için süre kalmadı ({remaining:.1f}s)")
+    await asyncio.sleep(delay)
+
+class CircuitOpenError(Exception):
+    """Binance uç noktasının devre kesicisi açık - istek gönderilmedi"""
+
+# Host + uç nokta başına devre kesici durumu (sinyal taraması ve izleme döngüsü ortak kullanır).
+# Host'lar ayrı tutulur: fapi1'deki arıza fapi.binance.com isteklerini engellemez, prob da kendi host'una gider.
+circuit_breakers = {}  # {"netloc/path": {"state", "events", "opened_at", "open_seconds", "probing", "base_url", "path"}}
+
+# Devre yarı açıkken sağlığı ölçmek için kullanılan ucuz istekler (ağırlık 1)
+BINANCE_PROBE_PATHS = {
+    "/fapi/v1/klines": "/fapi/v1/klines?symbol=BTCUSDT&interval=1m&limit=1",
+    "/fapi/v1/ticker/24hr": "/fapi/v1/ticker/24hr?symbol=BTCUSDT",
+}
+BINANCE_DEFAULT_PROBE_PATH = "/fapi/v1/ping"
+
+# Sinyal taramasının bağlı olduğu uç noktalar - biri açıksa tarama askıya alınır
+BINANCE_SCAN_ENDPOINTS = (
+    "https://fapi.binance.com/fapi/v1/ticker/24hr",
+    "https://fapi.binance.com/fapi/v1/klines",
+)
+
+def get_circuit_breaker(url):
+    """URL'nin host ve uç noktasına ait devre kesiciyi döndürür (yoksa kapalı durumda oluşturur)"""
+    parts = urlsplit(url)
+    endpoint = parts.netloc + parts.path
+    breaker = circuit_breakers.get(endpoint)
+    if breaker is None:
+        breaker = circuit_breakers[endpoint] = {
+            "state": "closed",
+            "events": deque(),  # (monotonic zaman, başarılı_mı)
+            "opened_at": 0.0,
+            "open_seconds": CONFIG["CIRCUIT_BREAKER_OPEN_SECONDS"],
+            "probing": False,
+            "base_url": f"{parts.scheme}://{parts.netloc}",
+            "path": parts.path,
+        }
+    return endpoint, breaker
+
+def _open_circuit(endpoint, breaker, reason):
+    breaker["state"] = "open"
+    breaker["opened_at"] = time.monotonic()
+    print(f"🔌 Binance {endpoint} devre kesici AÇILDI ({reason}), {breaker['open_seconds']:.0f}s boyunca istek gönderilmeyecek")
+
+def record_circuit_result(url, ok):
+    """İstek sonucunu uç noktanın hata penceresine yazar; hata oranı eşiği aşılırsa devreyi açar"""
+    if not CONFIG["CIRCUIT_BREAKER_ENABLED"]:
+        return
+    endpoint, breaker = get_circuit_breaker(url)
+    now = time.monotonic()
+    events = breaker["events"]
+    events.append((now, ok))
+    while events and events[0][0] < now - CONFIG["CIRCUIT_BREAKER_WINDOW_SECONDS"]:
+        events.popleft()
+    if ok or breaker["state"] != "closed" or len(events) < CONFIG["CIRCUIT_BREAKER_MIN_REQUESTS"]:
+        return
+    failures = sum(1 for _, success in events if not success)
+    if failures / len(events) >= CONFIG["CIRCUIT_BREAKER_ERROR_RATE"]:
+        _open_circuit(endpoint, breaker, f"{failures}/{len(events)} istek başarısız")
+        raise CircuitOpenError(f"Binance {endpoint} devre kesici açık")
+
+async def _probe_circuit(endpoint, breaker):
+    url = breaker["base_url"] + BINANCE_PROBE_PATHS.get(breaker["path"], BINANCE_DEFAULT_PROBE_PATH)
+    try:
+        timeout = aiohttp.ClientTimeout(total=CONFIG["CIRCUIT_BREAKER_PROBE_TIMEOUT"])
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(url, ssl=False) as resp:
+                return resp.status == 200
+    except Exception:
+        return False
+
+async def circuit_allows(url):
+    """Uç noktaya istek gönderilebilir mi? Bekleme süresi dolmuş açık devre için tek bir prob isteği atar"""
+    if not CONFIG["CIRCUIT_BREAKER_ENABLED"]:
+        return True
+    endpoint, breaker = get_circuit_breaker(url)
+    if breaker["state"] == "closed":
+        return True
+    if breaker["probing"] or time.monotonic() - breaker["opened_at"] < breaker["open_seconds"]:
+        return False
+    
+    # Yarı açık: tek prob isteği sonucu devreyi kapatır ya da beklemeyi ikiye katlayarak yeniden açar
+    breaker["state"] = "half_open"
+    breaker["probing"] = True
+    try:
+        healthy = await _probe_circuit(endpoint, breaker)
+    finally:
+        breaker["probing"] = False
+    if healthy:
+        breaker["state"] = "closed"
+        breaker["events"].clear()
+        breaker["open_seconds"] = CONFIG["CIRCUIT_BREAKER_OPEN_SECONDS"]
+        print(f"✅ Binance {endpoint} devre kesici kapandı (prob isteği başarılı)")
+        return True
+    breaker["open_seconds"] = min(breaker["open_seconds"] * 2, CONFIG["CIRCUIT_BREAKER_MAX_OPEN_SECONDS"])
+    _open_circuit(endpoint, breaker, "prob isteği başarısız")
+    return False
+
+def circuit_is_open(url):
+    """Devre açık ve prob zamanı gelmemiş mi? (istek göndermeden, prob atmadan kontrol)"""
+    if not CONFIG["CIRCUIT_BREAKER_ENABLED"]:
+        return False
+    _, breaker = get_circuit_breaker(url)
+    if breaker["state"] == "closed":
+        return False
+    return breaker["probing"] or time.monotonic() - breaker["opened_at"] < breaker["open_seconds"]
+
+def circuit_retry_after(url):
+    """Açık devrenin bir sonraki prob isteğine kalan süre (kapalıysa 0)"""
+    endpoint, breaker = get_circuit_breaker(url)
+    if breaker["state"] == "closed":
+        return 0.0
+    return max(0.0, breaker["opened_at"] + breaker["open_seconds"] - time.monotonic())
+
+def get_circuit_breaker_status():
+    """{uç nokta: durum} özeti"""
+    return {endpoint: breaker["state"] for endpoint, breaker in circuit_breakers.items()}
+
+class FatalAPIError(Exception):
+    """Tekrar denenmesi anlamsız API hatası (ör. geçersiz sembol - 4xx)"""
+
+# Yeniden denenebilir HTTP durumları: rate limit, IP ban (418) ve sunucu hataları
+RETRYABLE_HTTP_STATUSES = {418, 429, 500, 502, 503, 504}
+
+api_retry_stats = {}  # {path: {"requests", "retries", "fatal", "exhausted", "backoff_seconds"}}
+
+def _api_retry_counter(url):
+    path = urlsplit(url).path
+    counter = api_retry_stats.get(path)
+    if counter is None:
+        counter = api_retry_stats[path] = {"requests": 0, "retries": 0, "fatal": 0, "exhausted": 0, "backoff_seconds": 0.0}
+    return counter
+
+def get_api_retry_stats():
+    """Uç nokta başına istek/yeniden deneme sayaçlarının kopyası"""
+    return {path: dict(counter) for path, counter in api_retry_stats.items()}
+
+def report_api_retry_cost(before):
+    """Verilen anlık görüntüden bu yana uç nokta başına yeniden deneme maliyetini yazdırır"""
+    lines = []
+    for path, counter in api_retry_stats.items():
+        previous = before.get(path, {})
+        delta = {key: counter[key] - previous.get(key, 0) for key in counter}
+        if delta["retries"] or delta["fatal"] or delta["exhausted"]:
+            lines.append(f"{path}: {delta['requests']} istek, {delta['retries']} tekrar, "
+                         f"{delta['fatal']} kalıcı hata, {delta['exhausted']} tükenen, {delta['backoff_seconds']:.1f}s bekleme")
+    if lines:
+        print("🔁 Yeniden deneme maliyeti: " + " | ".join(lines))
+
+def backoff_delay(attempt, retry_after=None):
+    """Tam jitter'lı üstel bekleme; sunucu Retry-After verdiyse en az o kadar beklenir"""
+    delay = random.uniform(0, min(CONFIG["API_BACKOFF_MAX_SECONDS"], CONFIG["API_BACKOFF_BASE_SECONDS"] * 2 ** attempt))
+    if retry_after is not None:
+        delay += retry_after
+    return delay
+
+def parse_retry_after(value):
+    """Retry-After başlığını saniyeye çevirir (saniye veya HTTP tarihi)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(pytz.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
 async def api_request_with_retry(session, url, ssl=False, max_retries=None):
     if max_retries is None:
         max_retries = CONFIG["API_RETRY_ATTEMPTS"]
+    counter = _api_retry_counter(url)
+    counter["requests"] += 1
+    endpoint = urlsplit(url).path
+    
+    async def backoff(attempt, reason, retry_after=None):
+        """Son deneme değilse jitter'lı bekler; son denemeyse False döner"""
+        if attempt >= max_retries - 1:
+            counter["exhausted"] += 1
+            return False
+        delay = backoff_delay(attempt, retry_after)
+        print(f"⚠️ {reason}, {delay:.1f} saniye sonra tekrar denenecek (Deneme {attempt+1}/{max_retries})")
+        await _sleep_within_budget(delay)
+        counter["retries"] += 1
+        metric_inc("binance_retries_total", endpoint=endpoint)
+        counter["backoff_seconds"] += delay
+        return True
     
     for attempt in range(max_retries):
+        # Devre açıksa Binance'i yormadan hemen vazgeç
+        if not await circuit_allows(url):
+            raise CircuitOpenError(f"Binance {get_circuit_breaker(url)[0]} devre kesici açık")
+        
+        # Süre bütçesi varsa isteğin zaman aşımını kalan süreyle sınırla
+        request_kwargs = {}
+        remaining = remaining_scan_budget()
+        if remaining is not None:
+            if remaining <= 0:
+                raise ScanDeadlineExceeded("tarama süre bütçesi doldu")
+            session_total = session.timeout.total if session.timeout and session.timeout.total else remaining
+            request_kwargs["timeout"] = aiohttp.ClientTimeout(total=min(session_total, remaining))
         try:
-            async with session.get(url, ssl=ssl) as resp:
+            async with session.get(url, ssl=ssl, **request_kwargs) as resp:
+                if CONFIG["METRICS_ENABLED"]:
+                    metric_inc("binance_requests_total", endpoint=endpoint, status=resp.status)
+                    metric_inc("binance_request_weight_total", binance_request_weight(url), endpoint=endpoint)
+                    used_weight = resp.headers.get("X-MBX-USED-WEIGHT-1M")
+                    if used_weight:
+                        metric_set("binance_used_weight_1m", float(used_weight))
                 if resp.status == 200:
-                    return await resp.json()
-                elif resp.status == 429:  # Rate limit
-                    delay = CONFIG["API_RETRY_DELAYS"][min(attempt, len(CONFIG["API_RETRY_DELAYS"])-1)]
-                    print(f"⚠️ Rate limit (429), {delay} saniye bekleniyor... (Deneme {attempt+1}/{max_retries})")
-                    await asyncio.sleep(delay)
+                    data = await resp.json()
+                    record_circuit_result(url, True)
+                    return data
+                
+                if resp.status not in RETRYABLE_HTTP_STATUSES and resp.status < 500:
+                    # 4xx (geçersiz sembol, hatalı parametre): tekrar denemek sonucu değiştirmez
+                    record_circuit_result(url, True)
+                    counter["fatal"] += 1
+                    try:
+                        detail = (await resp.json()).get("msg", "")
+                    except Exception:
+                        detail = ""
+                    raise FatalAPIError(f"API hatası: {resp.status} {detail}".rstrip())
+                
+                # 5xx sunucu sağlığını, 429/418 yükü gösterir - devre kesiciye hata olarak yazılır
+                record_circuit_result(url, False)
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                if retry_after is not None and retry_after > CONFIG["API_RETRY_AFTER_MAX_SECONDS"]:
+                    counter["exhausted"] += 1
+                    raise Exception(f"API hatası: {resp.status} (Retry-After {retry_after:.0f}s çok uzun)")
+                label = "Rate limit" if resp.status in (418, 429) else "API hatası"
+                if await backoff(attempt, f"{label} ({resp.status})", retry_after):
                     continue
-                else:
-                    print(f"⚠️ API hatası: {resp.status}, Deneme {attempt+1}/{max_retries}")
-                    if attempt < max_retries - 1:
-                        delay = CONFIG["API_RETRY_DELAYS"][min(attempt, len(CONFIG["API_RETRY_DELAYS"])-1)]
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        raise Exception(f"API hatası: {resp.status}")
+                raise Exception(f"API hatası: {resp.status}")
                         
+        except (ScanDeadlineExceeded, CircuitOpenError, FatalAPIError):
+            raise
+        
         except asyncio.TimeoutError:
-            print(f"⚠️ Timeout hatası, Deneme {attempt+1}/{max_retries}")
-            if attempt < max_retries - 1:
-                delay = CONFIG["API_RETRY_DELAYS"][min(attempt, len(CONFIG["API_RETRY_DELAYS"])-1)]
-                await asyncio.sleep(delay)
+            remaining = remaining_scan_budget()
+            if remaining is not None and remaining <= 0:
+                raise ScanDeadlineExceeded("istek süre bütçesi içinde tamamlanamadı")
+            record_circuit_result(url, False)
+            if await backoff(attempt, "Timeout hatası"):
                 continue
-            else:
-                raise Exception("API timeout hatası")
+            raise Exception("API timeout hatası")
                 
         except (aiohttp.ClientConnectorError, aiohttp.ClientError, OSError) as e:
+            record_circuit_result(url, False)
             error_msg = str(e)
             # Bağlantı hatalarını daha anlamlı hale getir
             if "Cannot connect to host" in error_msg or "Name or service not known" in error_msg:
-                print(f"⚠️ Binance API bağlantı hatası: {error_msg}, Deneme {attempt+1}/{max_retries}")
+                reason = f"Binance API bağlantı hatası: {error_msg}"
             else:
-                print(f"⚠️ API isteği hatası: {error_msg}, Deneme {attempt+1}/{max_retries}")
-            
-            if attempt < max_retries - 1:
-                delay = CONFIG["API_RETRY_DELAYS"][min(attempt, len(CONFIG["API_RETRY_DELAYS"])-1)]
-                await asyncio.sleep(delay)
+                reason = f"API isteği hatası: {error_msg}"
+            if await backoff(attempt, reason):
                 continue
-            else:
-                raise Exception(f"Binance API bağlantı hatası: {error_msg}")
-                
-        except Exception as e:
-            error_msg = str(e)
-            print(f"⚠️ API isteği hatası: {error_msg}, Deneme {attempt+1}/{max_retries}")
-            if attempt < max_retries - 1:
-                delay = CONFIG["API_RETRY_DELAYS"][min(attempt, len(CONFIG["API_RETRY_DELAYS"])-1)]
-                await asyncio.sleep(delay)
+            raise Exception(f"Binance API bağlantı hatası: {error_msg}")
+        
+        except ValueError as e:
+            # Bozuk/yarım JSON yanıtı - tekrar denenebilir
+            if await backoff(attempt, f"API yanıtı çözümlenemedi: {e}"):
                 continue
-            else:
-                raise e
+            raise
     
     raise Exception(f"API isteği {max_retries} denemeden sonra başarısız")
 
@@ -393,6 +922,7 @@ def update_stats_atomic(updates):
         
         if result.modified_count > 0 or result.upserted_id:
             print(f"✅ İstatistikler atomik olarak güncellendi: {updates}")
+            apply_snapshot_stats_increments(updates)
             return True
         else:
             print(f"⚠️ İstatistik güncellemesi yapılamadı: {updates}")
@@ -562,7 +1092,8 @@ def connect_mongodb():
                                   serverSelectionTimeoutMS=30000,
                                   connectTimeoutMS=30000,
                                   socketTimeoutMS=30000,
-                                  maxPoolSize=10)
+                                  maxPoolSize=10,
+                                  event_listeners=[MongoMetricsListener()] if CONFIG["METRICS_ENABLED"] else [])
         mongo_client.admin.command('ping')
         mongo_db = mongo_client[MONGODB_DB]
         mongo_collection = mongo_db[MONGODB_COLLECTION]
@@ -1092,7 +1623,7 @@ def save_previous_signals_to_db(previous_signals):
             signal_doc = {
                 "_id": f"previous_signal_{symbol}",
                 "symbol": symbol,
-                "signals": signals,
+                "signals": unpack_signals(signals),
                 "saved_time": str(datetime.now())
             }
             
@@ -1112,10 +1643,11 @@ def load_previous_signals_from_db():
     try:
         def transform_signal(doc):
             symbol = doc["_id"].replace("previous_signal_", "")
+            # Bellekte sembol başına paketlenmiş maske tutulur, MongoDB formatı değişmez
             if "signals" in doc:
-                return {symbol: doc["signals"]}
+                return {symbol: pack_signals(doc["signals"])}
             else:
-                return {symbol: doc}
+                return {symbol: pack_signals(doc)}
         
         return load_data_by_pattern("^previous_signal_", "signals", "önceki sinyal", transform_signal)
     except Exception as e:
@@ -1155,7 +1687,7 @@ def update_previous_signal_in_db(symbol, signals):
         signal_doc = {
             "_id": f"previous_signal_{symbol}",
             "symbol": symbol,
-            "signals": signals,
+            "signals": unpack_signals(signals),
             "updated_time": str(datetime.now())
         }
         
@@ -1193,9 +1725,62 @@ global_stop_cooldown = {}
 global_allowed_users = set() 
 global_admin_users = set() 
 global_last_signal_scan_time = None
+global_scan_universe = {"symbols": [], "updated_at": None}  # Son taramanın sembol evreni (durum API'si için)
 active_signals = {}  # Global active_signals değişkeni
 position_processing_flags = {}  # Race condition önleme için pozisyon işlem flag'leri
 
+# ---------------------------------------------------------------------------
+# Komut anlık görüntüsü: /active ve /stats MongoDB'ye gitmeden bu kopyadan yanıtlanır.
+# Döngüler her turda yayınlar; içerik değişirse sürüm artar ve önceden oluşturulmuş
+# mesaj metinleri yalnızca o zaman yeniden oluşturulur. published_at her yayında ilerler
+# (döngülerin canlılık sinyali), updated_at yalnızca içerik değişince.
+STATS_COUNTER_KEYS = ('total_signals', 'successful_signals', 'failed_signals', 'total_profit_loss')
+bot_snapshot = {"version": 0, "active_signals": {}, "stats": {}, "updated_at": None, "published_at": None}
+snapshot_render_cache = {}  # {ad: (sürüm, metin)}
+
+def publish_snapshot(active_signals=None, stats=None, replace_stats=False):
+    """Döngülerin güncel aktif sinyal / istatistik kopyasını yayınlar; değişiklik varsa sürümü artırır"""
+    bot_snapshot["published_at"] = datetime.now()
+    changed = False
+    if active_signals is not None:
+        copied = {symbol: dict(signal) for symbol, signal in active_signals.items()}
+        if copied != bot_snapshot["active_signals"]:
+            bot_snapshot["active_signals"] = copied
+            changed = True
+    if stats is not None:
+        merged = dict(stats)
+        if not replace_stats:
+            # Monitörün atomik artışları döngünün kopyasından önce gelmiş olabilir: sayaçları geri alma
+            for key in STATS_COUNTER_KEYS:
+                if key in bot_snapshot["stats"]:
+                    merged[key] = max(merged.get(key, 0), bot_snapshot["stats"][key])
+        if merged != bot_snapshot["stats"]:
+            bot_snapshot["stats"] = merged
+            changed = True
+    if changed:
+        bot_snapshot["version"] += 1
+        bot_snapshot["updated_at"] = datetime.now()
+    return changed
+
+def apply_snapshot_stats_increments(updates):
+    """update_stats_atomic ile yazılan artışları anlık görüntüye de uygular"""
+    stats = dict(bot_snapshot["stats"])
+    for key, value in updates.items():
+        stats[key] = stats.get(key, 0) + value
+    bot_snapshot["stats"] = stats
+    bot_snapshot["version"] += 1
+    bot_snapshot["updated_at"] = datetime.now()
+
+def get_snapshot_text(name, render):
+    """Anlık görüntüden oluşturulmuş metni döndürür; sürüm değişmediyse önbellekten"""
+    version = bot_snapshot["version"]
+    cached = snapshot_render_cache.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    text = render(bot_snapshot)
+    snapshot_render_cache[name] = (version, text)
+    return text
+
 def is_authorized_chat(update):
     """Kullanıcının yetkili olduğu sohbet mi kontrol et"""
     chat = update.effective_chat
@@ -1232,91 +1817,558 @@ def is_admin(user_id):
     """Kullanıcının admin olup olmadığını kontrol et"""
     return user_id == BOT_OWNER_ID or user_id in ADMIN_USERS
 
-async def send_telegram_message(message, chat_id=None):
-    """Telegram mesajı gönder"""
-    try:
-        if not chat_id:
-            chat_id = TELEGRAM_CHAT_ID
-        
-        if not chat_id:
-            print("❌ Telegram chat ID bulunamadı!")
-            return False
-        
-        # Connection pool ayarlarını güncelle
+TELEGRAM_API_BASE = "https://api.telegram.org"
+telegram_session = None  # Telegram Bot API için paylaşılan (havuzlu) HTTP oturumu
+telegram_rate_state = {"next_slot": 0.0}  # Genel hız sınırı için bir sonraki boş gönderim zamanı
+telegram_chat_next_send = {}  # {chat_id: monotonic} - sohbet başına hız sınırı / retry_after
+
+# Öncelik kuyrukları: TP/SL çıkışları > yeni sinyaller > komut yanıtları ve bilgi mesajları
+TELEGRAM_PRIORITY_LANES = ("exit", "entry", "info")
+telegram_lanes = {lane: deque() for lane in TELEGRAM_PRIORITY_LANES}  # bekleyen gönderim izinleri (future)
+telegram_lane_credit = {lane: 0.0 for lane in TELEGRAM_PRIORITY_LANES}  # ağırlıklı adil sıra için kredi
+telegram_lane_stats = {lane: {"granted": 0, "max_wait": 0.0} for lane in TELEGRAM_PRIORITY_LANES}
+telegram_dispatcher = {"task": None, "wakeup": None}
+
+def get_telegram_session():
+    """Tüm Telegram istekleri için tek, havuzlu HTTP oturumu (ilk kullanımda oluşturulur)"""
+    global telegram_session
+    if telegram_session is None or telegram_session.closed:
         connector = aiohttp.TCPConnector(
-            limit=100,  # Bağlantı limitini artır
-            limit_per_host=30,  # Host başına limit
-            ttl_dns_cache=300,  # DNS cache süresi
-            use_dns_cache=True,
+            limit=CONFIG["TELEGRAM_BROADCAST_CONCURRENCY"],
+            ttl_dns_cache=300,
             keepalive_timeout=30,
             enable_cleanup_closed=True
         )
-        
-        timeout = aiohttp.ClientTimeout(total=30, connect=10)
-        
-        async with aiohttp.ClientSession(
-            connector=connector, 
-            timeout=timeout,
+        telegram_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30, connect=10),
             headers={'User-Agent': 'Mozilla/5.0'}
-        ) as session:
-            url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-            data = {
-                'chat_id': chat_id,
-                'text': message,
-                'parse_mode': 'HTML',
-                'disable_web_page_preview': True
-            }
-            
-            async with session.post(url, json=data, ssl=False) as response:
-                if response.status == 200:
-                    return True
-                else:
-                    response_text = await response.text()
-                    print(f"❌ Telegram API hatası: {response.status} - {response_text}")
-                    return False
-                    
-    except asyncio.TimeoutError:
-        print(f"❌ Telegram mesaj gönderme timeout: {chat_id}")
+        )
+    return telegram_session
+
+async def close_telegram_session():
+    global telegram_session
+    task = telegram_dispatcher["task"]
+    if task is not None and not task.done():
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    telegram_dispatcher["task"] = None
+    if telegram_session is not None and not telegram_session.closed:
+        await telegram_session.close()
+    telegram_session = None
+
+def _pick_telegram_lane():
+    """Çıkış kuyruğunda bekleyen varsa o; yoksa diğer kuyruklar arasında ağırlıklı adil sıra"""
+    if telegram_lanes["exit"]:
+        return "exit"
+    weights = CONFIG["TELEGRAM_LANE_WEIGHTS"]
+    candidates = [lane for lane in TELEGRAM_PRIORITY_LANES[1:] if telegram_lanes[lane]]
+    total = sum(weights[lane] for lane in candidates)
+    for lane in candidates:
+        telegram_lane_credit[lane] += weights[lane]
+    chosen = max(candidates, key=telegram_lane_credit.get)
+    telegram_lane_credit[chosen] -= total
+    return chosen
+
+async def _telegram_slot_dispatcher():
+    """Genel hız bütçesindeki her gönderim hakkını öncelik kuyruklarına dağıtır"""
+    wakeup = telegram_dispatcher["wakeup"]
+    while True:
+        if not any(telegram_lanes.values()):
+            wakeup.clear()
+            await wakeup.wait()
+            continue
+        wait = telegram_rate_state["next_slot"] - time.monotonic()
+        if wait > 0:
+            # Uyandıktan sonra yeniden seç: bu arada gelen çıkış mesajı öne geçer
+            await asyncio.sleep(wait)
+            continue
+        lane = _pick_telegram_lane()
+        future = telegram_lanes[lane].popleft()
+        if future.done():  # bekleyen iptal edilmiş
+            continue
+        telegram_rate_state["next_slot"] = time.monotonic() + 1.0 / CONFIG["TELEGRAM_GLOBAL_RATE_PER_SECOND"]
+        future.set_result(None)
+
+def _ensure_telegram_dispatcher():
+    if telegram_dispatcher["task"] is None or telegram_dispatcher["task"].done():
+        telegram_dispatcher["wakeup"] = asyncio.Event()
+        telegram_dispatcher["task"] = create_background_task(_telegram_slot_dispatcher())
+
+async def acquire_telegram_slot(chat_id, priority="info"):
+    """Sohbet başına sınırı (özel 1/sn, grup 20/dk) bekler, sonra öncelik kuyruğundan genel
+    (~30 mesaj/sn) gönderim hakkı alır"""
+    key = str(chat_id)
+    chat_interval = CONFIG["TELEGRAM_PRIVATE_CHAT_INTERVAL"] if not key.startswith("-") else CONFIG["TELEGRAM_GROUP_CHAT_INTERVAL"]
+    while True:
+        chat_wait = telegram_chat_next_send.get(key, 0.0) - time.monotonic()
+        if chat_wait > 0:
+            await asyncio.sleep(chat_wait)
+            continue
+        
+        _ensure_telegram_dispatcher()
+        requested = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        telegram_lanes[priority].append(future)
+        telegram_dispatcher["wakeup"].set()
+        await future
+        
+        now = time.monotonic()
+        if telegram_chat_next_send.get(key, 0.0) > now:
+            continue  # aynı sohbete başka bir gönderim araya girdi
+        telegram_chat_next_send[key] = now + chat_interval
+        stats = telegram_lane_stats[priority]
+        stats["granted"] += 1
+        stats["max_wait"] = max(stats["max_wait"], now - requested)
+        return
+
+async def deliver_telegram_message(message, chat_id, priority="info", send_limit=None):
+    """Tek sohbete gönderim; 429 retry_after'a uyar. (başarılı_mı, açıklama) döner.
+    send_limit (ör. toplu gönderimin semaforu) yalnızca HTTP isteği sürerken tutulur;
+    sohbet sınırı, flood control ve yeniden deneme beklemeleri onu meşgul etmez."""
+    url = f"{TELEGRAM_API_BASE}/bot{TELEGRAM_TOKEN}/sendMessage"
+    data = {
+        'chat_id': chat_id,
+        'text': message,
+        'parse_mode': 'HTML',
+        'disable_web_page_preview': True
+    }
+    detail = "gönderilmedi"
+    for attempt in range(CONFIG["TELEGRAM_MAX_ATTEMPTS"]):
+        await acquire_telegram_slot(chat_id, priority)
+        try:
+            async with send_limit or contextlib.nullcontext():
+                started = time.perf_counter()
+                async with get_telegram_session().post(url, json=data, ssl=False) as response:
+                    metric_observe("telegram_send_seconds", time.perf_counter() - started, priority=priority)
+                    metric_inc("telegram_messages_total", priority=priority, status=response.status)
+                    if response.status == 200:
+                        return True, "ok"
+                    try:
+                        body = await response.json(content_type=None)
+                    except Exception:
+                        body = {"description": await response.text()}
+                    detail = f"{response.status} - {body.get('description', '')}"
+                    if response.status == 429:
+                        # Flood control: Telegram'ın verdiği süre kadar bu sohbete gönderme
+                        retry_after = float((body.get("parameters") or {}).get("retry_after", 1))
+                        telegram_chat_next_send[str(chat_id)] = time.monotonic() + retry_after
+                        print(f"⏳ Telegram flood control ({chat_id}): {retry_after:.0f}s bekleniyor")
+                        continue
+                    if response.status < 500:
+                        # 400/403 (sohbet yok, bot engellendi...) tekrar denenmez
+                        print(f"❌ Telegram API hatası: {detail}")
+                        return False, detail
+                    # 5xx: aşağıdaki beklemeden sonra tekrar denenir
+        except asyncio.TimeoutError:
+            detail = "timeout"
+            print(f"❌ Telegram mesaj gönderme timeout: {chat_id}")
+        except Exception as e:
+            detail = str(e)
+            print(f"❌ Mesaj gönderme hatası (chat_id: {chat_id}): {e}")
+        if attempt < CONFIG["TELEGRAM_MAX_ATTEMPTS"] - 1:
+            await asyncio.sleep(backoff_delay(attempt))
+    return False, detail
+
+async def send_telegram_message(message, chat_id=None, priority="info"):
+    """Telegram mesajı gönder"""
+    if not chat_id:
+        chat_id = TELEGRAM_CHAT_ID
+    
+    if not chat_id:
+        print("❌ Telegram chat ID bulunamadı!")
+        return False
+    
+    ok, _ = await deliver_telegram_message(message, chat_id, priority)
+    return ok
+
+async def broadcast_message(message, chat_ids, priority="entry"):
+    """Mesajı sınırlı eşzamanlılıkla tüm sohbetlere gönderir -> {chat_id: (başarılı_mı, açıklama)}.
+    Eşzamanlılık sınırı yalnızca süren HTTP isteklerine uygulanır: sohbet sınırını ya da flood
+    control süresini bekleyen sohbet diğer sohbetlerin gönderimini durdurmaz."""
+    semaphore = asyncio.Semaphore(CONFIG["TELEGRAM_BROADCAST_CONCURRENCY"])
+    
+    async def send_one(chat_id):
+        try:
+            return chat_id, await deliver_telegram_message(message, chat_id, priority, send_limit=semaphore)
+        except Exception as e:
+            return chat_id, (False, str(e))
+    
+    return dict(await asyncio.gather(*(send_one(chat_id) for chat_id in chat_ids)))
+
+async def send_signal_to_all_users(message, priority="entry", recipients=None):
+    """Tüm kullanıcılara ve gruplara (ya da verilen alıcılara) sinyal gönderir. En az bir başarılı gönderim varsa True döner."""
+    if recipients is None:
+        recipients = notification_recipients()
+    outcomes = await broadcast_message(message, recipients, priority)
+    failed = {chat_id: detail for chat_id, (ok, detail) in outcomes.items() if not ok}
+    success_count = len(outcomes) - len(failed)
+    for chat_id, detail in list(failed.items())[:10]:
+        print(f"❌ Sinyal gönderilemedi ({chat_id}): {detail}")
+    
+    # En az bir başarılı gönderim varsa True döner
+    if success_count > 0:
+        print(f"✅ Toplam {success_count}/{len(outcomes)} gönderim başarılı")
+        return True
+    else:
+        print(f"❌ Hiçbir gönderim başarılı olmadı ({len(outcomes)} deneme)")
         return False
+
+# ---------------------------------------------------------------------------
+# Bildirim kuyruğu (outbox): açılış/kapanış mesajları MongoDB'ye yazılır, ayrı bir
+# gönderici task'ı teslim eder. Böylece izleme döngüsü Telegram'ı beklemez.
+outbox_wakeup = None  # asyncio.Event - yeni kayıt eklenince gönderici hemen uyanır
+outbox_inflight = {}  # {outbox _id: task} - teslimatı süren kayıtlar
+OUTBOX_EVENT_PRIORITY = {"take_profit": "exit", "stop_loss": "exit", "signal_open": "entry"}
+
+def notification_recipients():
+    """Bildirimin gideceği sohbetler (kullanıcılar + bot sahibinin grupları, tekrarsız)"""
+    recipients, seen = [], set()
+    for chat_id in list(ALLOWED_USERS) + list(BOT_OWNER_GROUPS):
+        if str(chat_id) not in seen:
+            seen.add(str(chat_id))
+            recipients.append(chat_id)
+    return recipients
+
+# ---------------------------------------------------------------------------
+# Abone filtreleri: her sohbet sembol listesi, yön (long/short) ve yalnızca büyük
+# coinler filtresi seçebilir. Filtreler (kapsam, yön) -> sohbetler ters indeksinde
+# tutulur; bir sinyalin alıcıları en fazla altı kümenin birleşimidir, mesaj başına
+# tüm aboneler taranmaz. İndeks başlangıçta bir kez kurulur, sonra kullanıcı/grup
+# ekleme-çıkarma ve /subscribe ile yalnızca ilgili sohbet güncellenir.
+SUBSCRIBER_SIDES = ("all", "long", "short")
+subscriber_filters = {}  # {str(chat_id): {"chat_id", "symbols": [..] veya None, "side", "majors_only"}}
+subscriber_index = {}  # {(kapsam, yön): set(str(chat_id))} - kapsam: sembol, "*majors" veya "*"
+
+def signal_side(signal_type):
+    """Sinyal tipini (LONG/ALIŞ/SHORT/SATIŞ) abone filtresi yönüne çevirir"""
+    return "short" if str(signal_type).upper() in ("SHORT", "SATIŞ", "SATIS") else "long"
+
+def default_subscriber_filter(chat_id):
+    return {"chat_id": chat_id, "symbols": None, "side": "all", "majors_only": False}
+
+def _subscriber_scopes(subscription):
+    if subscription["symbols"]:
+        symbols = subscription["symbols"]
+        if subscription["majors_only"]:
+            symbols = [symbol for symbol in symbols if symbol in MAJOR_COIN_SYMBOLS]
+        return [(symbol, subscription["side"]) for symbol in symbols]
+    return [("*majors" if subscription["majors_only"] else "*", subscription["side"])]
+
+def _unindex_subscriber(key):
+    subscription = subscriber_filters.get(key)
+    if subscription is None:
+        return
+    for scope in _subscriber_scopes(subscription):
+        chats = subscriber_index.get(scope)
+        if chats is not None:
+            chats.discard(key)
+            if not chats:
+                del subscriber_index[scope]
+
+def add_subscriber(chat_id, subscription=None):
+    """Sohbeti (varsa yeni filtresiyle) indekse ekler; yalnızca bu sohbetin kayıtları değişir"""
+    key = str(chat_id)
+    _unindex_subscriber(key)
+    if subscription is None:
+        subscription = subscriber_filters.get(key) or default_subscriber_filter(chat_id)
+    subscriber_filters[key] = subscription
+    for scope in _subscriber_scopes(subscription):
+        subscriber_index.setdefault(scope, set()).add(key)
+
+def remove_subscriber(chat_id):
+    key = str(chat_id)
+    _unindex_subscriber(key)
+    if subscriber_filters.pop(key, None) is not None:
+        save_subscriber_filters()
+
+def matching_subscribers(symbol, side):
+    """Sembol/yön için filtresi eşleşen sohbetler"""
+    scopes = ["*"] + (["*majors"] if symbol in MAJOR_COIN_SYMBOLS else []) + [symbol]
+    keys = set()
+    for scope in scopes:
+        for scope_side in ("all", side):
+            keys |= subscriber_index.get((scope, scope_side), set())
+    return [subscriber_filters[key]["chat_id"] for key in keys]
+
+def save_subscriber_filters():
+    data = {
+        key: {"chat_id": sub["chat_id"], "symbols": sub["symbols"], "side": sub["side"], "majors_only": sub["majors_only"]}
+        for key, sub in subscriber_filters.items()
+        if sub["symbols"] or sub["side"] != "all" or sub["majors_only"]
+    }
+    save_data_to_db("subscriber_filters", data, "Abone Filtreleri")
+
+def rebuild_subscriber_index():
+    """Başlangıçta kayıtlı filtrelerle indeksi kurar (sonraki değişiklikler artımlıdır)"""
+    saved = load_data_from_db("subscriber_filters", {}) or {}
+    subscriber_filters.clear()
+    subscriber_index.clear()
+    for chat_id in notification_recipients():
+        stored = saved.get(str(chat_id))
+        subscription = default_subscriber_filter(chat_id)
+        if stored:
+            subscription.update(symbols=stored.get("symbols"), side=stored.get("side", "all"), majors_only=stored.get("majors_only", False))
+        add_subscriber(chat_id, subscription)
+    filtered = sum(1 for sub in subscriber_filters.values() if sub["symbols"] or sub["side"] != "all" or sub["majors_only"])
+    print(f"✅ Abone indeksi kuruldu: {len(subscriber_filters)} sohbet ({filtered} filtreli), {len(subscriber_index)} indeks anahtarı")
+
+async def enqueue_notification(idempotency_key, message, event, symbol, side=None):
+    """Bildirimi outbox'a yazar. Aynı anahtar daha önce yazıldıysa tekrar eklenmez.
+    side verilirse yalnızca filtresi eşleşen abonelere gider.
+    Kayıt kalıcı olarak yazıldıysa (ya da MongoDB yokken doğrudan gönderildiyse) True döner."""
+    priority = OUTBOX_EVENT_PRIORITY.get(event, "info")
+    recipients = matching_subscribers(symbol, side) if side else notification_recipients()
+    if not recipients:
+        print(f"ℹ️ {symbol} → {event} bildirimi için filtresi eşleşen abone yok")
+        return True
+    if mongo_collection is None:
+        # Kalıcı depolama yoksa eski davranış: doğrudan gönder
+        return await send_signal_to_all_users(message, priority, recipients)
+    
+    now = datetime.now()
+    try:
+        mongo_collection.insert_one({
+            "_id": f"outbox_{idempotency_key}",
+            "event": event,
+            "priority": priority,
+            "symbol": symbol,
+            "message": message,
+            "recipients": recipients,
+            "delivered": [],
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        })
+        print(f"📮 {symbol} → {event} bildirimi gönderim kuyruğuna alındı")
+    except DuplicateKeyError:
+        print(f"⏸️ {symbol} → {event} bildirimi zaten kuyrukta ({idempotency_key}), tekrar eklenmedi")
     except Exception as e:
-        print(f"❌ Mesaj gönderme hatası (chat_id: {chat_id}): {e}")
+        print(f"❌ {symbol} → {event} bildirimi kuyruğa yazılamadı: {e}")
         return False
+    
+    if outbox_wakeup is not None:
+        outbox_wakeup.set()
+    return True
 
-async def send_signal_to_all_users(message):
-    """Tüm kullanıcılara ve gruplara sinyal gönderir. En az bir başarılı gönderim varsa True döner."""
-    sent_chats = set()
-    success_count = 0
-    total_attempts = 0
+async def deliver_outbox_entry(doc):
+    """Kaydı henüz teslim edilmemiş sohbetlere gönderir; teslim edilen sohbetler kayda işlenir"""
+    delivered = {str(chat_id) for chat_id in doc.get("delivered", [])}
+    pending = [chat_id for chat_id in doc.get("recipients", []) if str(chat_id) not in delivered]
+    if pending:
+        outcomes = await broadcast_message(doc["message"], pending, doc.get("priority", "entry"))
+        newly_delivered = [str(chat_id) for chat_id, (ok, _) in outcomes.items() if ok]
+        if newly_delivered:
+            mongo_collection.update_one({"_id": doc["_id"]}, {"$addToSet": {"delivered": {"$each": newly_delivered}}})
+            delivered.update(newly_delivered)
+    return all(str(chat_id) in delivered for chat_id in doc.get("recipients", []))
+
+async def settle_outbox_entry(doc):
+    """Kaydı teslim eder; sonuca göre teslim edildi / yeniden dene / başarısız olarak işaretler"""
+    try:
+        if await deliver_outbox_entry(doc):
+            mongo_collection.update_one({"_id": doc["_id"]}, {"$set": {"status": "delivered", "delivered_at": datetime.now()}})
+            print(f"✅ {doc['symbol']} → {doc['event']} bildirimi {len(doc.get('recipients', []))} sohbete teslim edildi")
+            return
+        
+        attempts = doc.get("attempts", 0) + 1
+        if attempts >= CONFIG["OUTBOX_MAX_ATTEMPTS"]:
+            mongo_collection.update_one({"_id": doc["_id"]}, {"$set": {"status": "failed", "attempts": attempts, "failed_at": datetime.now()}})
+            print(f"❌ {doc['symbol']} → {doc['event']} bildirimi {attempts} denemede teslim edilemedi, bırakıldı")
+            return
+        delay = random.uniform(0, min(CONFIG["OUTBOX_RETRY_MAX_SECONDS"], CONFIG["OUTBOX_RETRY_BASE_SECONDS"] * 2 ** attempts))
+        mongo_collection.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"attempts": attempts, "next_attempt_at": datetime.now() + timedelta(seconds=delay)}}
+        )
+        print(f"⚠️ {doc['symbol']} → {doc['event']} bildirimi eksik teslim edildi, {delay:.0f}s sonra tekrar denenecek ({attempts}/{CONFIG['OUTBOX_MAX_ATTEMPTS']})")
+    except Exception as e:
+        print(f"❌ {doc.get('symbol')} → bildirim teslimatı hatası: {e}")
+
+async def process_outbox_once():
+    """Zamanı gelmiş bekleyen bildirimleri öncelik ve oluşturulma sırasıyla teslimata başlatır.
+    Her kayıt kendi task'ında teslim edilir; uzun bir toplu gönderim yeni bir çıkış mesajını bekletmez."""
+    now = datetime.now()
+    due = list(mongo_collection.find(
+        {"_id": {"$regex": "^outbox_"}, "status": "pending", "next_attempt_at": {"$lte": now}}
+    ))
+    lane_rank = {lane: rank for rank, lane in enumerate(TELEGRAM_PRIORITY_LANES)}
+    due.sort(key=lambda doc: (lane_rank.get(doc.get("priority", "entry"), len(lane_rank)), doc["created_at"]))
+    for doc in due:
+        if doc["_id"] in outbox_inflight:
+            continue
+        task = asyncio.create_task(settle_outbox_entry(doc))
+        outbox_inflight[doc["_id"]] = task
+        task.add_done_callback(lambda _, key=doc["_id"]: outbox_inflight.pop(key, None))
     
-    for user_id in ALLOWED_USERS:
-        if str(user_id) not in sent_chats:
-            total_attempts += 1
+    # Eski teslim edilmiş / bırakılmış kayıtları temizle (idempotency anahtarları saklama süresi boyunca korunur).
+    # failed_at'ten önce bırakılmış kayıtlarda oluşturulma zamanı esas alınır.
+    cutoff = now - timedelta(hours=CONFIG["OUTBOX_RETENTION_HOURS"])
+    mongo_collection.delete_many({
+        "_id": {"$regex": "^outbox_"},
+        "$or": [
+            {"status": "delivered", "delivered_at": {"$lt": cutoff}},
+            {"status": "failed", "failed_at": {"$lt": cutoff}},
+            {"status": "failed", "failed_at": {"$exists": False}, "created_at": {"$lt": cutoff}},
+        ],
+    })
+
+async def outbox_sender_loop():
+    """Bildirim kuyruğunu teslim eden ayrı gönderici döngüsü"""
+    global outbox_wakeup
+    outbox_wakeup = asyncio.Event()
+    print("📮 Bildirim gönderici başlatıldı")
+    try:
+        while True:
+            outbox_wakeup.clear()
             try:
-                await send_telegram_message(message, user_id)
-                print(f"✅ Kullanıcıya sinyal gönderildi: {user_id}")
-                sent_chats.add(str(user_id))
-                success_count += 1
+                if mongo_collection is not None:
+                    await process_outbox_once()
             except Exception as e:
-                print(f"❌ Kullanıcıya sinyal gönderilemedi ({user_id}): {e}")
+                print(f"❌ Bildirim gönderici hatası: {e}")
+            try:
+                await asyncio.wait_for(outbox_wakeup.wait(), timeout=CONFIG["OUTBOX_POLL_SECONDS"])
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        for task in list(outbox_inflight.values()):
+            task.cancel()
+
+# ---------------------------------------------------------------------------
+# Canlı panel: isteyen sohbetlere tek bir sabitlenmiş mesaj gönderilir ve izleme
+# döngüsünün bellekteki fiyatlarıyla editMessageText üzerinden güncellenir.
+# Metin her turda bir kez oluşturulur; değişmeyen sohbet düzenlenmez, değişen
+# sohbet en fazla DASHBOARD_EDIT_INTERVAL_SECONDS'ta bir düzenlenir.
+dashboard_chats = {}  # {str(chat_id): {"chat_id", "message_id", "last_body", "last_edit", "retry_at"}}
+dashboard_stats = {"renders": 0, "edits": 0, "skipped_unchanged": 0, "coalesced": 0, "errors": 0}
+
+def load_dashboards_from_db():
+    """Kayıtlı panel mesajlarını (sohbet -> mesaj id) yükler"""
+    saved = load_data_from_db("dashboard_messages", {}) or {}
+    for key, entry in saved.items():
+        dashboard_chats[key] = {
+            "chat_id": entry["chat_id"],
+            "message_id": entry["message_id"],
+            "last_body": None,
+            "last_edit": 0.0,
+            "retry_at": 0.0,
+        }
+    if dashboard_chats:
+        print(f"📌 {len(dashboard_chats)} sohbette canlı panel yüklendi")
 
-    for group_id in BOT_OWNER_GROUPS:
-        if str(group_id) not in sent_chats:
-            total_attempts += 1
+def save_dashboards_to_db():
+    data = {key: {"chat_id": entry["chat_id"], "message_id": entry["message_id"]} for key, entry in dashboard_chats.items()}
+    save_data_to_db("dashboard_messages", data, "dashboard")
+
+def render_dashboard_body():
+    """Aktif pozisyonları izleme döngüsünün son fiyatlarıyla özetler (zaman damgası hariç)"""
+    if not active_signals:
+        return "Aktif pozisyon yok."
+    lines = []
+    for symbol in sorted(active_signals):
+        signal = active_signals[symbol]
+        entry_price = clean_price(signal.get('entry_price_float', signal.get('entry_price', 0)))
+        current_price = monitor_last_prices.get(symbol) or clean_price(signal.get('current_price_float', signal.get('current_price', 0)))
+        if entry_price <= 0 or current_price <= 0:
+            lines.append(f"🔹 <b>{symbol}</b> ({signal.get('type', '')}) - fiyat bekleniyor")
+            continue
+        is_short = str(signal.get('type', '')).upper() in ("SATIŞ", "SATIS", "SHORT")
+        change = (current_price - entry_price) / entry_price * 100
+        if is_short:
+            change = -change
+        leverage = signal.get('leverage', CONFIG["LEVERAGE"])
+        emoji = "🟢" if change >= 0 else "🔴"
+        lines.append(
+            f"{emoji} <b>{symbol}</b> ({signal.get('type', '')}) {format_price(current_price, entry_price)}\n"
+            f"   Giriş: {signal.get('entry_price')} | Hedef: {signal.get('target_price')} | Stop: {signal.get('stop_loss')}\n"
+            f"   Değişim: %{change:+.2f} ({leverage}x: %{change * leverage:+.1f})"
+        )
+    return "\n".join(lines)
+
+def render_dashboard_text(body):
+    return f"📌 <b>Canlı Pozisyon Paneli</b>\n\n{body}\n\n🕒 Son güncelleme: {datetime.now().strftime('%H:%M:%S')}"
+
+async def edit_dashboard_message(entry, text, send_limit=None):
+    """Panel mesajını düzenler -> (başarılı_mı, açıklama). Mesaj silinmişse veya bot
+    sohbetten çıkarılmışsa panel kaydı kaldırılır. send_limit yalnızca HTTP isteği sürerken tutulur."""
+    url = f"{TELEGRAM_API_BASE}/bot{TELEGRAM_TOKEN}/editMessageText"
+    data = {
+        'chat_id': entry["chat_id"],
+        'message_id': entry["message_id"],
+        'text': text,
+        'parse_mode': 'HTML',
+        'disable_web_page_preview': True
+    }
+    await acquire_telegram_slot(entry["chat_id"], "info")
+    async with send_limit or contextlib.nullcontext():
+        async with get_telegram_session().post(url, json=data, ssl=False) as response:
+            if response.status == 200:
+                return True, "ok"
             try:
-                await send_telegram_message(message, group_id)
-                print(f"✅ Gruba/Kanala sinyal gönderildi: {group_id}")
-                sent_chats.add(str(group_id))
-                success_count += 1
-            except Exception as e:
-                print(f"❌ Gruba/Kanala sinyal gönderilemedi ({group_id}): {e}")
+                body = await response.json(content_type=None)
+            except Exception:
+                body = {"description": await response.text()}
+    description = body.get('description', '')
+    if response.status == 429:
+        retry_after = float((body.get("parameters") or {}).get("retry_after", 1))
+        telegram_chat_next_send[str(entry["chat_id"])] = time.monotonic() + retry_after
+        entry["retry_at"] = time.monotonic() + retry_after
+        return False, f"429 - {description}"
+    if response.status == 400 and "message is not modified" in description:
+        return True, "değişmedi"
+    if response.status == 403 or (response.status == 400 and ("not found" in description or "can't be edited" in description)):
+        dashboard_chats.pop(str(entry["chat_id"]), None)
+        save_dashboards_to_db()
+        print(f"📌 Canlı panel kaldırıldı ({entry['chat_id']}): {description}")
+    return False, f"{response.status} - {description}"
+
+async def refresh_dashboards_once():
+    """Metni bir kez oluşturur ve değişen, aralığı dolmuş sohbetlerin düzenlemelerini topluca gönderir"""
+    if not dashboard_chats:
+        return 0
+    body = render_dashboard_body()
+    dashboard_stats["renders"] += 1
+    now = time.monotonic()
+    due = []
+    for entry in list(dashboard_chats.values()):
+        if entry["last_body"] == body:
+            dashboard_stats["skipped_unchanged"] += 1
+        elif now < entry["last_edit"] + CONFIG["DASHBOARD_EDIT_INTERVAL_SECONDS"] or now < entry["retry_at"]:
+            dashboard_stats["coalesced"] += 1
+        else:
+            due.append(entry)
+    if not due:
+        return 0
     
-    # En az bir başarılı gönderim varsa True döner
-    if success_count > 0:
-        print(f"✅ Toplam {success_count}/{total_attempts} gönderim başarılı")
-        return True
-    else:
-        print(f"❌ Hiçbir gönderim başarılı olmadı ({total_attempts} deneme)")
-        return False
+    text = render_dashboard_text(body)
+    semaphore = asyncio.Semaphore(CONFIG["TELEGRAM_BROADCAST_CONCURRENCY"])
+    
+    async def edit_one(entry):
+        try:
+            ok, detail = await edit_dashboard_message(entry, text, send_limit=semaphore)
+        except Exception as e:
+            ok, detail = False, str(e)
+        entry["last_edit"] = time.monotonic()
+        if ok:
+            entry["last_body"] = body
+            dashboard_stats["edits"] += 1
+        else:
+            dashboard_stats["errors"] += 1
+            print(f"⚠️ Canlı panel güncellenemedi ({entry['chat_id']}): {detail}")
+    
+    await asyncio.gather(*(edit_one(entry) for entry in due))
+    return len(due)
+
+async def dashboard_loop():
+    """Canlı panelleri güncelleyen döngü"""
+    load_dashboards_from_db()
+    while True:
+        try:
+            await refresh_dashboards_once()
+        except Exception as e:
+            print(f"❌ Canlı panel döngüsü hatası: {e}")
+        await asyncio.sleep(CONFIG["DASHBOARD_TICK_SECONDS"])
 
 async def help_command(update, context):
     if not update.effective_user:
@@ -1334,6 +2386,15 @@ async def help_command(update, context):
 /help - Bu yardım mesajını göster
 /stats - İstatistikleri göster
 /active - Aktif sinyalleri göster
+/dashboard - Canlı pozisyon panelini sabitle (/dashboard off ile kapat)
+/subscribe - Sinyal filtresi (all, long, short, majors = BTC/ETH veya sembol listesi)
+
+👤 **Yönetim Komutları:**
+/adduser <user_id> - Kullanıcıya sinyal izni ver
+/removeuser <user_id> - Kullanıcının iznini kaldır
+/looplag - Event loop gecikmesi ve bloklayan kod
+/profile [saniye] - Çalışan süreçten örnekleyici profil al (sadece bot sahibi)
+/memory [trace on|off] - Bellek raporu (RSS, sözlük boyutları, DataFrame, tracemalloc)
 
 🧹 **Temizleme Komutları:**
 /clearall - Tüm verileri temizle (pozisyonlar, önceki sinyaller, bekleyen kuyruklar, istatistikler)
@@ -1353,21 +2414,11 @@ async def help_command(update, context):
         print(f"❌ Özel mesaj gönderilemedi ({user_id}): {e}")
         await update.message.reply_text(help_text, parse_mode='Markdown')
 
-async def stats_command(update, context):
-    if not update.effective_user:
-        return
-    
-    user_id = update.effective_user.id
-    
-    if not is_admin(user_id):
-        return 
-    
-    # Önce veritabanından stats'ı yükle
-    stats = load_stats_from_db() or global_stats
-    
-    # Güncel aktif sinyal sayısını al (active_signals'dan)
-    current_active_signals = load_active_signals_from_db() or {}
-    current_active_count = len(current_active_signals)
+def render_stats_text(snapshot):
+    """/stats mesajını anlık görüntüden oluşturur"""
+    stats = snapshot["stats"] or global_stats
+    current_active_count = len(snapshot["active_signals"])
+    updated_at = (snapshot["updated_at"] or datetime.now()).strftime('%H:%M:%S')
     
     if not stats:
         stats_text = "📊 **Bot İstatistikleri:**\n\nHenüz istatistik verisi yok."
@@ -1399,22 +2450,62 @@ async def stats_command(update, context):
 • Toplam: ${stats.get('total_profit_loss', 0):.2f}
 • Başarı Oranı: %{success_rate:.1f}
 
-🕒 **Son Güncelleme:** {datetime.now().strftime('%H:%M:%S')}
+🕒 **Son Güncelleme:** {updated_at}
 {status_emoji} **Bot Durumu:** {status_text}"""
     
-    await update.message.reply_text(stats_text, parse_mode='Markdown')
+    return stats_text
 
-async def active_command(update, context):
-    """Aktif sinyaller komutu"""
+async def stats_command(update, context):
     if not update.effective_user:
         return
     
     user_id = update.effective_user.id
     
-    if user_id != BOT_OWNER_ID and user_id not in ALLOWED_USERS and user_id not in ADMIN_USERS:
-        return  # İzin verilmeyen kullanıcılar için hiçbir yanıt verme
+    if not is_admin(user_id):
+        return 
+    
+    # Döngülerin yayınladığı anlık görüntüden (MongoDB'ye gitmeden) yanıtla
+    stats_text = get_snapshot_text("stats", render_stats_text)
+    
+    await update.message.reply_text(stats_text, parse_mode='Markdown')
+
+async def looplag_command(update, context):
+    """Event loop gecikme yüzdelikleri ve son bloklamalar (admin)"""
+    user_id, is_authorized = validate_user_command(update, require_admin=True)
+    if not is_authorized:
+        return
     
-    active_signals = load_active_signals_from_db() or global_active_signals
+    percentiles = loop_lag_percentiles()
+    if not percentiles:
+        await send_command_response(update, "🐢 Event loop gecikme ölçümü henüz yok.", parse_mode=None)
+        return
+    
+    window_seconds = len(loop_lag_samples) * CONFIG["LOOP_LAG_INTERVAL_SECONDS"]
+    text = (f"🐢 Event Loop Gecikmesi (son ~{window_seconds / 60:.0f} dk, {len(loop_lag_samples)} ölçüm)\n\n"
+            f"• p50: {percentiles['0.5'] * 1000:.1f} ms\n"
+            f"• p95: {percentiles['0.95'] * 1000:.1f} ms\n"
+            f"• p99: {percentiles['0.99'] * 1000:.1f} ms\n"
+            f"• max: {percentiles['max'] * 1000:.0f} ms\n")
+    stalls = list(loop_stall_events)
+    if stalls:
+        by_location = {}
+        for event in stalls:
+            total = by_location.setdefault(event["location"], [0, 0.0])
+            total[0] += 1
+            total[1] += event["blocked_seconds"]
+        text += f"\n🧱 {CONFIG['LOOP_STALL_THRESHOLD_SECONDS']}s üzeri bloklamalar (son {len(stalls)}):\n"
+        for location, (count, seconds) in sorted(by_location.items(), key=lambda item: -item[1][1])[:5]:
+            text += f"• {location}: {count} kez, toplam {seconds:.1f}s\n"
+        last = stalls[-1]
+        text += f"\nSon bloklama ({last['started_at'].strftime('%H:%M:%S')}, {last['blocked_seconds']:.2f}s):\n"
+        text += "\n".join(f"  {line}" for line in last["stack"][-8:])
+    else:
+        text += "\n✅ Eşiği aşan bloklama kaydı yok."
+    await send_command_response(update, text, parse_mode=None)
+
+def render_active_text(snapshot):
+    """/active mesajını anlık görüntüden oluşturur"""
+    active_signals = snapshot["active_signals"]
     if not active_signals:
         active_text = "📈 **Aktif Sinyaller:**\n\nHenüz aktif sinyal yok."
     else:
@@ -1443,9 +2534,161 @@ async def active_command(update, context):
 • Sinyal: {formatted_time}
 
 """
+    return active_text
+
+async def active_command(update, context):
+    """Aktif sinyaller komutu"""
+    if not update.effective_user:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if user_id != BOT_OWNER_ID and user_id not in ALLOWED_USERS and user_id not in ADMIN_USERS:
+        return  # İzin verilmeyen kullanıcılar için hiçbir yanıt verme
+    
+    # Döngülerin yayınladığı anlık görüntüden (MongoDB'ye gitmeden) yanıtla
+    active_text = get_snapshot_text("active", render_active_text)
     
     await update.message.reply_text(active_text, parse_mode='Markdown')
 
+async def adduser_command(update, context):
+    """Kullanıcıya sinyal izni verir: /adduser <user_id>"""
+    user_id, is_authorized = validate_user_command(update, require_admin=True)
+    if not is_authorized:
+        return
+    
+    ok, error = validate_command_args(update, context, 1)
+    if not ok:
+        await send_command_response(update, error)
+        return
+    ok, new_user_id = validate_user_id(context.args[0])
+    if not ok:
+        await send_command_response(update, new_user_id)
+        return
+    
+    if new_user_id in ALLOWED_USERS:
+        await send_command_response(update, f"ℹ️ `{new_user_id}` zaten izinli kullanıcılar listesinde.")
+        return
+    ALLOWED_USERS.add(new_user_id)
+    save_allowed_users()
+    add_subscriber(new_user_id)
+    await send_command_response(update, f"✅ `{new_user_id}` izinli kullanıcılara eklendi.")
+
+async def removeuser_command(update, context):
+    """Kullanıcının sinyal iznini kaldırır: /removeuser <user_id>"""
+    user_id, is_authorized = validate_user_command(update, require_admin=True)
+    if not is_authorized:
+        return
+    
+    ok, error = validate_command_args(update, context, 1)
+    if not ok:
+        await send_command_response(update, error)
+        return
+    ok, removed_user_id = validate_user_id(context.args[0])
+    if not ok:
+        await send_command_response(update, removed_user_id)
+        return
+    
+    if removed_user_id not in ALLOWED_USERS:
+        await send_command_response(update, f"ℹ️ `{removed_user_id}` izinli kullanıcılar listesinde değil.")
+        return
+    ALLOWED_USERS.discard(removed_user_id)
+    save_allowed_users()
+    if removed_user_id not in BOT_OWNER_GROUPS:
+        remove_subscriber(removed_user_id)
+    await send_command_response(update, f"✅ `{removed_user_id}` izinli kullanıcılardan çıkarıldı.")
+
+def describe_subscription(subscription):
+    symbols = ", ".join(subscription["symbols"]) if subscription["symbols"] else "tümü"
+    side = {"all": "long + short", "long": "yalnızca long", "short": "yalnızca short"}[subscription["side"]]
+    majors = "evet" if subscription["majors_only"] else "hayır"
+    return f"• Semboller: {symbols}\n• Yön: {side}\n• Yalnızca büyük coinler (BTC/ETH): {majors}"
+
+async def subscribe_command(update, context):
+    """Sohbetin sinyal filtresi: /subscribe [all | long | short | majors | BTC ETH ...]"""
+    if not update.effective_user or not update.effective_chat:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if user_id != BOT_OWNER_ID and user_id not in ALLOWED_USERS and user_id not in ADMIN_USERS:
+        return  # İzin verilmeyen kullanıcılar için hiçbir yanıt verme
+    
+    chat_id = update.effective_chat.id
+    key = str(chat_id)
+    if key not in subscriber_filters:
+        await send_command_response(update, "ℹ️ Bu sohbet sinyal bildirimi almıyor.")
+        return
+    
+    if not context.args:
+        await send_command_response(update, f"📬 **Abonelik Filtresi:**\n\n{describe_subscription(subscriber_filters[key])}\n\nKullanım: /subscribe all | long | short | majors | BTC ETH ...")
+        return
+    
+    subscription = default_subscriber_filter(chat_id)
+    symbols = []
+    for arg in context.args:
+        token = arg.strip().upper()
+        if token == "ALL":
+            continue
+        elif token in ("LONG", "SHORT"):
+            subscription["side"] = token.lower()
+        elif token in ("MAJORS", "MAJOR"):
+            subscription["majors_only"] = True
+        elif re.fullmatch(r"[A-Z0-9]{2,20}", token):
+            symbols.append(token if token.endswith("USDT") else f"{token}USDT")
+        else:
+            await send_command_response(update, f"❌ Geçersiz filtre: {arg}")
+            return
+    subscription["symbols"] = sorted(set(symbols)) or None
+    if subscription["symbols"] and subscription["majors_only"] and not _subscriber_scopes(subscription):
+        await send_command_response(update, "❌ Seçilen sembollerin hiçbiri büyük coin listesinde değil.")
+        return
+    
+    add_subscriber(chat_id, subscription)
+    save_subscriber_filters()
+    await send_command_response(update, f"✅ **Abonelik güncellendi:**\n\n{describe_subscription(subscription)}")
+
+async def dashboard_command(update, context):
+    """Canlı panel komutu: /dashboard (aç) veya /dashboard off (kapat)"""
+    if not update.effective_user or not update.effective_chat:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if user_id != BOT_OWNER_ID and user_id not in ALLOWED_USERS and user_id not in ADMIN_USERS:
+        return  # İzin verilmeyen kullanıcılar için hiçbir yanıt verme
+    
+    chat_id = update.effective_chat.id
+    key = str(chat_id)
+    turn_off = bool(context.args) and context.args[0].lower() in ("off", "kapat", "stop")
+    existing = dashboard_chats.pop(key, None)
+    if existing:
+        save_dashboards_to_db()
+        try:
+            await context.bot.unpin_chat_message(chat_id=chat_id, message_id=existing["message_id"])
+        except Exception as e:
+            print(f"⚠️ Panel sabitlemesi kaldırılamadı ({chat_id}): {e}")
+    if turn_off:
+        await send_command_response(update, "📌 Canlı panel kapatıldı." if existing else "📌 Bu sohbette açık bir canlı panel yok.")
+        return
+    
+    body = render_dashboard_body()
+    await acquire_telegram_slot(chat_id, "info")
+    message = await context.bot.send_message(chat_id=chat_id, text=render_dashboard_text(body), parse_mode='HTML')
+    try:
+        await context.bot.pin_chat_message(chat_id=chat_id, message_id=message.message_id, disable_notification=True)
+    except Exception as e:
+        print(f"⚠️ Panel mesajı sabitlenemedi ({chat_id}): {e}")
+    dashboard_chats[key] = {
+        "chat_id": chat_id,
+        "message_id": message.message_id,
+        "last_body": body,
+        "last_edit": time.monotonic(),
+        "retry_at": 0.0,
+    }
+    save_dashboards_to_db()
+    print(f"📌 Canlı panel açıldı: {chat_id} (mesaj {message.message_id})")
+
 async def error_handler(update, context):
     """Hata handler'ı"""
     error = context.error
@@ -1497,6 +2740,7 @@ async def handle_all_messages(update, context):
                 BOT_OWNER_GROUPS.add(chat.id)
                 print(f"✅ Kanal eklendi: {chat.title} ({chat.id})")
                 save_admin_groups()
+                add_subscriber(chat.id)
             return
         
         # Eğer bu bir grup mesajıysa ve bot ekleme olayıysa
@@ -1542,6 +2786,7 @@ async def handle_chat_member_update(update, context):
                     print(f"🔍 BOT_OWNER_GROUPS güncellendi: {BOT_OWNER_GROUPS}")
                     
                     save_admin_groups()
+                    add_subscriber(chat.id)
     
     # Üye çıkma durumu
     elif update.message and update.message.left_chat_member:
@@ -1552,6 +2797,7 @@ async def handle_chat_member_update(update, context):
                 chat_type = "kanalından" if chat.type == "channel" else "grubundan"
                 print(f"Bot {chat.title} {chat_type} çıkarıldı. Chat ID: {chat.id} izin verilen gruplardan kaldırıldı.")
                 save_admin_groups()
+                remove_subscriber(chat.id)
             else:
                 chat_type = "kanalından" if chat.type == "channel" else "grubundan"
                 print(f"Bot {chat.title} {chat_type} çıkarıldı.")
@@ -1574,8 +2820,15 @@ async def setup_bot():
     app.add_handler(CommandHandler("help", help_command))
     app.add_handler(CommandHandler("stats", stats_command))
     app.add_handler(CommandHandler("active", active_command))
+    app.add_handler(CommandHandler("dashboard", dashboard_command))
+    app.add_handler(CommandHandler("subscribe", subscribe_command))
+    app.add_handler(CommandHandler("adduser", adduser_command))
+    app.add_handler(CommandHandler("removeuser", removeuser_command))
+    app.add_handler(CommandHandler("looplag", looplag_command))
     app.add_handler(CommandHandler("clearall", clear_all_command))
     app.add_handler(CommandHandler("reducecooldowns", reduce_cooldowns_command))
+    app.add_handler(CommandHandler("profile", profile_command))
+    app.add_handler(CommandHandler("memory", memory_command))
     
     # Grup ekleme/çıkarma handler'ı - ChatMemberUpdated event'ini dinle
     app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, handle_chat_member_update))
@@ -1862,38 +3115,381 @@ def create_signal_message_new_55(symbol, price, all_timeframes_signals, volume,
 
     return message, dominant_signal, target_price, stop_loss, stop_loss_str, leverage, None
 
+OHLCV_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+class CandleSeries:
+    """
+    (sembol, aralık) için sabit kapasiteli halka tampon: açılış zamanı (int64) + OHLCV (float64).
+    Her mum tamponun iki yarısına birden yazılır; böylece son N mum her zaman tek parça
+    (kopyasız) bir görünümdür. Ekleme ve oluşan mumu güncelleme O(1)'dir.
+    Bellek: kapasite × 2 × (8 + 5 × 8) = kapasite × 96 bayt.
+    """
+    __slots__ = ('symbol', 'interval', 'capacity', 'open_time', 'ohlcv', 'head', 'length')
+
+    def __init__(self, symbol, interval, capacity):
+        self.symbol = symbol
+        self.interval = interval
+        self.capacity = capacity
+        self.open_time = np.zeros(2 * capacity, dtype=np.int64)
+        self.ohlcv = np.zeros((len(OHLCV_FIELDS), 2 * capacity), dtype=np.float64)
+        self.head = 0  # Bir sonraki yazma konumu (0..capacity-1)
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def nbytes(self):
+        return self.open_time.nbytes + self.ohlcv.nbytes
+
+    @property
+    def last_open_time(self):
+        return int(self.open_time[self.head - 1 + (self.capacity if self.head == 0 else 0)]) if self.length else None
+
+    def _write(self, pos, open_time, values):
+        for idx in (pos, pos + self.capacity):
+            self.open_time[idx] = open_time
+            self.ohlcv[:, idx] = values
+
+    def append(self, open_time, values):
+        """Yeni mum ekler (kapasite doluysa en eskisinin üzerine yazar)"""
+        self._write(self.head, open_time, values)
+        self.head = (self.head + 1) % self.capacity
+        self.length = min(self.length + 1, self.capacity)
+
+    def upsert(self, open_time, values):
+        """Aynı açılış zamanlı mumu günceller, daha yeniyse ekler, daha eskiyse yok sayar"""
+        last_open = self.last_open_time
+        if last_open is None or open_time > last_open:
+            self.append(open_time, values)
+        elif open_time == last_open:
+            self._write((self.head - 1) % self.capacity, open_time, values)
+
+    def view(self, lookback=None):
+        """Son lookback mumun (açılış zamanı, OHLCV) kopyasız görünümünü döndürür"""
+        count = self.length if lookback is None else min(lookback, self.length)
+        end = (self.head - 1) % self.capacity + 1
+        if end < count:
+            end += self.capacity
+        return self.open_time[end - count:end], self.ohlcv[:, end - count:end]
+
+    def to_frame(self, lookback=None):
+        """Son lookback mumu hesaplama için DataFrame olarak döndürür"""
+        return candle_arrays_to_dataframe(*self.view(lookback))
+
+    @classmethod
+    def from_klines(cls, symbol, interval, klines, capacity):
+        """REST kline listesinden yeni seri oluşturur"""
+        series = cls(symbol, interval, capacity)
+        open_time, ohlcv = parse_klines(klines[-capacity:])
+        for idx in range(len(open_time)):
+            series.append(open_time[idx], ohlcv[:, idx])
+        return series
+
+def parse_klines(klines):
+    """Binance kline listesinden (açılış zamanı, OHLCV) dizilerini çıkarır"""
+    open_time = np.fromiter((k[0] for k in klines), dtype=np.int64, count=len(klines))
+    ohlcv = np.array([k[1:6] for k in klines], dtype=np.float64).reshape(len(klines), len(OHLCV_FIELDS)).T
+    return open_time, ohlcv
+
+def candle_arrays_to_dataframe(open_time, ohlcv):
+    """Açılış zamanı ve OHLCV dizilerinden DataFrame oluşturur (sözlükten kurulduğu için veriler kopyalanır)"""
+    data = {'timestamp': pd.to_datetime(open_time, unit='ms')}
+    for field, column in enumerate(OHLCV_FIELDS):
+        data[column] = ohlcv[field]
+    return pd.DataFrame(data)
+
+@metric_timed("scan_stage_seconds", stage="decode")
+def klines_to_dataframe(klines):
+    """Binance kline listesini DataFrame'e çevirir (sadece açılış zamanı + OHLCV)"""
+    return candle_arrays_to_dataframe(*parse_klines(klines))
+
+binance_session = None
+
+def get_binance_session():
+    """Binance REST mum istekleri için tek, havuzlu HTTP oturumu (ilk kullanımda oluşturulur)"""
+    global binance_session
+    if binance_session is None or binance_session.closed:
+        connector = aiohttp.TCPConnector(limit=50, ttl_dns_cache=300, keepalive_timeout=30)
+        binance_session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30, connect=10))
+    return binance_session
+
+async def close_binance_session():
+    global binance_session
+    if binance_session is not None and not binance_session.closed:
+        await binance_session.close()
+    binance_session = None
+
+async def fetch_klines_rest(symbol, interval, lookback):
+    """Binance Futures REST'ten ham kline listesini çeker - retry mekanizması ile"""
+    url = f"{CONFIG['FAPI_HOSTS'][0]}/fapi/v1/klines?symbol={symbol}&interval={interval}&limit={lookback}"
+    
+    try:
+        # Retry mekanizması ile API isteği (bağlantılar ortak oturumda yeniden kullanılır)
+        klines = await api_request_with_retry(get_binance_session(), url, ssl=False, max_retries=CONFIG["API_RETRY_ATTEMPTS"])
+        
+        if not klines or len(klines) == 0:
+            raise Exception(f"{symbol} için futures veri yok")
+    except (ScanDeadlineExceeded, CircuitOpenError):
+        raise
+    except Exception as e:
+        raise Exception(f"Futures veri çekme hatası: {symbol} - {interval} - {str(e)}")
+    return klines
+
 async def async_get_historical_data(symbol, interval, lookback):
-    """Binance Futures'den geçmiş verileri asenkron çek - retry mekanizması ile"""
+    """Binance Futures'den geçmiş verileri asenkron çek - önce canlı mum deposu, sonra REST"""
     if not symbol.endswith('USDT'):
         symbol = symbol + 'USDT'
     
-    url = f"https://fapi.binance.com/fapi/v1/klines?symbol={symbol}&interval={interval}&limit={lookback}"
+    if CONFIG["WS_CANDLE_STORE_ENABLED"]:
+        df = get_store_frame(symbol, interval, lookback)
+        if df is not None:
+            return df
     
-    # Retry mekanizması ile API isteği
-    connector = aiohttp.TCPConnector(limit=10, limit_per_host=5, ttl_dns_cache=300)
-    timeout = aiohttp.ClientTimeout(total=30, connect=10)
-    
-    try:
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            klines = await api_request_with_retry(session, url, ssl=False, max_retries=CONFIG["API_RETRY_ATTEMPTS"])
-            
-            if not klines or len(klines) == 0:
-                raise Exception(f"{symbol} için futures veri yok")
+    return klines_to_dataframe(await fetch_klines_rest(symbol, interval, lookback))
+
+# ---------------------------------------------------------------------------
+# Canlı mum deposu (WebSocket kline akışları)
+# Tarama evrenindeki her (sembol, aralık) için son MAX_KLINE_LOOKBACK mum bellekte
+# tutulur. Akışlar birden fazla birleşik bağlantıya dağıtılır; bağlantı koptuğunda
+# veya mum atlandığında eksik kısım REST ile doldurulur.
+# ---------------------------------------------------------------------------
+
+candle_store = {}  # {(symbol, interval): CandleSeries}
+candle_store_ready = set()  # REST ile doldurulmuş ve canlı akışı sağlıklı anahtarlar
+candle_store_full_history = set()  # Binance'teki tüm geçmişi MAX_KLINE_LOOKBACK'ten kısa olan anahtarlar
+candle_store_backfills = {}  # {(symbol, interval): Task} - devam eden doldurma işleri
+kline_stream_connections = []  # [{"streams": set, "ws": ws, "task": Task, "last_message_ts": float, "id": int}]
+candle_store_stats = {"messages": 0, "store_hits": 0, "store_misses": 0, "backfills": 0, "reconnects": 0}
+candle_backfill_limiter = {"semaphore": None, "tokens": None, "updated_at": 0.0}  # eşzamanlılık + ağırlık bütçesi
+
+def kline_stream_name(symbol, interval):
+    """Binance kline akış adını üretir"""
+    return f"{symbol.lower()}@kline_{interval}"
+
+def _kline_connection_healthy(key):
+    """Anahtarın bağlı olduğu WebSocket bağlantısı canlı mı kontrol eder"""
+    stream = kline_stream_name(*key)
+    for conn in kline_stream_connections:
+        if stream in conn["streams"]:
+            return conn["ws"] is not None and time.time() - conn["last_message_ts"] < CONFIG["WS_STALE_SECONDS"]
+    return False
+
+def get_store_frame(symbol, interval, lookback):
+    """Depoda yeterli ve güncel mum varsa son lookback mumu DataFrame olarak döndürür, yoksa None"""
+    key = (symbol, interval)
+    series = candle_store.get(key)
+    enough_rows = series is not None and (len(series) >= min(lookback, CONFIG["MAX_KLINE_LOOKBACK"]) or key in candle_store_full_history)
+    if key not in candle_store_ready or not enough_rows or not _kline_connection_healthy(key):
+        candle_store_stats["store_misses"] += 1
+        return None
+    candle_store_stats["store_hits"] += 1
+    return series.to_frame(lookback)
+
+def _merge_klines(key, klines):
+    """REST'ten gelen mumları depodaki mumlarla birleştirir"""
+    capacity = CONFIG["MAX_KLINE_LOOKBACK"]
+    live_series = candle_store.get(key)
+    if live_series is None:
+        candle_store[key] = CandleSeries.from_klines(key[0], key[1], klines, capacity)
+        return
+    open_times, ohlcv = live_series.view()
+    rest_open_time, rest_ohlcv = parse_klines(klines)
+    merged = CandleSeries(key[0], key[1], capacity)
+    # Boşluk doldurmada REST aralığından eski mumlar korunur
+    for idx in np.flatnonzero(open_times < rest_open_time[0]):
+        merged.append(int(open_times[idx]), ohlcv[:, idx])
+    for idx in range(len(rest_open_time)):
+        merged.append(int(rest_open_time[idx]), rest_ohlcv[:, idx])
+    # REST isteği sürerken akıştan gelen (son REST mumu ve sonrası) güncellemeleri koru
+    for idx in np.flatnonzero(open_times >= merged.last_open_time):
+        merged.upsert(int(open_times[idx]), ohlcv[:, idx])
+    candle_store[key] = merged
+
+def _backfill_lookback(key):
+    """Doldurmada istenecek mum sayısı: dolu seride sadece ilk boşluktan (veya son mumdan) bugüne kadarki mumlar"""
+    series = candle_store.get(key)
+    interval_seconds = TIMEFRAME_SECONDS.get(key[1])
+    if interval_seconds is None or series is None or (len(series) < CONFIG["MAX_KLINE_LOOKBACK"] and key not in candle_store_full_history):
+        return CONFIG["MAX_KLINE_LOOKBACK"]
+    open_times, _ = series.view()
+    interval_ms = interval_seconds * 1000
+    gaps = np.flatnonzero(np.diff(open_times) > interval_ms)
+    gap_start = int(open_times[gaps[0]] if len(gaps) else open_times[-1])
+    missing = (int(time.time() * 1000) - gap_start) // interval_ms + 2
+    return int(min(max(missing, 2), CONFIG["MAX_KLINE_LOOKBACK"]))
+
+async def _acquire_backfill_weight(weight):
+    """Doldurma isteklerini dakikalık ağırlık bütçesiyle sınırlar (jeton kovası, en fazla ~10 sn'lik birikim)"""
+    limiter = candle_backfill_limiter
+    rate = CONFIG["WS_BACKFILL_WEIGHT_PER_MINUTE"] / 60
+    burst = max(rate * 10, weight)
+    while True:
+        now = time.monotonic()
+        tokens = burst if limiter["tokens"] is None else min(burst, limiter["tokens"] + (now - limiter["updated_at"]) * rate)
+        limiter["updated_at"] = now
+        if tokens >= weight:
+            limiter["tokens"] = tokens - weight
+            return
+        limiter["tokens"] = tokens
+        await asyncio.sleep((weight - tokens) / rate)
+
+async def _backfill_candles(key):
+    """Anahtarın mumlarını REST ile doldurur ve depoyu hazır işaretler.
+    Yeniden bağlanmada tüm akışlar aynı anda doldurulacağı için istekler WS_BACKFILL_CONCURRENCY
+    ve WS_BACKFILL_WEIGHT_PER_MINUTE ile sınırlanır; dolu serilerde sadece eksik mumlar istenir."""
+    symbol, interval = key
+    limiter = candle_backfill_limiter
+    if limiter["semaphore"] is None:
+        limiter["semaphore"] = asyncio.Semaphore(CONFIG["WS_BACKFILL_CONCURRENCY"])
+    try:
+        async with limiter["semaphore"]:
+            lookback = _backfill_lookback(key)
+            await _acquire_backfill_weight(binance_request_weight(f"/fapi/v1/klines?limit={lookback}"))
+            klines = await fetch_klines_rest(symbol, interval, lookback)
+        _merge_klines(key, klines)
+        if lookback == CONFIG["MAX_KLINE_LOOKBACK"] and len(klines) < lookback:
+            candle_store_full_history.add(key)
+        candle_store_ready.add(key)
+        candle_store_stats["backfills"] += 1
     except Exception as e:
-        raise Exception(f"Futures veri çekme hatası: {symbol} - {interval} - {str(e)}")
-    
-    df = pd.DataFrame(klines, columns=[
-        'timestamp', 'open', 'high', 'low', 'close', 'volume',
-        'close_time', 'quote_volume', 'trades', 'taker_buy_base',
-        'taker_buy_quote', 'ignored'
-    ])
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df['close'] = df['close'].astype(float)
-    df['high'] = df['high'].astype(float)
-    df['low'] = df['low'].astype(float)
-    df['volume'] = df['volume'].astype(float)
-    df['open'] = df['open'].astype(float)
-    return df
+        print(f"⚠️ {symbol} {interval} mum deposu doldurma hatası: {e}")
+    finally:
+        candle_store_backfills.pop(key, None)
+
+def schedule_candle_backfill(key):
+    """Anahtar için (zaten yoksa) REST doldurma işi başlatır"""
+    candle_store_ready.discard(key)
+    if key not in candle_store_backfills:
+        candle_store_backfills[key] = create_background_task(_backfill_candles(key))
+
+def apply_kline_event(kline):
+    """Akıştan gelen kline olayını depoya uygular; atlanan mum varsa doldurma başlatır"""
+    key = (kline['s'], kline['i'])
+    open_time = int(kline['t'])
+    values = (float(kline['o']), float(kline['h']), float(kline['l']), float(kline['c']), float(kline['v']))
+    series = candle_store.get(key)
+    if series is None:
+        # Sadece doldurulmakta olan anahtarlar için yeni depo aç (abonelikten çıkanları yok say)
+        if key in candle_store_backfills:
+            series = candle_store[key] = CandleSeries(key[0], key[1], CONFIG["MAX_KLINE_LOOKBACK"])
+            series.append(open_time, values)
+        return
+    last_open = series.last_open_time
+    series.upsert(open_time, values)
+    if open_time - last_open > TIMEFRAME_SECONDS[kline['i']] * 1000 and key in candle_store_ready:
+        print(f"⚠️ {key[0]} {key[1]} mum atlandı, REST ile dolduruluyor")
+        schedule_candle_backfill(key)
+
+async def _send_kline_subscription(conn, method, streams):
+    """SUBSCRIBE/UNSUBSCRIBE mesajlarını parça parça gönderir"""
+    streams = sorted(streams)
+    batch_size = CONFIG["WS_SUBSCRIBE_BATCH_SIZE"]
+    for start in range(0, len(streams), batch_size):
+        if conn["ws"] is None:
+            return
+        conn["request_id"] += 1
+        await conn["ws"].send_json({"method": method, "params": streams[start:start + batch_size], "id": conn["request_id"]})
+        await asyncio.sleep(CONFIG["WS_SUBSCRIBE_INTERVAL_SECONDS"])
+
+def _stream_key(stream):
+    """Akış adından depo anahtarını üretir"""
+    symbol, interval = stream.split('@kline_')
+    return symbol.upper(), interval
+
+async def _kline_stream_worker(conn):
+    """Bir birleşik akış bağlantısını yönetir: bağlan, abone ol, doldur, mesajları işle, koparsa yeniden bağlan"""
+    attempt = 0
+    while True:
+        try:
+            timeout = aiohttp.ClientTimeout(total=None, connect=10)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.ws_connect(CONFIG["WS_KLINE_BASE_URL"], heartbeat=CONFIG["WS_STALE_SECONDS"] / 2, ssl=False) as ws:
+                    conn["ws"] = ws
+                    conn["last_message_ts"] = time.time()
+                    attempt = 0
+                    print(f"🔌 Kline akış bağlantısı #{conn['id']} kuruldu ({len(conn['streams'])} akış)")
+                    await _send_kline_subscription(conn, "SUBSCRIBE", conn["streams"])
+                    # Bağlantı yeni kurulduğu için aradaki boşluk REST ile doldurulur
+                    for stream in list(conn["streams"]):
+                        schedule_candle_backfill(_stream_key(stream))
+
+                    while True:
+                        msg = await ws.receive(timeout=CONFIG["WS_STALE_SECONDS"])
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            conn["last_message_ts"] = time.time()
+                            data = json.loads(msg.data)
+                            if 'data' in data and data['data'].get('e') == 'kline':
+                                candle_store_stats["messages"] += 1
+                                apply_kline_event(data['data']['k'])
+                        elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+        except asyncio.CancelledError:
+            conn["ws"] = None
+            raise
+        except Exception as e:
+            print(f"⚠️ Kline akış bağlantısı #{conn['id']} hatası: {e}")
+
+        conn["ws"] = None
+        for stream in conn["streams"]:
+            candle_store_ready.discard(_stream_key(stream))
+        candle_store_stats["reconnects"] += 1
+        delays = CONFIG["WS_RECONNECT_DELAYS"]
+        delay = delays[min(attempt, len(delays) - 1)]
+        attempt += 1
+        print(f"🔄 Kline akış bağlantısı #{conn['id']} {delay} saniye sonra yeniden kurulacak")
+        await asyncio.sleep(delay)
+
+async def update_candle_store_universe(symbols, intervals):
+    """Tarama evreni değiştiğinde akış aboneliklerini günceller (abone ol / aboneliği bırak)"""
+    desired = {kline_stream_name(symbol, interval) for symbol in symbols for interval in intervals}
+    current = set().union(*(conn["streams"] for conn in kline_stream_connections))
+
+    removed = current - desired
+    for conn in kline_stream_connections:
+        dropped = conn["streams"] & removed
+        if dropped:
+            conn["streams"] -= dropped
+            await _send_kline_subscription(conn, "UNSUBSCRIBE", dropped)
+    for stream in removed:
+        key = _stream_key(stream)
+        candle_store.pop(key, None)
+        candle_store_ready.discard(key)
+        candle_store_full_history.discard(key)
+
+    added = sorted(desired - current)
+    max_streams = CONFIG["WS_MAX_STREAMS_PER_CONNECTION"]
+    for conn in kline_stream_connections:
+        if not added:
+            break
+        free = max_streams - len(conn["streams"])
+        if free <= 0:
+            continue
+        chunk, added = added[:free], added[free:]
+        conn["streams"].update(chunk)
+        if conn["ws"] is not None:
+            await _send_kline_subscription(conn, "SUBSCRIBE", chunk)
+            for stream in chunk:
+                schedule_candle_backfill(_stream_key(stream))
+    while added:
+        chunk, added = added[:max_streams], added[max_streams:]
+        conn = {"id": len(kline_stream_connections) + 1, "streams": set(chunk), "ws": None, "last_message_ts": 0.0, "request_id": 0}
+        conn["task"] = create_background_task(_kline_stream_worker(conn))
+        kline_stream_connections.append(conn)
+
+    if removed or desired - current:
+        print(f"📡 Mum deposu evreni güncellendi: {len(desired)} akış, {len(kline_stream_connections)} bağlantı (+{len(desired - current)} / -{len(removed)})")
+
+async def stop_candle_store():
+    """Tüm kline akış bağlantılarını kapatır"""
+    tasks = [conn["task"] for conn in kline_stream_connections] + list(candle_store_backfills.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    kline_stream_connections.clear()
+    candle_store_backfills.clear()
+    candle_store_ready.clear()
+    candle_backfill_limiter.update(semaphore=None, tokens=None)
 
 async def fetch_futures_exchange_info():
     """Non-blocking fetch of Binance Futures exchangeInfo."""
@@ -1903,142 +3499,254 @@ async def fetch_futures_exchange_info():
     async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
         return await api_request_with_retry(session, url, ssl=False)
 
-async def fetch_futures_24h(symbol=None):
-    """Non-blocking fetch of 24h stats. If symbol is None, returns list for all symbols."""
-    base = "https://fapi.binance.com/fapi/v1/ticker/24hr"
-    url = f"{base}?symbol={symbol}" if symbol else base
-    connector = aiohttp.TCPConnector(limit=40)
-    timeout = aiohttp.ClientTimeout(total=20)
-    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-        return await api_request_with_retry(session, url, ssl=False)
+fapi_host_latency = {}  # {host: deque(saniye)} - başarılı/başarısız isteklerin süresi
+hedge_stats = {"requests": 0, "hedged": 0, "hedge_wins": 0}
 
+def record_host_latency(host, seconds):
+    samples = fapi_host_latency.get(host)
+    if samples is None:
+        samples = fapi_host_latency[host] = deque(maxlen=CONFIG["HEDGE_LATENCY_SAMPLES"])
+    samples.append(seconds)
+
+def host_latency_quantile(host, q):
+    """Host'un son ölçümlerinden gecikme yüzdeliği (ölçüm yoksa None)"""
+    samples = fapi_host_latency.get(host)
+    if not samples:
+        return None
+    return float(np.quantile(np.fromiter(samples, dtype=float), q))
+
+def rank_fapi_hosts():
+    """Host'ları medyan gecikmeye göre sıralar; ölçülmemiş host varsayılan gecikmeyle yarışır"""
+    def median_latency(host):
+        median = host_latency_quantile(host, 0.5)
+        return CONFIG["HEDGE_DEFAULT_DELAY_SECONDS"] if median is None else median
+    return sorted(CONFIG["FAPI_HOSTS"], key=median_latency)
+
+def hedge_delay(host):
+    """Yedek isteğin gönderileceği gecikme: birincil host'un p95'i"""
+    samples = fapi_host_latency.get(host)
+    if not samples or len(samples) < CONFIG["HEDGE_MIN_SAMPLES"]:
+        return CONFIG["HEDGE_DEFAULT_DELAY_SECONDS"]
+    return max(CONFIG["HEDGE_MIN_DELAY_SECONDS"], host_latency_quantile(host, CONFIG["HEDGE_DELAY_PERCENTILE"]))
+
+async def _timed_fapi_request(session, host, path, max_retries):
+    started = time.monotonic()
+    try:
+        data = await api_request_with_retry(session, host + path, ssl=False, max_retries=max_retries)
+    except asyncio.CancelledError:
+        # Yarışı kaybeden istek: geçen süre gecikmenin alt sınırıdır
+        record_host_latency(host, time.monotonic() - started)
+        raise
+    except Exception:
+        record_host_latency(host, time.monotonic() - started + CONFIG["HEDGE_FAILURE_PENALTY_SECONDS"])
+        raise
+    record_host_latency(host, time.monotonic() - started)
+    return data
+
+async def hedged_api_request(session, path, max_retries=None):
+    """Gecikmeye duyarlı istek: en hızlı host'a gönderir, p95 içinde yanıt gelmezse
+    ikinci host'a da gönderir ve ilk başarılı yanıtı döndürür"""
+    hedge_stats["requests"] += 1
+    if not CONFIG["HEDGED_REQUESTS_ENABLED"] or len(CONFIG["FAPI_HOSTS"]) < 2:
+        return await _timed_fapi_request(session, CONFIG["FAPI_HOSTS"][0], path, max_retries)
+    
+    # Devresi açık host'lar yarışa girmez; hepsi açıksa ilk host'un hatası yüzeye çıkar
+    hosts = [host for host in rank_fapi_hosts() if not circuit_is_open(host + path)]
+    if len(hosts) < 2:
+        return await _timed_fapi_request(session, hosts[0] if hosts else CONFIG["FAPI_HOSTS"][0], path, max_retries)
+    
+    primary = asyncio.create_task(_timed_fapi_request(session, hosts[0], path, max_retries))
+    done, _ = await asyncio.wait({primary}, timeout=hedge_delay(hosts[0]))
+    if done and primary.exception() is None:
+        return primary.result()
+    if done and isinstance(primary.exception(), FatalAPIError):
+        # 4xx isteğin kendisinden kaynaklanır - diğer host'ta da aynı yanıt döner
+        raise primary.exception()
+    
+    # Birincil yavaş ya da hata verdi: yedek host'a da gönder
+    hedge = asyncio.create_task(_timed_fapi_request(session, hosts[1], path, max_retries))
+    hedge_stats["hedged"] += 1
+    pending = {hedge} if done else {primary, hedge}
+    error = primary.exception() if done else None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        hedge_stats["hedge_wins"] += 1
+                    return task.result()
+                if isinstance(task.exception(), FatalAPIError):
+                    raise task.exception()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def fetch_futures_24h(symbol=None, hedged=False, session=None):
+    """Non-blocking fetch of 24h stats. If symbol is None, returns list for all symbols.
+    hedged=True: gecikmeye duyarlı tek sembol istekleri için host'lar arası hedge.
+    session verilirse o oturum kullanılır (izleme döngüsünün kalıcı oturumu)."""
+    path = "/fapi/v1/ticker/24hr"
+    if symbol:
+        path = f"{path}?symbol={symbol}"
+    if session is None:
+        connector = aiohttp.TCPConnector(limit=40)
+        timeout = aiohttp.ClientTimeout(total=20)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            return await fetch_futures_24h(symbol, hedged, session)
+    if hedged and symbol:
+        return await hedged_api_request(session, path)
+    return await api_request_with_retry(session, "https://fapi.binance.com" + path, ssl=False)
+
+monitor_session = None
+
+def get_monitor_session():
+    """İzleme döngüsünün ticker/mum istekleri için kalıcı HTTP oturumu: her kontrolde yeni
+    bağlantı (TCP + TLS el sıkışması) açılmaz, host başına keep-alive bağlantılar yeniden kullanılır"""
+    global monitor_session
+    if monitor_session is None or monitor_session.closed:
+        connector = aiohttp.TCPConnector(limit=20, ttl_dns_cache=300, keepalive_timeout=30)
+        monitor_session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=20, connect=10))
+    return monitor_session
+
+async def close_monitor_session():
+    global monitor_session
+    if monitor_session is not None and not monitor_session.closed:
+        await monitor_session.close()
+    monitor_session = None
+
+# Zaman dilimine göre Pine parametreleri (pine.txt ile birebir)
+PINE_TIMEFRAME_PARAMS = {
+    '1w': {"rsi_length": 28, "macd_fast": 18, "macd_slow": 36, "macd_signal": 12, "short_ma_period": 30, "long_ma_period": 150,
+           "mfi_length": 25, "fib_lookback": 150, "atr_period": 7, "volume_multiplier": 0.15, "supertrend_divisor": 2},
+    '1d': {"rsi_length": 21, "macd_fast": 13, "macd_slow": 26, "macd_signal": 10, "short_ma_period": 20, "long_ma_period": 100,
+           "mfi_length": 20, "fib_lookback": 100, "atr_period": 7, "volume_multiplier": 0.15, "supertrend_divisor": 1.2},
+    '4h': {"rsi_length": 18, "macd_fast": 11, "macd_slow": 22, "macd_signal": 8, "short_ma_period": 12, "long_ma_period": 60,
+           "mfi_length": 16, "fib_lookback": 70, "atr_period": 7, "volume_multiplier": 0.15, "supertrend_divisor": 1.3},
+    '2h': {"rsi_length": 16, "macd_fast": 10, "macd_slow": 21, "macd_signal": 8, "short_ma_period": 10, "long_ma_period": 55,
+           "mfi_length": 15, "fib_lookback": 60, "atr_period": 8, "volume_multiplier": 0.25, "supertrend_divisor": 1.4},
+    '1h': {"rsi_length": 15, "macd_fast": 10, "macd_slow": 20, "macd_signal": 9, "short_ma_period": 9, "long_ma_period": 50,
+           "mfi_length": 14, "fib_lookback": 50, "atr_period": 9, "volume_multiplier": 0.35, "supertrend_divisor": 1.45},
+    '30m': {"rsi_length": 14, "macd_fast": 10, "macd_slow": 20, "macd_signal": 9, "short_ma_period": 9, "long_ma_period": 50,
+            "mfi_length": 14, "fib_lookback": 50, "atr_period": 10, "volume_multiplier": 0.4, "supertrend_divisor": 1.5},
+    '15m': {"rsi_length": 14, "macd_fast": 10, "macd_slow": 20, "macd_signal": 9, "short_ma_period": 9, "long_ma_period": 50,
+            "mfi_length": 14, "fib_lookback": 50, "atr_period": 10, "volume_multiplier": 0.4, "supertrend_divisor": 1.5},
+    '8h': {"rsi_length": 17, "macd_fast": 10, "macd_slow": 21, "macd_signal": 8, "short_ma_period": 11, "long_ma_period": 65,
+           "mfi_length": 16, "fib_lookback": 80, "atr_period": 8, "volume_multiplier": 0.2, "supertrend_divisor": 1.35},
+}
+PINE_DEFAULT_PARAMS = PINE_TIMEFRAME_PARAMS['15m']
+PINE_TREND_EMA_PERIOD = 200
+PINE_VOLUME_MA_PERIOD = 20
+PINE_SUPERTREND_SMA_PERIOD = 5
+
+def get_pine_timeframe_params(timeframe):
+    """Zaman dilimine ait indikatör parametrelerini döndürür"""
+    params = dict(PINE_TIMEFRAME_PARAMS.get(timeframe, PINE_DEFAULT_PARAMS))
+    params["rsi_overbought"] = 60
+    params["rsi_oversold"] = 40
+    return params
+
+def _ema_convergence_bars(alpha, tolerance):
+    """adjust=False EMA'da başlangıç değerinin ağırlığının tolerance altına inmesi için gereken mum sayısı"""
+    return int(math.ceil(math.log(tolerance) / math.log(1.0 - alpha)))
+
+def calculate_warmup_bars(timeframe, tolerance=None):
+    """Zaman diliminin en uzun indikatör bağımlılığı için gereken ısınma mum sayısını hesaplar"""
+    # Tolerans önbellek anahtarına girmeden önce çözülür; CONFIG çalışırken değişirse yeni değer kullanılır
+    if tolerance is None:
+        tolerance = CONFIG["WARMUP_TOLERANCE"]
+    return _warmup_bars_for(timeframe, tolerance)
+
+@functools.lru_cache(maxsize=None)
+def _warmup_bars_for(timeframe, tolerance):
+    params = get_pine_timeframe_params(timeframe)
+
+    # Özyinelemeli indikatörler (EMA/RSI/ATR) - başlangıç etkisi tolerance altına inene kadar
+    trend_ema = _ema_convergence_bars(2 / (PINE_TREND_EMA_PERIOD + 1), tolerance)
+    long_ma = _ema_convergence_bars(2 / (params["long_ma_period"] + 1), tolerance)
+    macd = (_ema_convergence_bars(2 / (params["macd_slow"] + 1), tolerance)
+            + _ema_convergence_bars(2 / (params["macd_signal"] + 1), tolerance))
+    rsi = 1 + _ema_convergence_bars(1 / params["rsi_length"], tolerance)
+    atr = (params["atr_period"] + _ema_convergence_bars(1 / params["atr_period"], tolerance)
+           + PINE_SUPERTREND_SMA_PERIOD)
+
+    # Sabit pencereli indikatörler (Fibonacci, MFI, hacim MA)
+    windows = (params["fib_lookback"], params["mfi_length"] + 1, PINE_VOLUME_MA_PERIOD)
+
+    return max(trend_ema, long_ma, macd, rsi, atr, *windows)
+
+def calculate_required_lookback(timeframe):
+    """Zaman dilimi için API'den istenecek mum sayısı (ısınma + sinyal payı, üst sınırlı)"""
+    lookback = calculate_warmup_bars(timeframe) + CONFIG["WARMUP_SIGNAL_MARGIN"]
+    return min(lookback, CONFIG["MAX_KLINE_LOOKBACK"])
+
+def is_signal_converged(df, timeframe):
+    """Son mumdaki sinyal, ısınma bölgesinden sonra oluşan bir olaya mı dayanıyor kontrol eder"""
+    raw_signal = df['raw_signal'].values
+    event_positions = np.flatnonzero(raw_signal)
+    if len(event_positions) == 0:
+        return False
+    return event_positions[-1] >= calculate_warmup_bars(timeframe)
+
+# Sinyal önbelleği: (sembol, zaman dilimi, mum sayısı, son mum açılış zamanı, son mum OHLCV) → son mum sinyali
+# Kapanmış mumlar değişmediği için aynı anahtar her zaman aynı sinyali üretir.
+# NOT: Anahtar oluşan mumun hacmini ve son fiyatını içerir; canlı taramada bunlar hemen her
+# işlemde değiştiği için isabet oranı sıfıra yakındır. İsabet sadece veri değişmeden yapılan
+# tekrar hesaplamalarda olur (aynı tarama içinde tekrar istenen kare, işlem görmeyen semboller).
+# Oran /metrics'te signal_memo_requests_total{result} ile izlenir.
+signal_memo_cache = OrderedDict()
+signal_memo_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def signal_memo_key(symbol, timeframe, df):
+    """Son muma göre sinyal önbelleği anahtarını oluşturur (satır Series'i kurmadan, sütun dizilerinden)"""
+    last = len(df) - 1
+    return (symbol, timeframe, len(df), df['timestamp'].values[last],
+            *(float(df[column].values[last]) for column in OHLCV_FIELDS))
+
+def get_memoized_signal(key):
+    """Önbellekteki sinyali döndürür (yoksa None) ve isabet/ıska sayaçlarını günceller"""
+    signal = signal_memo_cache.get(key)
+    if signal is None:
+        signal_memo_stats["misses"] += 1
+        metric_inc("signal_memo_requests_total", result="miss")
+        return None
+    signal_memo_cache.move_to_end(key)
+    signal_memo_stats["hits"] += 1
+    metric_inc("signal_memo_requests_total", result="hit")
+    return signal
+
+def store_memoized_signal(key, signal):
+    """Sinyali önbelleğe yazar, sınır aşılırsa en eski kayıtları atar (LRU)"""
+    signal_memo_cache[key] = signal
+    signal_memo_cache.move_to_end(key)
+    max_entries = CONFIG["SIGNAL_MEMO_MAX_SYMBOLS"] * len(PINE_TIMEFRAME_PARAMS)
+    while len(signal_memo_cache) > max_entries:
+        signal_memo_cache.popitem(last=False)
+        signal_memo_stats["evictions"] += 1
+
+def get_signal_memo_stats():
+    """Sinyal önbelleği istatistiklerini döndürür"""
+    total = signal_memo_stats["hits"] + signal_memo_stats["misses"]
+    hit_rate = (signal_memo_stats["hits"] / total * 100) if total else 0.0
+    return {**signal_memo_stats, "size": len(signal_memo_cache), "hit_rate": hit_rate}
+
+@metric_timed("scan_stage_seconds", stage="indicators")
 def calculate_full_pine_signals(df, timeframe):
-    is_higher_tf = timeframe in ['1d', '4h', '1w']
-    is_weekly = timeframe == '1w'
-    is_daily = timeframe == '1d' 
-    is_4h = timeframe == '4h'
-    is_2h = timeframe == '2h'
-    is_1h = timeframe == '1h'
-    is_30m = timeframe == '30m'
-    is_15m = timeframe == '15m'
-
-    if is_weekly:
-        rsi_length = 28
-        macd_fast = 18
-        macd_slow = 36
-        macd_signal = 12
-        short_ma_period = 30
-        long_ma_period = 150
-        mfi_length = 25
-        fib_lookback = 150
-        atr_period = 7
-        volume_multiplier = 0.15
-        rsi_overbought = 60
-        rsi_oversold = 40
-    elif is_daily:
-        rsi_length = 21
-        macd_fast = 13
-        macd_slow = 26
-        macd_signal = 10
-        short_ma_period = 20
-        long_ma_period = 100
-        mfi_length = 20
-        fib_lookback = 100
-        atr_period = 7
-        volume_multiplier = 0.15
-        rsi_overbought = 60
-        rsi_oversold = 40
-    elif is_4h:
-        rsi_length = 18
-        macd_fast = 11
-        macd_slow = 22
-        macd_signal = 8
-        short_ma_period = 12
-        long_ma_period = 60
-        mfi_length = 16
-        fib_lookback = 70
-        atr_period = 7
-        volume_multiplier = 0.15
-        rsi_overbought = 60
-        rsi_oversold = 40
-    elif is_2h:
-        rsi_length = 16
-        macd_fast = 10
-        macd_slow = 21
-        macd_signal = 8
-        short_ma_period = 10
-        long_ma_period = 55
-        mfi_length = 15
-        fib_lookback = 60
-        atr_period = 8
-        volume_multiplier = 0.25
-        rsi_overbought = 60
-        rsi_oversold = 40
-    elif is_1h:
-        rsi_length = 15
-        macd_fast = 10
-        macd_slow = 20
-        macd_signal = 9
-        short_ma_period = 9
-        long_ma_period = 50
-        mfi_length = 14
-        fib_lookback = 50
-        atr_period = 9
-        volume_multiplier = 0.35
-        rsi_overbought = 60
-        rsi_oversold = 40
-    elif is_30m:
-        rsi_length = 14
-        macd_fast = 10
-        macd_slow = 20
-        macd_signal = 9
-        short_ma_period = 9
-        long_ma_period = 50
-        mfi_length = 14
-        fib_lookback = 50
-        atr_period = 10
-        volume_multiplier = 0.4
-        rsi_overbought = 60
-        rsi_oversold = 40
-    elif is_15m:
-        rsi_length = 14
-        macd_fast = 10
-        macd_slow = 20
-        macd_signal = 9
-        short_ma_period = 9
-        long_ma_period = 50
-        mfi_length = 14
-        fib_lookback = 50
-        atr_period = 10
-        volume_multiplier = 0.4
-        rsi_overbought = 60
-        rsi_oversold = 40
-    elif timeframe == '8h':
-        rsi_length = 17
-        macd_fast = 10
-        macd_slow = 21
-        macd_signal = 8
-        short_ma_period = 11
-        long_ma_period = 65
-        mfi_length = 16
-        fib_lookback = 80
-        atr_period = 8
-        volume_multiplier = 0.2
-        rsi_overbought = 60
-        rsi_oversold = 40
-    else:
-        rsi_length = 14
-        macd_fast = 10
-        macd_slow = 20
-        macd_signal = 9
-        short_ma_period = 9
-        long_ma_period = 50
-        mfi_length = 14
-        fib_lookback = 50
-        atr_period = 10
-        volume_multiplier = 0.4
-        rsi_overbought = 60
-        rsi_oversold = 40
+    params = get_pine_timeframe_params(timeframe)
+    rsi_length = params["rsi_length"]
+    macd_fast = params["macd_fast"]
+    macd_slow = params["macd_slow"]
+    macd_signal = params["macd_signal"]
+    short_ma_period = params["short_ma_period"]
+    long_ma_period = params["long_ma_period"]
+    mfi_length = params["mfi_length"]
+    fib_lookback = params["fib_lookback"]
+    atr_period = params["atr_period"]
+    volume_multiplier = params["volume_multiplier"]
+    rsi_overbought = params["rsi_overbought"]
+    rsi_oversold = params["rsi_oversold"]
 
     # EMA 200 ve trend
     df['ema200'] = ta.trend.EMAIndicator(df['close'], window=200).ema_indicator()
@@ -2055,22 +3763,8 @@ def calculate_full_pine_signals(df, timeframe):
         hl2 = (df['high'] + df['low']) / 2
         atr = ta.volatility.AverageTrueRange(df['high'], df['low'], df['close'], window=atr_period).average_true_range()
         atr_dynamic = atr.rolling(window=5).mean()  # SMA(ATR, 5)
-        
-        if is_weekly:
-            multiplier = atr_dynamic / 2
-        elif is_daily:
-            multiplier = atr_dynamic / 1.2
-        elif is_4h:
-            multiplier = atr_dynamic / 1.3
-        elif is_2h:
-            multiplier = atr_dynamic / 1.4
-        elif is_1h:
-            multiplier = atr_dynamic / 1.45
-        elif timeframe == '8h':
-            multiplier = atr_dynamic / 1.35
-        else:
-            multiplier = atr_dynamic / 1.5
-            
+        multiplier = atr_dynamic / params["supertrend_divisor"]
+
         upperband = hl2 + multiplier
         lowerband = hl2 - multiplier
         
@@ -2169,6 +3863,7 @@ def calculate_full_pine_signals(df, timeframe):
     df['signal'] = 0
     df.loc[buy_signal, 'signal'] = 1
     df.loc[sell_signal, 'signal'] = -1
+    df['raw_signal'] = df['signal']
 
     # Optimizasyon: Vektörleştirilmiş signal doldurma
     # Signal 0 olan yerlere önceki değeri forward fill ile doldur
@@ -2180,9 +3875,389 @@ def calculate_full_pine_signals(df, timeframe):
     
     # Signal değerlerini int'e çevir
     df['signal'] = df['signal'].astype(int)
-    
+
     return df
 
+# ---------------------------------------------------------------------------
+# Toplu (semboller × mumlar) indikatör hesaplaması
+# Her satır bir sembol, her sütun bir mum. calculate_full_pine_signals ile
+# aynı sonucu üretir; özyinelemeli indikatörler mum ekseninde bir kez dolaşılır,
+# her adım tüm semboller için tek NumPy işlemidir.
+# ---------------------------------------------------------------------------
+
+def _batch_ewm(values, alpha, min_periods):
+    """pandas ewm(adjust=False) karşılığı - baştaki NaN'lar ilk geçerli değerle tohumlanır"""
+    n_symbols, n_bars = values.shape
+    result = np.full((n_symbols, n_bars), np.nan)
+    state = np.full(n_symbols, np.nan)
+    nobs = np.zeros(n_symbols, dtype=np.int64)
+    decay = 1.0 - alpha
+    for i in range(n_bars):
+        x = values[:, i]
+        valid = ~np.isnan(x)
+        state = np.where(np.isnan(state), x, np.where(valid, decay * state + alpha * x, state))
+        nobs += valid
+        result[:, i] = np.where(nobs >= min_periods, state, np.nan)
+    return result
+
+def _batch_rolling(values, window, func):
+    """pandas rolling(window).<func>() karşılığı - pencerede NaN varsa sonuç NaN"""
+    n_symbols, n_bars = values.shape
+    result = np.full((n_symbols, n_bars), np.nan)
+    if n_bars >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=1)
+        result[:, window - 1:] = func(windows, axis=-1)
+    return result
+
+def _batch_shift(values):
+    """Bir mum geriye kaydırır (ilk sütun NaN)"""
+    shifted = np.empty_like(values)
+    shifted[:, 0] = np.nan
+    shifted[:, 1:] = values[:, :-1]
+    return shifted
+
+def _batch_rsi(close, window):
+    """ta.momentum.RSIIndicator karşılığı"""
+    diff = close - _batch_shift(close)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    ema_up = _batch_ewm(up, 1.0 / window, window)
+    ema_down = _batch_ewm(down, 1.0 / window, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ema_down == 0, 100, 100 - (100 / (1 + ema_up / ema_down)))
+
+def _batch_atr(high, low, close, window):
+    """ta.volatility.AverageTrueRange karşılığı (Wilder yumuşatması, ilk değerler 0)"""
+    prev_close = _batch_shift(close)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    n_symbols, n_bars = close.shape
+    atr = np.zeros((n_symbols, n_bars))
+    if n_bars < window:
+        return atr
+    atr[:, window - 1] = true_range[:, :window].mean(axis=1)
+    for i in range(window, n_bars):
+        atr[:, i] = (atr[:, i - 1] * (window - 1) + true_range[:, i]) / float(window)
+    return atr
+
+def _batch_supertrend_direction(high, low, close, atr_period, divisor):
+    """Dinamik SuperTrend yönü (1 / -1) - calculate_full_pine_signals ile aynı kural"""
+    hl2 = (high + low) / 2
+    atr = _batch_atr(high, low, close, atr_period)
+    multiplier = _batch_rolling(atr, PINE_SUPERTREND_SMA_PERIOD, np.mean) / divisor
+    upperband_prev = _batch_shift(hl2 + multiplier)
+    lowerband_prev = _batch_shift(hl2 - multiplier)
+
+    n_symbols, n_bars = close.shape
+    direction = np.ones((n_symbols, n_bars), dtype=np.int8)
+    for i in range(1, n_bars):
+        direction[:, i] = np.where(
+            close[:, i] > upperband_prev[:, i], 1,
+            np.where(close[:, i] < lowerband_prev[:, i], -1, direction[:, i - 1])
+        )
+    return direction
+
+@metric_timed("scan_stage_seconds", stage="indicators_batch")
+def calculate_full_pine_signals_batch(high, low, close, volume, timeframe):
+    """
+    Aynı uzunluktaki sembollerin son mum sinyallerini tek seferde hesaplar.
+    Dönüş: (son mum sinyalleri int8 dizisi, son sinyal olayının konumu; olay yoksa -1)
+    """
+    params = get_pine_timeframe_params(timeframe)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+
+    with np.errstate(invalid='ignore'):
+        # EMA 200 ve trend
+        ema200 = _batch_ewm(close, 2 / (PINE_TREND_EMA_PERIOD + 1), PINE_TREND_EMA_PERIOD)
+        trend_bullish = close > ema200
+        trend_bearish = close < ema200
+
+        rsi = _batch_rsi(close, params["rsi_length"])
+
+        ema_fast = _batch_ewm(close, 2 / (params["macd_fast"] + 1), params["macd_fast"])
+        ema_slow = _batch_ewm(close, 2 / (params["macd_slow"] + 1), params["macd_slow"])
+        macd = ema_fast - ema_slow
+        macd_signal = _batch_ewm(macd, 2 / (params["macd_signal"] + 1), params["macd_signal"])
+
+        supertrend_dir = _batch_supertrend_direction(high, low, close, params["atr_period"], params["supertrend_divisor"])
+
+        short_ma = _batch_ewm(close, 2 / (params["short_ma_period"] + 1), params["short_ma_period"])
+        long_ma = _batch_ewm(close, 2 / (params["long_ma_period"] + 1), params["long_ma_period"])
+        ma_bullish = short_ma > long_ma
+        ma_bearish = short_ma < long_ma
+
+        volume_ma = _batch_rolling(volume, PINE_VOLUME_MA_PERIOD, np.mean)
+        enough_volume = volume > volume_ma * params["volume_multiplier"]
+
+        typical_price = (high + low + close) / 3
+        money_flow = typical_price * volume
+        typical_price_diff = typical_price - _batch_shift(typical_price)
+        positive_flow = np.where(typical_price_diff > 0, money_flow, 0)
+        negative_flow = np.where(typical_price_diff < 0, money_flow, 0)
+        positive_flow_sum = _batch_rolling(positive_flow, params["mfi_length"], np.sum)
+        negative_flow_sum = _batch_rolling(negative_flow, params["mfi_length"], np.sum)
+        mfi = 100 - (100 / (1 + positive_flow_sum / (negative_flow_sum + 1e-10)))
+        mfi_bullish = mfi < 65
+        mfi_bearish = mfi > 35
+
+        highest_high = _batch_rolling(high, params["fib_lookback"], np.max)
+        lowest_low = _batch_rolling(low, params["fib_lookback"], np.min)
+        fib_in_range = (close > highest_high * 0.618) & (close < lowest_low * 1.382)
+
+        macd_prev = _batch_shift(macd)
+        macd_signal_prev = _batch_shift(macd_signal)
+        crossover = (macd_prev < macd_signal_prev) & (macd > macd_signal)
+        crossunder = (macd_prev > macd_signal_prev) & (macd < macd_signal)
+
+        buy_signal = (
+            crossover |
+            (
+                (rsi < params["rsi_oversold"]) &
+                (supertrend_dir == 1) &
+                ma_bullish &
+                enough_volume &
+                mfi_bullish &
+                trend_bullish
+            )
+        ) & fib_in_range
+
+        sell_signal = (
+            crossunder |
+            (
+                (rsi > params["rsi_overbought"]) &
+                (supertrend_dir == -1) &
+                ma_bearish &
+                enough_volume &
+                mfi_bearish &
+                trend_bearish
+            )
+        ) & fib_in_range
+
+        raw_signal = np.zeros(close.shape, dtype=np.int8)
+        raw_signal[buy_signal] = 1
+        raw_signal[sell_signal] = -1
+
+        # Son olayın değeri (forward fill'in son mumdaki karşılığı); olay yoksa MACD ile doldur
+        n_bars = close.shape[1]
+        has_event = raw_signal != 0
+        last_event_pos = np.where(has_event.any(axis=1), n_bars - 1 - np.argmax(has_event[:, ::-1], axis=1), -1)
+        rows = np.arange(close.shape[0])
+        macd_fallback = np.where(macd[:, -1] > macd_signal[:, -1], 1, -1).astype(np.int8)
+        last_signal = np.where(last_event_pos >= 0, raw_signal[rows, np.maximum(last_event_pos, 0)], macd_fallback)
+
+    return last_signal.astype(np.int8), last_event_pos
+
+def stack_ohlcv_frames(frames, allocate=None):
+    """
+    Sembol DataFrame'lerini (alanlar × semboller × mumlar) bloğuna yığar.
+    Sadece en uzun geçmişe sahip semboller yığılır; kalanlar ayrı döndürülür.
+    allocate verilirse blok onun döndürdüğü diziye (ör. paylaşımlı bellek) yazılır.
+    """
+    lengths = {symbol: len(df) for symbol, df in frames.items() if df is not None and not df.empty}
+    if not lengths:
+        return [], None, list(frames.keys())
+
+    n_bars = max(lengths.values())
+    stacked_symbols = [symbol for symbol, length in lengths.items() if length == n_bars]
+    leftover_symbols = [symbol for symbol in frames if symbol not in stacked_symbols]
+
+    shape = (len(OHLCV_FIELDS), len(stacked_symbols), n_bars)
+    block = np.empty(shape, dtype=np.float64) if allocate is None else allocate(shape)
+    for row, symbol in enumerate(stacked_symbols):
+        df = frames[symbol]
+        for field, column in enumerate(OHLCV_FIELDS):
+            block[field, row] = df[column].to_numpy(dtype=np.float64)
+
+    arrays = {column: block[field] for field, column in enumerate(OHLCV_FIELDS)}
+    arrays['block'] = block
+    return stacked_symbols, arrays, leftover_symbols
+
+# ---------------------------------------------------------------------------
+# Paylaşımlı bellek mum blokları ve indikatör işçi süreçleri
+# Her zaman dilimi için tek bir (OHLCV × semboller × mumlar) float64 bloğu tutulur.
+# İşçiler bloğa isimle salt okunur bağlanır, kendi sembol aralığını kopyalamadan
+# hesaplar; süreçler arasında sadece son sinyal vektörleri taşınır.
+# ---------------------------------------------------------------------------
+
+shared_candle_blocks = {}  # {timeframe: SharedMemory}
+indicator_worker_pool = None
+
+def allocate_shared_candle_block(timeframe, shape):
+    """Zaman dilimi için paylaşımlı bellek bloğunu (gerekirse büyüterek) döndürür"""
+    size = max(int(np.prod(shape)) * np.dtype(np.float64).itemsize, 1)
+    shm = shared_candle_blocks.get(timeframe)
+    if shm is None or shm.size < size:
+        if shm is not None:
+            release_shared_candle_block(timeframe)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        shared_candle_blocks[timeframe] = shm
+    return np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+def release_shared_candle_block(timeframe):
+    """Zaman diliminin paylaşımlı bellek bloğunu kapatır ve siler"""
+    shm = shared_candle_blocks.pop(timeframe, None)
+    if shm is None:
+        return
+    try:
+        shm.close()
+    except BufferError:
+        pass  # Hâlâ açık bir görünüm varsa kapatma süreç sonunda yapılır
+    shm.unlink()
+
+def _indicator_worker_compute(shm_name, shape, row_start, row_stop, timeframe):
+    """İşçi süreç: paylaşımlı bloğa salt okunur bağlanır ve satır aralığının son sinyallerini hesaplar"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        block.flags.writeable = False
+        rows = slice(row_start, row_stop)
+        result = calculate_full_pine_signals_batch(block[1, rows], block[2, rows], block[3, rows], block[4, rows], timeframe)
+        del block, rows
+        return result
+    finally:
+        shm.close()
+
+def get_indicator_worker_pool():
+    """İndikatör işçi havuzunu (ilk kullanımda) oluşturur"""
+    global indicator_worker_pool
+    if indicator_worker_pool is None:
+        # fork kullanılmaz: süreçte canlı thread'ler (pymongo izleyicileri, loop-stall örnekleyici, profil)
+        # varken fork, çocukta kilitli kalmış bir kilidi miras bırakıp işçiyi kilitleyebilir. forkserver
+        # thread'siz, temiz bir sunucu sürecinden fork eder; modül o süreçte sadece bir kez içe aktarılır.
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        indicator_worker_pool = ProcessPoolExecutor(
+            max_workers=CONFIG["INDICATOR_WORKER_PROCESSES"],
+            mp_context=multiprocessing.get_context(method)
+        )
+        print(f"⚙️ {CONFIG['INDICATOR_WORKER_PROCESSES']} indikatör işçi süreci başlatıldı ({method})")
+    return indicator_worker_pool
+
+def shutdown_indicator_workers():
+    """İşçi havuzunu kapatır ve paylaşımlı bellek bloklarını siler"""
+    global indicator_worker_pool
+    if indicator_worker_pool is not None:
+        indicator_worker_pool.shutdown(wait=True, cancel_futures=True)
+        indicator_worker_pool = None
+    for timeframe in list(shared_candle_blocks):
+        release_shared_candle_block(timeframe)
+
+def use_indicator_workers(n_symbols):
+    """Yığın işçi süreçlere dağıtılmalı mı"""
+    return CONFIG["INDICATOR_WORKER_PROCESSES"] > 0 and n_symbols >= CONFIG["INDICATOR_WORKER_MIN_SYMBOLS"]
+
+async def calculate_stacked_signals(arrays, timeframe):
+    """Yığılmış blok için son sinyalleri ana süreçte veya işçi süreçlerde hesaplar"""
+    block = arrays['block']
+    n_symbols = block.shape[1]
+    if not use_indicator_workers(n_symbols) or timeframe not in shared_candle_blocks:
+        return calculate_full_pine_signals_batch(arrays['high'], arrays['low'], arrays['close'], arrays['volume'], timeframe)
+
+    pool = get_indicator_worker_pool()
+    loop = asyncio.get_running_loop()
+    shm_name = shared_candle_blocks[timeframe].name
+    n_chunks = min(CONFIG["INDICATOR_WORKER_PROCESSES"], n_symbols)
+    bounds = np.linspace(0, n_symbols, n_chunks + 1).astype(int)
+    results = await asyncio.gather(*(
+        loop.run_in_executor(pool, _indicator_worker_compute, shm_name, block.shape, int(start), int(stop), timeframe)
+        for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+    ))
+    last_signals = np.concatenate([result[0] for result in results])
+    last_event_pos = np.concatenate([result[1] for result in results])
+    return last_signals, last_event_pos
+
+async def fetch_universe_klines(symbols, interval, lookback):
+    """Tüm semboller için aynı zaman diliminin mumlarını eşzamanlı (sınırlı) çeker"""
+    semaphore = asyncio.Semaphore(CONFIG["BATCH_FETCH_CONCURRENCY"])
+
+    async def fetch_one(symbol):
+        async with semaphore:
+            try:
+                return symbol, await async_get_historical_data(symbol, interval, lookback)
+            except Exception as e:
+                print(f"⚠️ {symbol} {interval} toplu veri çekme hatası: {e}")
+                return symbol, None
+
+    results = await asyncio.gather(*(fetch_one(symbol) for symbol in symbols))
+    return dict(results)
+
+def _last_signal_from_frame(df, tf_name):
+    """Tek sembol DataFrame'inden son mum sinyalini hesaplar (toplu yoldan düşenler için)"""
+    df = calculate_full_pine_signals(df, tf_name)
+    return int(df['signal'].iloc[-1]), is_signal_converged(df, tf_name)
+
+async def calculate_universe_signals(symbols, timeframes, tf_names):
+    """
+    Tüm evrenin sinyallerini zaman dilimi başına tek toplu hesaplamayla üretir.
+    Dönüş: {symbol: {tf: signal}} - herhangi bir zaman diliminde verisi eksik semboller dahil edilmez.
+    """
+    universe_signals = {symbol: {} for symbol in symbols}
+    failed_symbols = set()
+
+    for tf_name in tf_names:
+        lookback = calculate_required_lookback(tf_name)
+        frames = await fetch_universe_klines(symbols, timeframes[tf_name], lookback)
+        failed_symbols.update(symbol for symbol, df in frames.items() if df is None or df.empty)
+
+        # Son mumu değişmeyen semboller önbellekten alınır, sadece kalanlar hesaplanır
+        memo_keys = {}
+        for symbol, df in list(frames.items()):
+            if symbol in failed_symbols:
+                continue
+            memo_keys[symbol] = signal_memo_key(symbol, tf_name, df)
+            signal = get_memoized_signal(memo_keys[symbol])
+            if signal is not None:
+                universe_signals[symbol][tf_name] = signal
+                del frames[symbol]
+
+        # İşçi süreçler kullanılıyorsa blok doğrudan paylaşımlı belleğe yazılır
+        allocate = None
+        if use_indicator_workers(len(frames)):
+            allocate = functools.partial(allocate_shared_candle_block, tf_name)
+        stacked_symbols, arrays, leftover_symbols = stack_ohlcv_frames(frames, allocate)
+        unconverged = []
+        if stacked_symbols:
+            last_signals, last_event_pos = await calculate_stacked_signals(arrays, tf_name)
+            warmup_bars = calculate_warmup_bars(tf_name)
+            n_bars = arrays['close'].shape[1]
+            for idx, symbol in enumerate(stacked_symbols):
+                universe_signals[symbol][tf_name] = int(last_signals[idx])
+                if n_bars >= lookback and lookback < CONFIG["MAX_KLINE_LOOKBACK"] and last_event_pos[idx] < warmup_bars:
+                    unconverged.append(symbol)
+        arrays = None  # Paylaşımlı bellek görünümlerini bırak
+
+        # Kısa geçmişli semboller tek tek hesaplanır
+        for symbol in leftover_symbols:
+            if symbol in failed_symbols:
+                continue
+            try:
+                universe_signals[symbol][tf_name], _ = _last_signal_from_frame(frames[symbol], tf_name)
+            except Exception as e:
+                print(f"❌ {symbol} {tf_name} sinyal hesaplama hatası: {e}")
+                failed_symbols.add(symbol)
+
+        # Son olayı ısınma bölgesinde kalan semboller tam geçmişle yeniden hesaplanır
+        if unconverged:
+            full_frames = await fetch_universe_klines(unconverged, timeframes[tf_name], CONFIG["MAX_KLINE_LOOKBACK"])
+            for symbol, df in full_frames.items():
+                if df is None or df.empty:
+                    failed_symbols.add(symbol)
+                    continue
+                universe_signals[symbol][tf_name], _ = _last_signal_from_frame(df, tf_name)
+
+        for symbol in frames:
+            if symbol not in failed_symbols and tf_name in universe_signals[symbol]:
+                store_memoized_signal(memo_keys[symbol], universe_signals[symbol][tf_name])
+
+    for symbol in failed_symbols:
+        universe_signals.pop(symbol, None)
+
+    memo_stats = get_signal_memo_stats()
+    print(f"📊 Toplu sinyal hesaplaması: {len(universe_signals)}/{len(symbols)} sembol, {len(tf_names)} zaman dilimi")
+    print(f"   🗂️ Sinyal önbelleği: {memo_stats['hits']} isabet, {memo_stats['misses']} ıska (%{memo_stats['hit_rate']:.1f}), {memo_stats['size']} kayıt")
+    return universe_signals
+
 async def get_active_high_volume_usdt_pairs(top_n=50, stop_cooldown=None):
     futures_exchange_info = await fetch_futures_exchange_info()
     
@@ -2254,7 +4329,7 @@ async def get_active_high_volume_usdt_pairs(top_n=50, stop_cooldown=None):
         get_active_high_volume_usdt_pairs._first_run = True
     
     return uygun_pairs
-async def check_signal_potential(symbol, positions, stop_cooldown, timeframes, tf_names, previous_signals):
+async def check_signal_potential(symbol, positions, stop_cooldown, timeframes, tf_names, previous_signals, precomputed_signals=None):
     if symbol in positions:
         print(f"⏸️ {symbol} → Zaten aktif pozisyon var, yeni sinyal aranmıyor")
         return None
@@ -2270,179 +4345,162 @@ async def check_signal_potential(symbol, positions, stop_cooldown, timeframes, t
         if df_1d is None or df_1d.empty:
             return None
 
-        current_signals = await calculate_signals_for_symbol(symbol, timeframes, tf_names)
+        # Toplu hesaplamada bulunan sinyaller varsa onları kullan, yoksa tek tek hesapla
+        if precomputed_signals is not None:
+            current_signals = dict(precomputed_signals)
+        else:
+            current_signals = await calculate_signals_for_symbol(symbol, timeframes, tf_names)
         if current_signals is None:
             return None
         
-        buy_count, sell_count, signal_values = calculate_signal_counts(current_signals, tf_names)
-        log_signal_snapshot(symbol, tf_names, signal_values, buy_count, sell_count)
-        
-        # BTC ve ETH için 5/7 kuralı, diğerleri için 7/7 kuralı kontrol
-        is_major_coin = symbol in ['BTCUSDT', 'ETHUSDT']
+        candidate = evaluate_signal_candidate(symbol, current_signals, tf_names, previous_signals)
+        if candidate is None:
+            return None
+        return await confirm_signal_candidate(symbol, current_signals, candidate)
         
-        if is_major_coin:
-            if not check_major_coin_signal_rule(symbol, current_signals, previous_signals.get(symbol, {})):
-                previous_signals[symbol] = dict(current_signals)
-                return None
-            
-            # BTC/ETH için sinyal türünü belirle - check_major_coin_signal_rule zaten kuralı kontrol etti
-            # Bu noktaya gelindiyse kural sağlanmıştır, spesifik zaman dilimlerini kontrol et
-            
-            # 7/7 kuralı kontrol - tüm 7 zaman dilimi aynı olmalı
-            if buy_count == 7 and sell_count == 0:
-                sinyal_tipi = 'ALIŞ'
-                dominant_signal = "ALIŞ"
-                print(f"✅ {symbol} → ALIŞ sinyali belirlendi (7/7 kuralı)")
-            elif sell_count == 7 and buy_count == 0:
-                sinyal_tipi = 'SATIŞ'
-                dominant_signal = "SATIŞ"
-                print(f"✅ {symbol} → SATIŞ sinyali belirlendi (7/7 kuralı)")
-            else:
-                # 6/7 kuralı kontrol - 15dk, 30dk, 1h, 2h, 4h, 8h aynı olmalı
-                tf_6h = ['15m', '30m', '1h', '2h', '4h', '8h']
-                buy_count_6h = sum(1 for tf in tf_6h if current_signals.get(tf, 0) == 1)
-                sell_count_6h = sum(1 for tf in tf_6h if current_signals.get(tf, 0) == -1)
+    except Exception as e:
+        print(f"❌ {symbol} sinyal potansiyeli kontrol hatası: {e}")
+        return None
+
+def evaluate_signal_candidate(symbol, current_signals, tf_names, previous_signals):
+    """
+    Sinyallere 5/7 (BTC/ETH) veya 7/7 kuralını uygular.
+    Kural sağlanmazsa önceki sinyali günceller ve None döner; sağlanırsa aday bilgilerini döndürür.
+    """
+    buy_count, sell_count, signal_values = calculate_signal_counts(current_signals, tf_names)
+    log_signal_snapshot(symbol, tf_names, signal_values, buy_count, sell_count)
+    
+    # BTC ve ETH için 5/7 kuralı, diğerleri için 7/7 kuralı kontrol
+    is_major_coin = symbol in MAJOR_COIN_SYMBOLS
+    
+    if is_major_coin:
+        if not check_major_coin_signal_rule(symbol, current_signals, previous_signals.get(symbol)):
+            previous_signals[symbol] = pack_signals(current_signals)
+            return None
+    else:
+        # Diğer kriptolar için 7/7 kuralı
+        required_signals = 7
+        if not check_signal_rule(buy_count, sell_count, required_signals, symbol):
+            previous_signals[symbol] = pack_signals(current_signals)
+            return None
+    
+    # Sinyal türünü maske karşılaştırmasıyla belirle (BTC/ETH: 7/7 → 6/7 → 5/7, diğerleri: 7/7)
+    buy_mask, sell_mask = encode_signal_masks(current_signals)
+    direction, rule_level = match_signal_rule(buy_mask, sell_mask, is_major_coin)
+    if direction == 0:
+        print(f"❌ {symbol} → Beklenmeyen durum: LONG={buy_count}, SHORT={sell_count}")
+        return None
+    sinyal_tipi = 'ALIŞ' if direction == 1 else 'SATIŞ'
+    dominant_signal = sinyal_tipi
+    rule_detail = "" if rule_level == 7 else f" - {RULE_DESCRIPTIONS[rule_level]}"
+    print(f"✅ {symbol} → {sinyal_tipi} sinyali belirlendi ({rule_level}/7 kuralı{rule_detail})")
+    
+    rule_text = "5/7" if is_major_coin else "7/7"
+    print(f"✅ {symbol} → {rule_text} kuralı sağlandı! LONG={buy_count}, SHORT={sell_count}")
+    print(f"   Detay: {current_signals}")
+    
+    return {
+        'signal_type': sinyal_tipi,
+        'dominant_signal': dominant_signal,
+        'buy_count': buy_count,
+        'sell_count': sell_count,
+        'is_major_coin': is_major_coin
+    }
+
+async def confirm_signal_candidate(symbol, current_signals, candidate):
+    """Kuralı sağlayan adayı 15m mum rengi ve fiyat/hacim bilgisiyle doğrular; sinyal verisini veya None döndürür"""
+    sinyal_tipi = candidate['signal_type']
+    dominant_signal = candidate['dominant_signal']
+    buy_count = candidate['buy_count']
+    sell_count = candidate['sell_count']
+    is_major_coin = candidate['is_major_coin']
+    
+    # 15 dakikalık mum rengi kontrolü - sadece BTC/ETH olmayan kriptolar için
+    if not is_major_coin:
+        print(f"🔍 {symbol} → 15 dakikalık mum rengi kontrol ediliyor...")
+        try:
+            df_15m = await async_get_historical_data(symbol, '15m', 1)
+            if df_15m is not None and not df_15m.empty:
+                last_candle = df_15m.iloc[-1]
+                open_price = float(last_candle['open'])
+                close_price = float(last_candle['close'])
                 
-                if buy_count_6h == 6 and sell_count_6h == 0:
-                    sinyal_tipi = 'ALIŞ'
-                    dominant_signal = "ALIŞ"
-                    print(f"✅ {symbol} → ALIŞ sinyali belirlendi (6/7 kuralı - 15dk,30dk,1h,2h,4h,8h)")
-                elif sell_count_6h == 6 and buy_count_6h == 0:
-                    sinyal_tipi = 'SATIŞ'
-                    dominant_signal = "SATIŞ"
-                    print(f"✅ {symbol} → SATIŞ sinyali belirlendi (6/7 kuralı - 15dk,30dk,1h,2h,4h,8h)")
-                else:
-                    # 5/7 kuralı kontrol - 15dk, 30dk, 1h, 2h, 4h aynı olmalı
-                    tf_5h = ['15m', '30m', '1h', '2h', '4h']
-                    buy_count_5h = sum(1 for tf in tf_5h if current_signals.get(tf, 0) == 1)
-                    sell_count_5h = sum(1 for tf in tf_5h if current_signals.get(tf, 0) == -1)
+                # Mum rengini belirle (yeşil = close > open, kırmızı = close < open)
+                is_green_candle = close_price > open_price
+                is_red_candle = close_price < open_price
+                
+                print(f"🔍 {symbol} → 15m mum: Açılış=${open_price:.6f}, Kapanış=${close_price:.6f}")
+                print(f"🔍 {symbol} → 15m mum rengi: {'🟢 Yeşil' if is_green_candle else '🔴 Kırmızı' if is_red_candle else '⚪ Doğru'}")
+                
+                # Sinyal türü ile mum rengi uyumluluğunu kontrol et
+                if sinyal_tipi == 'ALIŞ' and not is_green_candle:
+                    print(f"⚠️ {symbol} → ALIŞ sinyali için 15m mum yeşil değil, sinyal erteleniyor...")
+                    print(f"   Beklenen: 🟢 Yeşil mum, Mevcut: {'🔴 Kırmızı' if is_red_candle else '⚪ Doğru'} mum")
+                    return None  # Sinyal erteleniyor, sonraki kontrolde tekrar bakılacak
                     
-                    if buy_count_5h == 5 and sell_count_5h == 0:
-                        sinyal_tipi = 'ALIŞ'
-                        dominant_signal = "ALIŞ"
-                        print(f"✅ {symbol} → ALIŞ sinyali belirlendi (5/7 kuralı - 15dk,30dk,1h,2h,4h)")
-                    elif sell_count_5h == 5 and buy_count_5h == 0:
-                        sinyal_tipi = 'SATIŞ'
-                        dominant_signal = "SATIŞ"
-                        print(f"✅ {symbol} → SATIŞ sinyali belirlendi (5/7 kuralı - 15dk,30dk,1h,2h,4h)")
-                    else:
-                        # Bu durumda check_major_coin_signal_rule False dönmeli, buraya gelmemeli
-                        print(f"❌ {symbol} → Beklenmeyen durum: LONG={buy_count}, SHORT={sell_count}")
-                        return None
-        else:
-            # Diğer kriptolar için 7/7 kuralı
-            required_signals = 7
-            if not check_signal_rule(buy_count, sell_count, required_signals, symbol):
-                previous_signals[symbol] = dict(current_signals)
-                return None
-            
-            # Diğer kriptolar için sinyal türünü belirle
-            if buy_count == 7 and sell_count == 0:
-                sinyal_tipi = 'ALIŞ'
-                dominant_signal = "ALIŞ"
-                print(f"✅ {symbol} → ALIŞ sinyali belirlendi (7/7 kuralı)")
-            elif sell_count == 7 and buy_count == 0:
-                sinyal_tipi = 'SATIŞ'
-                dominant_signal = "SATIŞ"
-                print(f"✅ {symbol} → SATIŞ sinyali belirlendi (7/7 kuralı)")
+                elif sinyal_tipi == 'SATIŞ' and not is_red_candle:
+                    print(f"⚠️ {symbol} → SATIŞ sinyali için 15m mum kırmızı değil, sinyal erteleniyor...")
+                    print(f"   Beklenen: 🔴 Kırmızı mum, Mevcut: {'🟢 Yeşil' if is_green_candle else '⚪ Doğru'} mum")
+                    return None  # Sinyal erteleniyor, sonraki kontrolde tekrar bakılacak
+                
+                print(f"✅ {symbol} → 15m mum rengi uygun! Sinyal veriliyor...")
+                
             else:
-                print(f"❌ {symbol} → 7/7 kuralı sağlanamadı: LONG={buy_count}, SHORT={sell_count}")
-                return None
-        
-        rule_text = "5/7" if is_major_coin else "7/7"
-        print(f"✅ {symbol} → {rule_text} kuralı sağlandı! LONG={buy_count}, SHORT={sell_count}")
-        print(f"   Detay: {current_signals}")
+                print(f"⚠️ {symbol} → 15m mum verisi alınamadı, sinyal veriliyor (veri eksikliği)")
+                
+        except Exception as e:
+            print(f"⚠️ {symbol} → 15m mum kontrolünde hata: {e}, sinyal veriliyor (hata durumu)")
+    else:
+        # BTC/ETH için 15m mum kontrolü yapılmıyor - sinyal hemen veriliyor
+        print(f"🔍 {symbol} → Major coin (BTC/ETH) - 15m mum kontrolü atlanıyor, sinyal hemen veriliyor")
+    
+    # Fiyat ve hacim bilgilerini al
+    try:
+        ticker_data = await fetch_futures_24h(symbol, hedged=True)
         
-        # 15 dakikalık mum rengi kontrolü - sadece BTC/ETH olmayan kriptolar için
-        if not is_major_coin:
-            print(f"🔍 {symbol} → 15 dakikalık mum rengi kontrol ediliyor...")
-            try:
-                df_15m = await async_get_historical_data(symbol, '15m', 1)
-                if df_15m is not None and not df_15m.empty:
-                    last_candle = df_15m.iloc[-1]
-                    open_price = float(last_candle['open'])
-                    close_price = float(last_candle['close'])
-                    
-                    # Mum rengini belirle (yeşil = close > open, kırmızı = close < open)
-                    is_green_candle = close_price > open_price
-                    is_red_candle = close_price < open_price
-                    
-                    print(f"🔍 {symbol} → 15m mum: Açılış=${open_price:.6f}, Kapanış=${close_price:.6f}")
-                    print(f"🔍 {symbol} → 15m mum rengi: {'🟢 Yeşil' if is_green_candle else '🔴 Kırmızı' if is_red_candle else '⚪ Doğru'}")
-                    
-                    # Sinyal türü ile mum rengi uyumluluğunu kontrol et
-                    if sinyal_tipi == 'ALIŞ' and not is_green_candle:
-                        print(f"⚠️ {symbol} → ALIŞ sinyali için 15m mum yeşil değil, sinyal erteleniyor...")
-                        print(f"   Beklenen: 🟢 Yeşil mum, Mevcut: {'🔴 Kırmızı' if is_red_candle else '⚪ Doğru'} mum")
-                        return None  # Sinyal erteleniyor, sonraki kontrolde tekrar bakılacak
-                        
-                    elif sinyal_tipi == 'SATIŞ' and not is_red_candle:
-                        print(f"⚠️ {symbol} → SATIŞ sinyali için 15m mum kırmızı değil, sinyal erteleniyor...")
-                        print(f"   Beklenen: 🔴 Kırmızı mum, Mevcut: {'🟢 Yeşil' if is_green_candle else '⚪ Doğru'} mum")
-                        return None  # Sinyal erteleniyor, sonraki kontrolde tekrar bakılacak
-                    
-                    print(f"✅ {symbol} → 15m mum rengi uygun! Sinyal veriliyor...")
-                    
-                else:
-                    print(f"⚠️ {symbol} → 15m mum verisi alınamadı, sinyal veriliyor (veri eksikliği)")
-                    
-            except Exception as e:
-                print(f"⚠️ {symbol} → 15m mum kontrolünde hata: {e}, sinyal veriliyor (hata durumu)")
+        # API bazen liste döndürüyor, bazen dict
+        if isinstance(ticker_data, list):
+            if len(ticker_data) == 0:
+                print(f"❌ {symbol} → Ticker verisi boş liste, sinyal iptal edildi")
+                return None
+            ticker = ticker_data[0]  # İlk elementi al
         else:
-            # BTC/ETH için 15m mum kontrolü yapılmıyor - sinyal hemen veriliyor
-            print(f"🔍 {symbol} → Major coin (BTC/ETH) - 15m mum kontrolü atlanıyor, sinyal hemen veriliyor")
+            ticker = ticker_data
         
-        # Fiyat ve hacim bilgilerini al
-        try:
-            ticker_data = await fetch_futures_24h(symbol)
-            
-            # API bazen liste döndürüyor, bazen dict
-            if isinstance(ticker_data, list):
-                if len(ticker_data) == 0:
-                    print(f"❌ {symbol} → Ticker verisi boş liste, sinyal iptal edildi")
-                    return None
-                ticker = ticker_data[0]  # İlk elementi al
-            else:
-                ticker = ticker_data
-            
-            if not ticker or not isinstance(ticker, dict):
-                print(f"❌ {symbol} → Ticker verisi eksik veya hatalı format, sinyal iptal edildi")
-                print(f"   Ticker: {ticker}")
-                return None  # Sinyal iptal edildi
-            
-            if 'lastPrice' in ticker:
-                price = float(ticker['lastPrice'])
-            elif 'price' in ticker:
-                price = float(ticker['price'])
-            else:
-                print(f"❌ {symbol} → Fiyat alanı bulunamadı (lastPrice/price), sinyal iptal edildi")
-                print(f"   Ticker: {ticker}")
-                return None
-            
-            volume_usd = float(ticker.get('quoteVolume', 0))
-            
-            if price <= 0 or volume_usd <= 0:
-                print(f"❌ {symbol} → Fiyat ({price}) veya hacim ({volume_usd}) geçersiz, sinyal iptal edildi")
-                return None  # Sinyal iptal edildi
-                
-        except Exception as e:
-            print(f"❌ {symbol} → Fiyat/hacim bilgisi alınamadı: {e}, sinyal iptal edildi")
+        if not ticker or not isinstance(ticker, dict):
+            print(f"❌ {symbol} → Ticker verisi eksik veya hatalı format, sinyal iptal edildi")
+            print(f"   Ticker: {ticker}")
             return None  # Sinyal iptal edildi
         
-        return {
-            'symbol': symbol,
-            'signals': current_signals,
-            'price': price,
-            'volume_usd': volume_usd,
-            'signal_type': sinyal_tipi,
-            'dominant_signal': dominant_signal,
-            'buy_count': buy_count,
-            'sell_count': sell_count
-        }
+        if 'lastPrice' in ticker:
+            price = float(ticker['lastPrice'])
+        elif 'price' in ticker:
+            price = float(ticker['price'])
+        else:
+            print(f"❌ {symbol} → Fiyat alanı bulunamadı (lastPrice/price), sinyal iptal edildi")
+            print(f"   Ticker: {ticker}")
+            return None
+        
+        volume_usd = float(ticker.get('quoteVolume', 0))
         
+        if price <= 0 or volume_usd <= 0:
+            print(f"❌ {symbol} → Fiyat ({price}) veya hacim ({volume_usd}) geçersiz, sinyal iptal edildi")
+            return None  # Sinyal iptal edildi
+            
     except Exception as e:
-        print(f"❌ {symbol} sinyal potansiyeli kontrol hatası: {e}")
-        return None
+        print(f"❌ {symbol} → Fiyat/hacim bilgisi alınamadı: {e}, sinyal iptal edildi")
+        return None  # Sinyal iptal edildi
+    
+    return {
+        'symbol': symbol,
+        'signals': current_signals,
+        'price': price,
+        'volume_usd': volume_usd,
+        'signal_type': sinyal_tipi,
+        'dominant_signal': dominant_signal,
+        'buy_count': buy_count,
+        'sell_count': sell_count
+    }
 
 async def process_selected_signal(signal_data, positions, active_signals, stats):
     """Seçilen sinyali işler ve gönderir."""
@@ -2607,8 +4665,8 @@ async def process_selected_signal(signal_data, positions, active_signals, stats)
         except Exception as e:
             print(f"⚠️ {symbol} → Son kontrol sırasında hata: {e}, devam ediliyor")
 
-        # Sinyali gönder
-        await send_signal_to_all_users(message)
+        # Sinyali gönderim kuyruğuna yaz (teslimatı outbox göndericisi yapar)
+        await enqueue_notification(f"signal_{symbol}_{current_signal_time}", message, "signal_open", symbol, signal_side(dominant_signal))
         
         # KRİTİK: Mesaj gönderildikten HEMEN SONRA işaretle (duplicate önleme)
         mark_signal_sent(symbol)
@@ -2931,6 +4989,351 @@ async def check_existing_positions_and_cooldowns(positions, active_signals, stat
     
     print(f"✅ Bot başlangıcı kontrolü tamamlandı: {len(positions)} pozisyon, {len(active_signals)} aktif sinyal, {len(stop_cooldown)} cooldown")
     print("✅ Bot başlangıcı kontrolü tamamlandı")
+# Binance mumları UTC epoch'a hizalıdır (1d 00:00 UTC'de, 8h 00/08/16 UTC'de kapanır)
+TIMEFRAME_SECONDS = {
+    '15m': 15 * 60,
+    '30m': 30 * 60,
+    '1h': 60 * 60,
+    '2h': 2 * 60 * 60,
+    '4h': 4 * 60 * 60,
+    '8h': 8 * 60 * 60,
+    '1d': 24 * 60 * 60,
+}
+
+def seconds_until_next_candle_close(tf_names, now_ts=None):
+    """Verilen zaman dilimlerinden en yakın mum kapanışına kalan süreyi döndürür"""
+    if now_ts is None:
+        now_ts = time.time()
+    return min(TIMEFRAME_SECONDS[tf] - (now_ts % TIMEFRAME_SECONDS[tf]) for tf in tf_names)
+
+def get_rolled_timeframes(previous_ts, now_ts, tf_names):
+    """İki an arasında mumu kapanan (yeni mum açılan) zaman dilimlerini döndürür"""
+    return {
+        tf for tf in tf_names
+        if int(now_ts // TIMEFRAME_SECONDS[tf]) != int(previous_ts // TIMEFRAME_SECONDS[tf])
+    }
+
+async def wait_for_next_candle_close(tf_names, previous_ts=None):
+    """
+    Bir sonraki mum kapanışına kadar bekler (kapanış gecikmesi + jitter eklenir).
+    previous_ts sonrası zaten bir kapanış olduysa (uzun süren tarama) beklemeden döner.
+    Dönüş: (uyanma anı, previous_ts'den bu yana mumu kapanan zaman dilimleri)
+    """
+    now_ts = time.time()
+    if previous_ts is None:
+        previous_ts = now_ts
+    settle_ts = now_ts - CONFIG["SCHEDULER_CLOSE_DELAY_SECONDS"]
+    if not get_rolled_timeframes(previous_ts, max(previous_ts, settle_ts), tf_names):
+        delay = seconds_until_next_candle_close(tf_names, now_ts)
+        delay += CONFIG["SCHEDULER_CLOSE_DELAY_SECONDS"] + random.uniform(0, CONFIG["SCHEDULER_JITTER_SECONDS"])
+        wake_at = datetime.now() + timedelta(seconds=delay)
+        print(f"⏰ Sonraki mum kapanışı için {delay:.0f} saniye bekleniyor (uyanma: {wake_at.strftime('%H:%M:%S')})")
+        await asyncio.sleep(delay)
+        now_ts = time.time()
+    rolled = get_rolled_timeframes(previous_ts, now_ts, tf_names)
+    print(f"🕯️ Mumu kapanan zaman dilimleri: {', '.join(tf for tf in tf_names if tf in rolled) or 'yok'}")
+    return now_ts, rolled
+
+# ---------------------------------------------------------------------------
+# Aşamalı tarama hattı
+# üretici → veri çekme → indikatör hesaplama → kural/doğrulama → batch seçici → gönderici
+# Aşamalar sınırlı asyncio kuyruklarıyla bağlıdır; yavaş bir aşama (ör. MongoDB yazımı)
+# kuyruğu dolunca öncekileri yavaşlatır (backpressure) ama diğer işçileri durdurmaz.
+# Her sembol hattan tam bir kez çıkar: elenen semboller doğrudan seçiciye bildirilir,
+# böylece seçici her batch'in ne zaman tamamlandığını bilir.
+# ---------------------------------------------------------------------------
+
+_PIPELINE_DONE = object()
+scan_pipeline_stats = {}  # {aşama: {"processed": int, "dropped": int, "max_depth": int, "busy_seconds": float}}
+scan_skip_report = {}  # {symbol: neden} - son taramada süre bütçesi nedeniyle atlanan semboller
+
+def _pipeline_stage_stats(stage):
+    return scan_pipeline_stats.setdefault(stage, {"processed": 0, "dropped": 0, "max_depth": 0, "busy_seconds": 0.0})
+
+async def _pipeline_put(queue, item, stage):
+    """Kuyruğa ekler ve kuyruk derinliği metriğini günceller"""
+    await queue.put(item)
+    stats = _pipeline_stage_stats(stage)
+    stats["max_depth"] = max(stats["max_depth"], queue.qsize())
+
+async def _run_pipeline_stage(stage, in_queue, out_queue, selector_queue, handler, workers, out_stage, next_workers):
+    """Bir aşamanın işçilerini çalıştırır; handler None dönerse öğe elenmiş sayılır ve seçiciye bildirilir"""
+    stats = _pipeline_stage_stats(stage)
+
+    async def worker():
+        while True:
+            item = await in_queue.get()
+            if item is _PIPELINE_DONE:
+                return
+            started = time.perf_counter()
+            # Sembol bütçesi ilk aşamada başlar ve sonraki aşamalara taşınır (tarama bütçesini aşamaz)
+            if "budget_deadline" not in item:
+                item["budget_deadline"] = asyncio.get_running_loop().time() + CONFIG["SYMBOL_DEADLINE_SECONDS"]
+            try:
+                async with deadline_scope(item["budget_deadline"] - asyncio.get_running_loop().time()):
+                    result = await handler(item)
+            except TimeoutError:
+                scan_skip_report[item['symbol']] = f"süre bütçesi doldu ({stage})"
+                result = None
+            except (ScanDeadlineExceeded, CircuitOpenError) as e:
+                scan_skip_report[item['symbol']] = f"{e} ({stage})"
+                result = None
+            except Exception as e:
+                print(f"❌ {item['symbol']} tarama hattı ({stage}) hatası: {e}")
+                result = None
+            elapsed = time.perf_counter() - started
+            stats["busy_seconds"] += elapsed
+            metric_observe("scan_stage_seconds", elapsed, stage=stage)
+            stats["processed"] += 1
+            if result is None:
+                stats["dropped"] += 1
+                await _pipeline_put(selector_queue, item, "selector")
+            else:
+                await _pipeline_put(out_queue, result, out_stage)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    for _ in range(next_workers):
+        await out_queue.put(_PIPELINE_DONE)
+
+async def dispatch_batch_signals(batch_num, batch_signals, scan):
+    """Batch'teki en hacimli sinyali seçer, gönderir ve diğerlerini cooldown'a alır; gönderildiyse True"""
+    global global_positions, global_active_signals, active_signals
+
+    positions = scan["positions"]
+    if not batch_signals:
+        print(f"📊 Batch {batch_num + 1}: Sinyal bulunamadı")
+        return False
+    print(f"📊 Batch {batch_num + 1}: {len(batch_signals)} sinyal bulundu")
+    
+    # Hacim bazlı sırala (eşit hacimde sembol sırası korunur)
+    sorted_batch_signals = sorted(
+        batch_signals.items(),
+        key=lambda item: (-item[1]['volume'], item[1]['index'])
+    )
+    
+    # En yüksek hacimli sinyali seç
+    best_signal_symbol, best_signal_info = sorted_batch_signals[0]
+    best_signal_data = best_signal_info['signal_data']
+    best_signal_volume = best_signal_info['volume']
+    
+    # KRİTİK: Son bir kez daha kontrol et (race condition önleme)
+    if best_signal_symbol in positions:
+        print(f"⏸️ {best_signal_symbol} → Pozisyon var, atlanıyor")
+        return False
+    
+    # KRİTİK: Aktif sinyal kontrolü - hem dictionary'den hem MongoDB'den
+    if best_signal_symbol in active_signals:
+        print(f"⏸️ {best_signal_symbol} → Zaten aktif sinyal var (dictionary), atlanıyor")
+        return False
+    
+    # MongoDB'den de kontrol et (dictionary güncel olmayabilir)
+    try:
+        existing_active_signal = mongo_collection.find_one({"_id": f"active_signal_{best_signal_symbol}"})
+        if existing_active_signal:
+            print(f"⏸️ {best_signal_symbol} → Zaten aktif sinyal var (MongoDB), atlanıyor")
+            return False
+    except Exception as e:
+        print(f"⚠️ {best_signal_symbol} → MongoDB aktif sinyal kontrolü hatası: {e}")
+    
+    load_recently_sent_from_db()
+    if check_recently_sent(best_signal_symbol, minutes=10):
+        print(f"⏸️ {best_signal_symbol} → Son 10 dakika içinde sinyal gönderilmiş, atlanıyor")
+        return False
+    
+    print(f"🏆 Batch {batch_num + 1} en hacimli sinyal: {best_signal_symbol} (Hacim: {best_signal_volume:,.0f})")
+    
+    # Sinyali işle ve gönder
+    result = await process_selected_signal(best_signal_data, positions, active_signals, scan["stats"])
+    
+    if result:
+        # NOT: mark_signal_sent zaten process_selected_signal içinde çağrılıyor, tekrar çağırmaya gerek yok
+        # Ancak positions ve active_signals güncellenmiş olabilir, tekrar yükle
+        scan["positions"] = load_positions_from_db()
+        active_signals = load_active_signals_from_db()
+        
+        # Cooldown'a ekle (30 dakika)
+        await set_signal_cooldown_to_db([best_signal_symbol], timedelta(minutes=CONFIG["COOLDOWN_MINUTES"]))
+        
+        # Pozisyonları ve aktif sinyalleri güncelle (global değişkenlere de)
+        global_positions = dict(scan["positions"])
+        global_active_signals = dict(active_signals)
+        
+        print(f"✅ {best_signal_symbol} sinyali gönderildi, veritabanı güncellendi")
+    else:
+        print(f"⚠️ {best_signal_symbol} sinyali işlenemedi (muhtemelen zaten gönderilmiş)")
+    
+    # Batch'teki diğer sinyaller için cooldown uygula (30 dakika)
+    other_symbols = [s for s in batch_signals.keys() if s != best_signal_symbol]
+    if other_symbols:
+        await set_signal_cooldown_to_db(other_symbols, timedelta(minutes=CONFIG["COOLDOWN_MINUTES"]))
+        print(f"⏳ Batch {batch_num + 1}'deki diğer {len(other_symbols)} sinyal 30 dakika cooldown'a alındı")
+    return bool(result)
+
+async def run_signal_scan_pipeline(symbols, scan):
+    """
+    Sembolleri aşamalı hattan geçirir ve batch'leri sırayla gönderir.
+    scan: positions, stats, stop_cooldown, timeframes, tf_names, previous_signals,
+          universe_signals, universe_rule_misses, expired_cooldown_signals
+    Dönüş: bu taramada gönderilen sinyal sayısı
+    """
+    scan_pipeline_stats.clear()
+    scan_skip_report.clear()
+    batch_size = CONFIG["SCAN_BATCH_SIZE"]
+    total_batches = (len(symbols) + batch_size - 1) // batch_size
+    queue_size = CONFIG["PIPELINE_QUEUE_SIZE"]
+    fetch_workers = CONFIG["PIPELINE_FETCH_WORKERS"]
+    compute_workers = CONFIG["PIPELINE_COMPUTE_WORKERS"]
+    rule_workers = CONFIG["PIPELINE_RULE_WORKERS"]
+    fetch_queue = asyncio.Queue(queue_size)
+    compute_queue = asyncio.Queue(queue_size)
+    rule_queue = asyncio.Queue(queue_size)
+    selector_queue = asyncio.Queue(queue_size)
+    dispatch_queue = asyncio.Queue(queue_size)
+    timeframes = scan["timeframes"]
+    tf_names = scan["tf_names"]
+
+    async def produce():
+        """Ucuz (bellek içi) filtreleri uygular ve sembolleri hatta sokar"""
+        stats = _pipeline_stage_stats("producer")
+        for index, symbol in enumerate(symbols):
+            item = {"index": index, "batch": index // batch_size, "symbol": symbol}
+            stats["processed"] += 1
+            drop = (
+                symbol in scan["positions"] or
+                symbol in scan["universe_rule_misses"] or
+                check_cooldown(symbol, scan["stop_cooldown"], CONFIG["COOLDOWN_HOURS"])
+            )
+            if not drop and check_recently_sent(symbol, minutes=10):
+                print(f"⏸️ {symbol} → Son 10 dakika içinde sinyal gönderilmiş, atlanıyor")
+                drop = True
+            # Tarama bütçesi bittiyse kalan semboller hatta alınmaz
+            remaining = remaining_scan_budget()
+            if not drop and remaining is not None and remaining <= 0:
+                scan_skip_report[symbol] = "tarama süre bütçesi doldu (kuyruğa alınmadı)"
+                drop = True
+            if drop:
+                stats["dropped"] += 1
+                await _pipeline_put(selector_queue, item, "selector")
+            else:
+                await _pipeline_put(fetch_queue, item, "fetch")
+        for _ in range(fetch_workers):
+            await fetch_queue.put(_PIPELINE_DONE)
+
+    async def fetch(item):
+        symbol = item["symbol"]
+        # Sinyal cooldown kontrolü - süresi bitenler hariç
+        if await check_signal_cooldown(symbol):
+            if symbol not in scan["expired_cooldown_signals"]:
+                return None
+            print(f"🔄 {symbol} sinyal cooldown süresi bitti, tekrar değerlendiriliyor")
+        # 1 günlük veri al - 1d timeframe için gerekli
+        df_1d = await async_get_historical_data(symbol, timeframes['1d'], 30)
+        if df_1d is None or df_1d.empty:
+            return None
+        precomputed = scan["universe_signals"].get(symbol)
+        if precomputed is not None:
+            item["signals"] = dict(precomputed)
+        else:
+            item["frames"] = await fetch_signal_frames(symbol, timeframes, tf_names)
+            if item["frames"] is None:
+                return None
+        return item
+
+    async def compute(item):
+        if "signals" not in item:
+            item["signals"] = await compute_signals_from_frames(item["symbol"], item.pop("frames"), timeframes, tf_names)
+            if item["signals"] is None:
+                return None
+        return item
+
+    async def evaluate(item):
+        symbol = item["symbol"]
+        candidate = evaluate_signal_candidate(symbol, item["signals"], tf_names, scan["previous_signals"])
+        if candidate is None:
+            return None
+        signal_result = await confirm_signal_candidate(symbol, item["signals"], candidate)
+        if not signal_result:
+            return None
+        print(f"🔥 SİNYAL YAKALANDI: {symbol}!")
+        if symbol in MAJOR_COIN_SYMBOLS:
+            print(f"   🎯 Major coin (BTC/ETH) - 5/7 kuralı sağlandı!")
+        else:
+            print(f"   🎯 15m mum kontrolü başarılı - Sinyal kalitesi onaylandı!")
+        item["signal_data"] = signal_result
+        return item
+
+    async def select():
+        """Batch'ler tamamlandıkça sırayla göndericiye aktarır"""
+        batch_expected = {batch: min(batch_size, len(symbols) - batch * batch_size) for batch in range(total_batches)}
+        batch_items = {batch: [] for batch in range(total_batches)}
+        next_batch = 0
+        while next_batch < total_batches:
+            item = await selector_queue.get()
+            batch_items[item["batch"]].append(item)
+            while next_batch < total_batches and len(batch_items[next_batch]) == batch_expected[next_batch]:
+                batch_signals = {
+                    found["symbol"]: {
+                        'signal_data': found["signal_data"],
+                        'volume': found["signal_data"].get('volume_usd', 0),
+                        'index': found["index"]
+                    }
+                    for found in batch_items.pop(next_batch) if found.get("signal_data")
+                }
+                await _pipeline_put(dispatch_queue, (next_batch, batch_signals), "dispatch")
+                next_batch += 1
+        await dispatch_queue.put(_PIPELINE_DONE)
+
+    async def dispatch():
+        """Batch'leri sırayla işler (pozisyon durumu batch'ler arasında taşındığı için tek işçi)"""
+        stats = _pipeline_stage_stats("dispatch")
+        processed_count = 0
+        while True:
+            entry = await dispatch_queue.get()
+            if entry is _PIPELINE_DONE:
+                return processed_count
+            batch_num, batch_signals = entry
+            batch_count = min(batch_size, len(symbols) - batch_num * batch_size)
+            print(f"📊 Batch {batch_num + 1}/{total_batches}: {batch_count} kripto kontrol edildi")
+            started = time.perf_counter()
+            try:
+                if await dispatch_batch_signals(batch_num, batch_signals, scan):
+                    processed_count += 1
+            except Exception as e:
+                print(f"❌ Batch {batch_num + 1} gönderim hatası: {e}")
+            elapsed = time.perf_counter() - started
+            stats["busy_seconds"] += elapsed
+            metric_observe("scan_stage_seconds", elapsed, stage="dispatch")
+            stats["processed"] += 1
+
+    print(f"🔄 {total_batches} batch halinde işlenecek (her batch {batch_size} kripto)")
+    results = await asyncio.gather(
+        produce(),
+        _run_pipeline_stage("fetch", fetch_queue, compute_queue, selector_queue, fetch, fetch_workers, "compute", compute_workers),
+        _run_pipeline_stage("compute", compute_queue, rule_queue, selector_queue, compute, compute_workers, "rule", rule_workers),
+        _run_pipeline_stage("rule", rule_queue, selector_queue, selector_queue, evaluate, rule_workers, "selector", 0),
+        select(),
+        dispatch()
+    )
+    summary = ", ".join(
+        f"{stage}: {data['processed']} işlendi/{data['dropped']} elendi, maks kuyruk {data['max_depth']}, {data['busy_seconds']:.1f}s"
+        for stage, data in scan_pipeline_stats.items()
+    )
+    print(f"📈 Tarama hattı: {summary}")
+    report_scan_skips()
+    return results[-1]
+
+def report_scan_skips():
+    """Süre bütçesi nedeniyle atlanan sembolleri nedenlerine göre gruplayarak yazdırır"""
+    if not scan_skip_report:
+        return
+    by_reason = {}
+    for symbol, reason in scan_skip_report.items():
+        by_reason.setdefault(reason, []).append(symbol)
+    print(f"⏱️ Süre bütçesi nedeniyle {len(scan_skip_report)} sembol atlandı:")
+    for reason, skipped in by_reason.items():
+        more = f" ... ve {len(skipped) - 5} tane daha" if len(skipped) > 5 else ""
+        print(f"   • {reason}: {', '.join(skipped[:5])}{more}")
+
 async def signal_processing_loop():
     """Sinyal arama ve işleme döngüsü"""
     # Global değişkenleri tanımla
@@ -2938,7 +5341,7 @@ async def signal_processing_loop():
 
     positions = dict()  # {symbol: position_info}
     stop_cooldown = dict()  # {symbol: datetime}
-    previous_signals = dict()  # {symbol: {tf: signal}} - İlk çalıştığında kaydedilen sinyaller
+    previous_signals = dict()  # {symbol: pack_signals(...)} - İlk çalıştığında kaydedilen sinyaller (14 bitlik maske)
     active_signals = dict()  # {symbol: {...}} - Aktif sinyaller
     successful_signals = dict()  # {symbol: {...}} - Başarılı sinyaller (hedefe ulaşan)
     failed_signals = dict()  # {symbol: {...}} - Başarısız sinyaller (stop olan)
@@ -3039,10 +5442,17 @@ async def signal_processing_loop():
     # Periyodik pozisyon kontrolü için sayaç
     position_check_counter = 0
 
+    # Mum kapanışına hizalı zamanlayıcı durumu - ilk taramada tüm zaman dilimleri hesaplanır
+    last_wake_ts = time.time()
+    last_scan_ts = None  # Son toplu taramanın zamanı - mumu kapanan zaman dilimleri buna göre belirlenir
+    universe_signal_cache = {}  # {symbol: {tf: signal}} - son taramanın toplu sinyalleri
+
     # Race condition önleme için pozisyon işlem flag'leri
     global position_processing_flags
 
     while True:
+        # Önceki turdan kalan tarama bütçesi bu turun diğer işlerini etkilemesin
+        clear_scan_budget()
         try:
             if not ensure_mongodb_connection():
                 print("⚠️ MongoDB bağlantısı kurulamadı, 30 saniye bekleniyor...")
@@ -3213,6 +5623,9 @@ async def signal_processing_loop():
             # Aktif pozisyonları ve cooldown'daki coinleri korumalı semboller listesine ekle
             protected_symbols = set(positions.keys()) | set(stop_cooldown.keys())
             
+            # Uzun ömürlü sözlükleri periyodik olarak buda (kapalı saatlerde de çalışır)
+            prune_long_lived_state(previous_signals, protected_symbols)
+            
             # 🔴 KAPALI SAAT KONTROLÜ - Binance API çağrısından ÖNCE kontrol et
             # Türkiye saati kontrolü - 23:15-03:15 arasında yeni sinyal arama yapma
             # NOT: monitor_signals() ayrı döngüde çalışıyor ve aktif pozisyonları takip etmeye devam ediyor
@@ -3221,8 +5634,8 @@ async def signal_processing_loop():
                 print(f"   📊 Aktif pozisyonlar ({len(positions)}): monitor_signals() tarafından takip ediliyor")
                 print(f"   ⏳ Binance'den yeni coin verisi çekilMİYOR (API tasarrufu)")
                 
-                # Aktif pozisyonlar monitor_signals() tarafından takip ediliyor, burada sadece bekle
-                await asyncio.sleep(CONFIG["MAIN_LOOP_SLEEP_SECONDS"])
+                # Aktif pozisyonlar monitor_signals() tarafından takip ediliyor, burada sadece bir sonraki mum kapanışını bekle
+                last_wake_ts, _ = await wait_for_next_candle_close(tf_names, last_wake_ts)
                 continue
             
             # Sinyal arama için kullanılacak sembolleri filtrele
@@ -3233,8 +5646,22 @@ async def signal_processing_loop():
                 if len(stop_cooldown) > 5:
                     print(f"   ... ve {len(stop_cooldown) - 5} tane daha")
             
+            # Binance sağlıksızsa (devre açık) tarama askıya alınır, prob zamanı gelince tekrar denenir
+            blocked_endpoints = [url for url in BINANCE_SCAN_ENDPOINTS if not await circuit_allows(url)]
+            if blocked_endpoints:
+                wait_seconds = max(circuit_retry_after(url) for url in blocked_endpoints)
+                print(f"🔌 Binance devre kesici açık ({', '.join(urlsplit(url).path for url in blocked_endpoints)}) - sinyal taraması {wait_seconds:.0f}s askıya alındı")
+                await asyncio.sleep(max(wait_seconds, 1))
+                continue
+            
+            # Tarama süre bütçesi burada başlar: sembol listesi → toplu hesaplama → hat → gönderim
+            start_scan_budget(CONFIG["SCAN_DEADLINE_SECONDS"])
+            retry_stats_before = get_api_retry_stats()
+            scan_cycle_started = time.perf_counter()
+            
             # Cooldown'daki coinleri sinyal arama listesine hiç ekleme
             new_symbols = await get_active_high_volume_usdt_pairs(100, stop_cooldown)  # İlk 100 sembol (cooldown filtrelenmiş)
+            global_scan_universe.update(symbols=list(new_symbols), updated_at=datetime.now())
             print(f"✅ Cooldown filtresi uygulandı. Filtrelenmiş sembol sayısı: {len(new_symbols)}")
             
             # STOP COOLDOWN'DAKİ COİNLERİ KESİNLİKLE ÇIKAR
@@ -3341,143 +5768,88 @@ async def signal_processing_loop():
             # Son gönderilen sinyalleri yükle
             load_recently_sent_from_db()
             
-            # 10'luk gruplar halinde işleme sistemi
-            batch_size = 10
-            total_batches = (len(symbols) + batch_size - 1) // batch_size
-            processed_count = 0  # Bu döngüde işlenen sinyal sayacı
-            
-            print(f"🔄 {total_batches} batch halinde işlenecek (her batch {batch_size} kripto)")
-            
-            for batch_num in range(total_batches):
-                start_idx = batch_num * batch_size
-                end_idx = min(start_idx + batch_size, len(symbols))
-                batch_symbols = symbols[start_idx:end_idx]
-                
-                print(f"📊 Batch {batch_num + 1}/{total_batches}: {len(batch_symbols)} kripto kontrol ediliyor...")
-                
-                # KRİTİK: Her batch'ten önce son gönderilen sinyalleri yeniden yükle (güncel veri için)
-                load_recently_sent_from_db()
-                
-                # Bu batch için sinyal arama
-                batch_signals = {}  # {symbol: {signal_data, volume}}
-                
-                for symbol in batch_symbols:
-                    # Halihazırda pozisyon varsa atla
-                    if symbol in positions:
-                        continue
-                    
-                    # KRİTİK: Son 10 dakika içinde bu coin için sinyal gönderilmiş mi?
-                    if check_recently_sent(symbol, minutes=10):
-                        print(f"⏸️ {symbol} → Son 10 dakika içinde sinyal gönderilmiş, atlanıyor")
-                        continue
-                    
-                    # STOP COOLDOWN KONTROLÜ - 8 saat boyunca kesinlikle sinyal verilmez!
-                    if check_cooldown(symbol, stop_cooldown, CONFIG["COOLDOWN_HOURS"]):
-                        continue
-                    
-                    # Sinyal cooldown kontrolü - süresi bitenler hariç
-                    if await check_signal_cooldown(symbol):
-                        # Cooldown süresi biten sinyaller tekrar değerlendirilecek
-                        if symbol in expired_cooldown_signals:
-                            print(f"🔄 {symbol} sinyal cooldown süresi bitti, tekrar değerlendiriliyor")
-                        else:
-                            # Hala cooldown'da olan sinyaller atlanır
-                            continue
-                    
-                    # Sinyal potansiyelini kontrol et
-                    signal_result = await check_signal_potential(
-                        symbol, positions, stop_cooldown, timeframes, tf_names, previous_signals
-                    )
-                    
-                    # EĞER SİNYAL BULUNDUYSA, batch_signals'a ekle
-                    if signal_result:
-                        print(f"🔥 SİNYAL YAKALANDI: {symbol}!")
-                        if symbol in ['BTCUSDT', 'ETHUSDT']:
-                            print(f"   🎯 Major coin (BTC/ETH) - 5/7 kuralı sağlandı!")
-                        else:
-                            print(f"   🎯 15m mum kontrolü başarılı - Sinyal kalitesi onaylandı!")
-                        
-                        # Hacim bilgisini de ekle
-                        batch_signals[symbol] = {
-                            'signal_data': signal_result,
-                            'volume': signal_result.get('volume_usd', 0)
-                        }
-                
-                # Bu batch için sinyal işleme
-                if batch_signals:
-                    print(f"📊 Batch {batch_num + 1}: {len(batch_signals)} sinyal bulundu")
-                    
-                    # Hacim bazlı sırala
-                    sorted_batch_signals = sorted(
-                        batch_signals.items(),
-                        key=lambda item: item[1]['volume'],
-                        reverse=True
-                    )
-                    
-                    # En yüksek hacimli sinyali seç
-                    best_signal_symbol, best_signal_info = sorted_batch_signals[0]
-                    best_signal_data = best_signal_info['signal_data']
-                    best_signal_volume = best_signal_info['volume']
-                    
-                    # KRİTİK: Son bir kez daha kontrol et (race condition önleme)
-                    if best_signal_symbol in positions:
-                        print(f"⏸️ {best_signal_symbol} → Pozisyon var, atlanıyor")
-                        continue
-                    
-                    # KRİTİK: Aktif sinyal kontrolü - hem dictionary'den hem MongoDB'den
-                    if best_signal_symbol in active_signals:
-                        print(f"⏸️ {best_signal_symbol} → Zaten aktif sinyal var (dictionary), atlanıyor")
-                        continue
-                    
-                    # MongoDB'den de kontrol et (dictionary güncel olmayabilir)
-                    try:
-                        existing_active_signal = mongo_collection.find_one({"_id": f"active_signal_{best_signal_symbol}"})
-                        if existing_active_signal:
-                            print(f"⏸️ {best_signal_symbol} → Zaten aktif sinyal var (MongoDB), atlanıyor")
-                            continue
-                    except Exception as e:
-                        print(f"⚠️ {best_signal_symbol} → MongoDB aktif sinyal kontrolü hatası: {e}")
-                    
-                    if check_recently_sent(best_signal_symbol, minutes=10):
-                        print(f"⏸️ {best_signal_symbol} → Son 10 dakika içinde sinyal gönderilmiş, atlanıyor")
-                        continue
-                    
-                    print(f"🏆 Batch {batch_num + 1} en hacimli sinyal: {best_signal_symbol} (Hacim: {best_signal_volume:,.0f})")
-                    
-                    # Sinyali işle ve gönder
-                    result = await process_selected_signal(best_signal_data, positions, active_signals, stats)
-                    
-                    if result:
-                        # NOT: mark_signal_sent zaten process_selected_signal içinde çağrılıyor, tekrar çağırmaya gerek yok
-                        # Ancak positions ve active_signals güncellenmiş olabilir, tekrar yükle
-                        positions = load_positions_from_db()
-                        active_signals = load_active_signals_from_db()
-                        processed_count += 1
-                        
-                        # Cooldown'a ekle (30 dakika)
-                        await set_signal_cooldown_to_db([best_signal_symbol], timedelta(minutes=CONFIG["COOLDOWN_MINUTES"]))
-                        
-                        # Pozisyonları ve aktif sinyalleri güncelle (global değişkenlere de)
-                        global_positions = dict(positions)
-                        global_active_signals = dict(active_signals)
-                        
-                        print(f"✅ {best_signal_symbol} sinyali gönderildi, veritabanı güncellendi")
-                    else:
-                        print(f"⚠️ {best_signal_symbol} sinyali işlenemedi (muhtemelen zaten gönderilmiş)")
-                    
-                    # Batch'teki diğer sinyaller için cooldown uygula (30 dakika)
-                    other_symbols = [s for s in batch_signals.keys() if s != best_signal_symbol]
-                    if other_symbols:
-                        await set_signal_cooldown_to_db(other_symbols, timedelta(minutes=CONFIG["COOLDOWN_MINUTES"]))
-                        print(f"⏳ Batch {batch_num + 1}'deki diğer {len(other_symbols)} sinyal 30 dakika cooldown'a alındı")
+            # Canlı mum deposunun akış aboneliklerini güncel tarama evrenine göre ayarla
+            if CONFIG["WS_CANDLE_STORE_ENABLED"]:
+                try:
+                    await update_candle_store_universe(symbols, [timeframes[tf] for tf in tf_names])
+                except Exception as e:
+                    print(f"⚠️ Mum deposu abonelik güncelleme hatası: {e}")
+
+            # Tüm evrenin sinyallerini zaman dilimi başına tek toplu hesaplamayla üret
+            universe_signals = {}
+            if CONFIG["BATCH_SIGNAL_MODE"]:
+                scan_symbols = [symbol for symbol in symbols if symbol not in positions]
+                # İsteğe bağlı: mumu kapanmayan zaman dilimlerini önceki taramadan al, sadece kapananları hesapla
+                scan_ts = time.time()
+                compute_tfs = tf_names
+                if CONFIG["SCHEDULER_REUSE_UNROLLED_TIMEFRAMES"] and universe_signal_cache and last_scan_ts is not None:
+                    rolled_timeframes = get_rolled_timeframes(last_scan_ts, scan_ts, tf_names)
+                    compute_tfs = [tf for tf in tf_names if tf in rolled_timeframes]
+                    cached_symbols = [symbol for symbol in scan_symbols if symbol in universe_signal_cache]
+                    missing_symbols = [symbol for symbol in scan_symbols if symbol not in universe_signal_cache]
                 else:
-                    print(f"📊 Batch {batch_num + 1}: Sinyal bulunamadı")
+                    cached_symbols, missing_symbols = [], scan_symbols
+                try:
+                    universe_signals = {}
+                    async with deadline_scope():
+                        if cached_symbols and compute_tfs:
+                            fresh_signals = await calculate_universe_signals(cached_symbols, timeframes, compute_tfs)
+                            for symbol, fresh in fresh_signals.items():
+                                universe_signals[symbol] = {**universe_signal_cache[symbol], **fresh}
+                        elif cached_symbols:
+                            universe_signals = {symbol: dict(universe_signal_cache[symbol]) for symbol in cached_symbols}
+                        if missing_symbols:
+                            universe_signals.update(await calculate_universe_signals(missing_symbols, timeframes, tf_names))
+                    universe_signal_cache = universe_signals
+                    last_scan_ts = scan_ts
+                except TimeoutError:
+                    print("⏱️ Toplu sinyal hesaplaması tarama süre bütçesini aştı, sembol bazlı hesaplamaya dönülüyor")
+                    universe_signals = {}
+                    universe_signal_cache = {}
+                except Exception as e:
+                    print(f"⚠️ Toplu sinyal hesaplaması başarısız, sembol bazlı hesaplamaya dönülüyor: {e}")
+                    universe_signals = {}
+                    universe_signal_cache = {}
+
+            # Kuralları tüm evren için tek maske işlemiyle değerlendir, kuralı sağlamayanları baştan ele
+            universe_rule_misses = set()
+            if universe_signals:
+                with metric_timer("scan_stage_seconds", stage="rule_matrix"):
+                    matrix_symbols, signal_matrix = build_signal_matrix(universe_signals, tf_names)
+                    buy_masks, sell_masks = signal_matrix_to_masks(signal_matrix)
+                    major_flags = np.isin(matrix_symbols, MAJOR_COIN_SYMBOLS)
+                    rule_directions, _ = evaluate_signal_rules(buy_masks, sell_masks, major_flags)
+                for idx, symbol in enumerate(matrix_symbols):
+                    if rule_directions[idx] == 0:
+                        universe_rule_misses.add(symbol)
+                        previous_signals[symbol] = int(buy_masks[idx]) | (int(sell_masks[idx]) << SIGNAL_MASK_BITS)
+                print(f"🧮 Kural değerlendirmesi: {len(matrix_symbols) - len(universe_rule_misses)}/{len(matrix_symbols)} sembol 5/7-7/7 kuralını sağlıyor")
+            
+            # Aşamalı tarama hattı: veri çekme → hesaplama → kural → batch seçimi → gönderim
+            scan = {
+                "positions": positions,
+                "stats": stats,
+                "stop_cooldown": stop_cooldown,
+                "timeframes": timeframes,
+                "tf_names": tf_names,
+                "previous_signals": previous_signals,
+                "universe_signals": universe_signals,
+                "universe_rule_misses": universe_rule_misses,
+                "expired_cooldown_signals": expired_cooldown_signals
+            }
+            processed_count = await run_signal_scan_pipeline(symbols, scan)
+            clear_scan_budget()
+            report_api_retry_cost(retry_stats_before)
+            metric_observe("scan_cycle_seconds", time.perf_counter() - scan_cycle_started)
+            positions = scan["positions"]
             
             if processed_count == 0:
                 print("🔍 Yeni sinyal bulunamadı.")
                 print("   ℹ️ Bazı sinyaller 7/7 kuralını sağladı ancak 15m mum rengi uygun değildi")
                 print("   🔄 Bu sinyaller sonraki kontrolde tekrar değerlendirilecek")
                 await clear_cooldown_status()
+                # Sinyal yoksa da yeni tarama bir sonraki mum kapanışından hemen sonra başlar
+                last_wake_ts, _ = await wait_for_next_candle_close(tf_names, last_wake_ts)
                 continue
             
             print(f"✅ Tarama döngüsü tamamlandı. Bu turda {processed_count} yeni sinyal işlendi ve gönderildi.")
@@ -3844,6 +6216,7 @@ async def signal_processing_loop():
             global_stop_cooldown = dict(stop_cooldown)
             global_allowed_users = set(ALLOWED_USERS)  # set() kopyalama
             global_admin_users = set(ADMIN_USERS)
+            publish_snapshot(active_signals, stats)
             
             save_stats_to_db(stats)
             save_active_signals_to_db(active_signals)
@@ -3919,16 +6292,280 @@ async def signal_processing_loop():
             except:
                 pass
             print("=" * 60)
-            print("⏰ 15 dakika sonra yeni sinyal arama döngüsü başlayacak...")
+            print("⏰ Bir sonraki 15m mum kapanışında yeni sinyal arama döngüsü başlayacak...")
             print("   - Tüm coinler tekrar taranacak")
             print("   - Cooldown süresi biten sinyaller tekrar değerlendirilecek")
             print("   - Yeni sinyaller + cooldown'dan çıkanlar birlikte işlenecek")
             print("=" * 60)
-            await asyncio.sleep(900)  # 15 dakika (900 saniye)
+            last_wake_ts, _ = await wait_for_next_candle_close(tf_names, last_wake_ts)
             
         except Exception as e:
             print(f"Genel hata: {e}")
             await asyncio.sleep(30)  # 30 saniye (çok daha hızlı)
+monitor_last_prices = {}  # {symbol: son başarılı ticker fiyatı} - devre açıkken izleme buna düşer
+monitor_price_live = {}  # {symbol: son fiyat denemesi canlı mıydı} - False ise monitor_last_prices bayat
+
+async def fetch_monitor_price(symbol):
+    """İzleme için anlık fiyat -> (fiyat, canlı_mı); devre kesici açıksa son geçerli fiyatı döndürür"""
+    try:
+        ticker = await fetch_futures_24h(symbol, hedged=True, session=get_monitor_session())
+    except CircuitOpenError:
+        if symbol in monitor_last_prices:
+            monitor_price_live[symbol] = False
+            return monitor_last_prices[symbol], False
+        raise
+    price = float(ticker['lastPrice'])
+    monitor_last_prices[symbol] = price
+    monitor_price_live[symbol] = True
+    return price, True
+
+monitor_next_check = {}  # {symbol: time.monotonic() cinsinden bir sonraki kontrol zamanı}
+monitor_clear_seen_at = {}  # {symbol: time.time()} - canlı fiyatın TP/SL'yi geçmediği son gözlem
+
+def observe_tpsl_detection(symbol, source, crossed_after=None):
+    """Seviyenin geçildiği bilinen en geç 'geçilmemiş' an (son temiz gözlem / tetikleyen mumun
+    açılışı) ile close_position çağrısı arasındaki süre - gerçek gecikmenin üst sınırı"""
+    seen = [t for t in (monitor_clear_seen_at.pop(symbol, None), crossed_after) if t is not None]
+    if seen:
+        metric_observe("tpsl_detection_delay_seconds", max(0.0, time.time() - max(seen)), source=source)
+monitor_atr = {}  # {symbol: son 1m ATR} - kontrol aralığını belirler
+
+def klines_atr(klines, period=14):
+    """Ham 1m kline listesinden basit ATR (son period mumun gerçek aralık ortalaması)"""
+    _, ohlcv = parse_klines(klines[-(period + 1):])
+    high, low, close = ohlcv[1], ohlcv[2], ohlcv[3]
+    if len(close) < 2:
+        return float(high[-1] - low[-1]) if len(close) else 0.0
+    prev_close = close[:-1]
+    true_range = np.maximum(high[1:] - low[1:], np.maximum(np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)))
+    return float(true_range.mean())
+
+def monitor_check_interval(symbol, signal):
+    """İstenen kontrol aralığı: en yakın TP/SL'ye ATR cinsinden uzaklığın karesiyle büyür
+    (rastgele yürüyüşte seviyeye ulaşma süresi mesafenin karesiyle ölçeklenir)"""
+    price = monitor_last_prices.get(symbol)
+    atr = monitor_atr.get(symbol)
+    levels = [level for level in (clean_price(signal.get('target_price', 0)), clean_price(signal.get('stop_loss', 0))) if level > 0]
+    if not price or not atr or not levels:
+        return CONFIG["MONITOR_LOOP_SLEEP_SECONDS"]
+    distance = min(abs(price - level) for level in levels)
+    interval = CONFIG["MONITOR_INTERVAL_SAFETY"] * (distance / atr) ** 2 * 60
+    return min(max(interval, CONFIG["MONITOR_MIN_INTERVAL_SECONDS"]), CONFIG["MONITOR_MAX_INTERVAL_SECONDS"])
+
+def plan_monitor_intervals():
+    """Tüm pozisyonların kontrol aralıkları; toplam kontrol hızı sabit bütçeyi (eski sabit döngüyle
+    aynı: pozisyon başına MONITOR_LOOP_SLEEP_SECONDS'ta bir kontrol) aşarsa aralıklar ortak bir
+    katsayıyla uzatılır. MONITOR_MAX_INTERVAL_SECONDS'a takılan pozisyonlar katsayıdan bağımsız
+    sabit hız tüketir; katsayı kalan bütçeyi tam dolduracak şekilde yalnızca diğerlerine göre çözülür.
+    Bütçe pozisyon sayısıyla ölçeklendiği için tek pozisyon en fazla MONITOR_LOOP_SLEEP_SECONDS'ta
+    bir kontrol edilir - stopa çok yakın olsa da (eski sabit döngüden seyrek değil)."""
+    intervals = {symbol: monitor_check_interval(symbol, signal) for symbol, signal in active_signals.items()}
+    if not intervals:
+        return intervals
+    max_interval = CONFIG["MONITOR_MAX_INTERVAL_SECONDS"]
+    budget = len(intervals) / CONFIG["MONITOR_LOOP_SLEEP_SECONDS"]
+    rates = sorted(1.0 / interval for interval in intervals.values())
+    if sum(rates) <= budget:
+        return intervals
+    # En yavaş k pozisyon tavana takılır varsayımıyla katsayıyı çöz; varsayımla tutarlı ilk k doğrudur
+    scale = sum(rates) / budget
+    for capped in range(len(rates)):
+        free_budget = budget - capped / max_interval
+        if free_budget <= 0:
+            break
+        candidate = sum(rates[capped:]) / free_budget
+        if rates[capped] / candidate >= 1.0 / max_interval:
+            scale = candidate
+            break
+    return {symbol: min(interval * scale, max_interval) for symbol, interval in intervals.items()}
+
+def schedule_monitor_check(symbol):
+    """Pozisyonun bir sonraki kontrol zamanını belirler (kapanan pozisyonların kaydını siler)"""
+    if symbol not in active_signals:
+        monitor_next_check.pop(symbol, None)
+        monitor_atr.pop(symbol, None)
+        return
+    monitor_next_check[symbol] = time.monotonic() + plan_monitor_intervals()[symbol]
+
+async def check_monitored_position(symbol, signal):
+    """Tek pozisyonun TP/SL kontrolü: anlık fiyat + 1m mum kontrolü (mumlardan ATR de güncellenir)"""
+    try:
+        # Ek güvenlik kontrolü: Pozisyon belgesi var mı?
+        position_doc = mongo_collection.find_one({"_id": f"position_{symbol}"})
+        if not position_doc:
+            print(f"⚠️ {symbol} → Position belgesi yok, aktif sinyallerden kaldırılıyor")
+            # Veritabanından da sil
+            try:
+                mongo_collection.delete_one({"_id": f"active_signal_{symbol}"})
+                print(f"✅ {symbol} active_signal belgesi veritabanından silindi")
+            except Exception as e:
+                print(f"❌ {symbol} active_signal belgesi silinirken hata: {e}")
+            
+            del active_signals[symbol]
+            return
+        
+        if not mongo_collection.find_one({"_id": f"active_signal_{symbol}"}):
+            print(f"ℹ️ {symbol} sinyali DB'de bulunamadı, bellekten kaldırılıyor.")
+            del active_signals[symbol]
+            return
+
+        signal_status = signal.get("status", "pending")
+        if signal_status != "active":
+            print(f"ℹ️ {symbol} sinyali henüz aktif değil (durum: {signal_status}), atlanıyor.")
+            return
+
+        symbol_entry_price_raw = signal.get('entry_price_float', signal.get('entry_price', 0))
+        symbol_entry_price = clean_price(symbol_entry_price_raw)
+        symbol_target_price = clean_price(signal.get('target_price', 0))
+        symbol_stop_loss_price = clean_price(signal.get('stop_loss', 0))
+        symbol_signal_type = signal.get('type', 'ALIŞ')
+                                
+        # 3. ANLIK FİYAT KONTROLÜ
+        try:
+            last_price, is_live = await fetch_monitor_price(symbol)
+            if not is_live:
+                # Bayat fiyatla TP/SL tetiklenmez; mum kontrolüne geçilir
+                raise CircuitOpenError(f"devre kesici açık, son geçerli fiyat ${last_price:.6f}")
+            is_triggered_realtime = False
+            trigger_type_realtime = None
+            final_price_realtime = None
+            min_trigger_diff = 0.001  # %0.1 minimum fark
+
+            if symbol_signal_type == "ALIŞ" or symbol_signal_type == "ALIS" or symbol_signal_type == "LONG":
+                
+                # TP: Fiyat hedefin üstüne çıktığında (LONG için kâr)
+                if last_price >= symbol_target_price:
+                    is_triggered_realtime = True
+                    trigger_type_realtime = "take_profit"
+                    final_price_realtime = last_price
+                    print(f"✅ {symbol} - TP tetiklendi (LONG): ${last_price:.6f} >= ${symbol_target_price:.6f}")
+                # SL: Fiyat stop'un altına düştüğünde (LONG için zarar)
+                elif last_price <= symbol_stop_loss_price:
+                    is_triggered_realtime = True
+                    trigger_type_realtime = "stop_loss"
+                    final_price_realtime = last_price
+                    print(f"❌ {symbol} - SL tetiklendi (LONG): ${last_price:.6f} <= ${symbol_stop_loss_price:.6f}")
+            elif symbol_signal_type == "SATIŞ" or symbol_signal_type == "SATIS" or symbol_signal_type == "SHORT":
+                # SHORT pozisyonu için kapanış koşulları    
+                # TP: Fiyat hedefin altına düştüğünde (SHORT için kâr)
+                if last_price <= symbol_target_price:
+                    is_triggered_realtime = True
+                    trigger_type_realtime = "take_profit"
+                    final_price_realtime = last_price
+                    print(f"✅ {symbol} - TP tetiklendi (SHORT): ${last_price:.6f} <= ${symbol_target_price:.6f}")
+                # SL: Fiyat stop'un üstüne çıktığında (SHORT için zarar)
+                elif last_price >= symbol_stop_loss_price:
+                    is_triggered_realtime = True
+                    trigger_type_realtime = "stop_loss"
+                    final_price_realtime = last_price
+                    print(f"❌ {symbol} - SL tetiklendi (SHORT): ${last_price:.6f} >= ${symbol_stop_loss_price:.6f}")
+            
+            if not is_triggered_realtime:
+                monitor_clear_seen_at[symbol] = time.time()
+            
+            # 4. POZİSYON KAPATMA İŞLEMİ
+            if is_triggered_realtime:
+                print(f"💥 ANLIK TETİKLENDİ: {symbol}, Tip: {trigger_type_realtime}, Fiyat: {final_price_realtime}")
+                
+                # Pozisyon durumu kontrolü kaldırıldı - her tetikleme işlenmeli
+                print(f"🔄 {symbol} - Anlık tetikleme işleniyor...")
+                
+                update_position_status_atomic(symbol, "closing", {"trigger_type": trigger_type_realtime, "final_price": final_price_realtime})
+                
+                position_data = load_position_from_db(symbol)
+                if position_data:
+                    if position_data.get('open_price', 0) <= 0:
+                        print(f"⚠️ {symbol} - Geçersiz pozisyon verileri, pozisyon temizleniyor")
+                        mongo_collection.delete_one({"_id": f"position_{symbol}"})
+                        mongo_collection.delete_one({"_id": f"active_signal_{symbol}"})
+                        active_signals.pop(symbol, None)
+                        return
+                else:
+                    print(f"❌ {symbol} pozisyon verisi yüklenemedi!")
+                    return
+
+                # Race condition kontrolü: signal_processing_loop bu pozisyonu işliyorsa atla
+                current_time = datetime.now()
+                if symbol in position_processing_flags:
+                    flag_time = position_processing_flags[symbol]
+                    if isinstance(flag_time, datetime) and (current_time - flag_time).seconds < 30:
+                        print(f"⏳ {symbol} signal_processing_loop tarafından işleniyor, bekleniyor...")
+                        return
+
+                observe_tpsl_detection(symbol, "ticker")
+                await close_position(symbol, trigger_type_realtime, final_price_realtime, signal, position_data)
+                # close_position zaten active_signals'dan kaldırıyor, burada tekrar yapmaya gerek yok
+                return # Bu sembol bitti, sonraki sinyale geç.
+                
+        except Exception as e:
+            print(f"⚠️ {symbol} - Anlık ticker fiyatı alınamadı: {e}")
+        
+        try:
+            path = f"/fapi/v1/klines?symbol={symbol}&interval=1m&limit=100"
+            klines = await hedged_api_request(get_monitor_session(), path)
+            
+        except Exception as e:
+            print(f"⚠️ {symbol} - Mum verisi alınamadı (retry sonrası): {e}")
+            return
+
+        if not klines:
+            return
+        monitor_atr[symbol] = klines_atr(klines)
+        
+        is_triggered, trigger_type, final_price = check_klines_for_trigger(signal, klines)
+        
+        if is_triggered:
+            print(f"💥 MUM TETİKLEDİ: {symbol}, Tip: {trigger_type}, Fiyat: {final_price}")
+            
+            # Pozisyon durumu kontrolü kaldırıldı - her tetikleme işlenmeli
+            print(f"🔄 {symbol} - Mum tetikleme işleniyor...")
+            
+            update_position_status_atomic(symbol, "closing", {"trigger_type": trigger_type, "final_price": final_price})
+            position_data = load_position_from_db(symbol)
+
+            if position_data:
+                if position_data.get('open_price', 0) <= 0:
+                    print(f"⚠️ {symbol} - Geçersiz pozisyon verileri, pozisyon temizleniyor")
+                    # Geçersiz pozisyonu temizle
+                    mongo_collection.delete_one({"_id": f"position_{symbol}"})
+                    mongo_collection.delete_one({"_id": f"active_signal_{symbol}"})
+                    del active_signals[symbol]
+                    return
+            else:
+                print(f"❌ {symbol} pozisyon verisi yüklenemedi!")
+                return
+
+            # Race condition kontrolü: signal_processing_loop bu pozisyonu işliyorsa atla
+            current_time = datetime.now()
+            if symbol in position_processing_flags:
+                flag_time = position_processing_flags[symbol]
+                if isinstance(flag_time, datetime) and (current_time - flag_time).seconds < 30:
+                    print(f"⏳ {symbol} signal_processing_loop tarafından işleniyor, bekleniyor...")
+                    return
+
+            observe_tpsl_detection(symbol, "kline", klines[-1][0] / 1000)
+            await close_position(symbol, trigger_type, final_price, signal, position_data)
+            # close_position zaten active_signals'dan kaldırıyor, burada tekrar yapmaya gerek yok
+            
+            print(f"✅ {symbol} izleme listesinden kaldırıldı. Bir sonraki sinyale geçiliyor.")
+            return # Bir sonraki sinyale geç
+        else:
+            # Tetikleme yoksa, anlık fiyatı güncelle
+            if final_price:
+                active_signals[symbol]['current_price'] = format_price(final_price, signal.get('entry_price_float'))
+                active_signals[symbol]['current_price_float'] = final_price
+                active_signals[symbol]['last_update'] = str(datetime.now())
+                # DB'ye anlık fiyatı kaydetmek için (opsiyonel ama iyi bir pratik)
+                save_data_to_db(f"active_signal_{symbol}", active_signals[symbol])
+            else:
+                # Tetikleme yoksa pozisyon hala aktif
+                print(f"🔍 {symbol} - Mum verisi ile pozisyon hala aktif")
+        
+    except Exception as e:
+        print(f"❌ {symbol} sinyali işlenirken döngü içinde hata oluştu: {e}")
+        if symbol in active_signals:
+            del active_signals[symbol]
+
 async def monitor_signals():
     print("🚀 Sinyal izleme sistemi başlatıldı! (Veri Karışıklığı Düzeltildi)")
 
@@ -3955,6 +6592,7 @@ async def monitor_signals():
                     except Exception as e:
                         print(f"⚠️ {sym} silinirken hata: {e}")
 
+            publish_snapshot(active_signals)
             if not active_signals:
                 await asyncio.sleep(CONFIG["MONITOR_SLEEP_EMPTY"]) 
                 continue
@@ -4000,6 +6638,7 @@ async def monitor_signals():
                 # Güncellenmiş aktif sinyalleri kaydet
                 save_active_signals_to_db(active_signals)
                 print(f"✅ {len(orphaned_signals)} tutarsız sinyal temizlendi")
+                publish_snapshot(active_signals)
             
             # Eğer temizlik sonrası aktif sinyal kalmadıysa bekle
             if not active_signals:
@@ -4020,8 +6659,13 @@ async def monitor_signals():
                         continue
 
                     try:
-                        ticker = await fetch_futures_24h(symbol)
-                        current_price = float(ticker['lastPrice'])
+                        # Kontrol döngüsünün son fiyatı varsa özet için yeniden istek atma
+                        if symbol in monitor_last_prices:
+                            current_price, is_live = monitor_last_prices[symbol], monitor_price_live.get(symbol, False)
+                        else:
+                            current_price, is_live = await fetch_monitor_price(symbol)
+                        if not is_live:
+                            print(f"   🔌 {symbol}: Binance devre kesici açık, son geçerli fiyat kullanılıyor: ${current_price:.6f}")
                     except Exception as e:
                         current_price_raw = signal.get('current_price_float', symbol_entry_price)
                         current_price = clean_price(current_price_raw, symbol_entry_price)
@@ -4072,187 +6716,211 @@ async def monitor_signals():
                 except Exception as e:
                     print(f"   ⚪ {symbol}: Durum hesaplanamadı - Hata: {e}")
             
-            for symbol, signal in list(active_signals.items()):
-                try:
-                    # Ek güvenlik kontrolü: Pozisyon belgesi var mı?
-                    position_doc = mongo_collection.find_one({"_id": f"position_{symbol}"})
-                    if not position_doc:
-                        print(f"⚠️ {symbol} → Position belgesi yok, aktif sinyallerden kaldırılıyor")
-                        # Veritabanından da sil
-                        try:
-                            mongo_collection.delete_one({"_id": f"active_signal_{symbol}"})
-                            print(f"✅ {symbol} active_signal belgesi veritabanından silindi")
-                        except Exception as e:
-                            print(f"❌ {symbol} active_signal belgesi silinirken hata: {e}")
-                        
-                        del active_signals[symbol]
+            # Pozisyon başına zamanlayıcı: TP/SL'ye yakın pozisyonlar sık, uzak olanlar seyrek kontrol edilir.
+            # DB temizliği ve durum özeti MONITOR_LOOP_SLEEP_SECONDS'ta bir yapılır.
+            housekeeping_deadline = time.monotonic() + CONFIG["MONITOR_LOOP_SLEEP_SECONDS"]
+            for symbol in [s for s in monitor_next_check if s not in active_signals]:
+                schedule_monitor_check(symbol)
+            while active_signals:
+                now = time.monotonic()
+                for symbol in [s for s in active_signals if monitor_next_check.get(s, 0.0) <= now]:
+                    signal = active_signals.get(symbol)
+                    if signal is None:
                         continue
-                    
-                    if not mongo_collection.find_one({"_id": f"active_signal_{symbol}"}):
-                        print(f"ℹ️ {symbol} sinyali DB'de bulunamadı, bellekten kaldırılıyor.")
-                        del active_signals[symbol]
-                        continue
-
-                    signal_status = signal.get("status", "pending")
-                    if signal_status != "active":
-                        print(f"ℹ️ {symbol} sinyali henüz aktif değil (durum: {signal_status}), atlanıyor.")
-                        continue
-
-                    symbol_entry_price_raw = signal.get('entry_price_float', signal.get('entry_price', 0))
-                    symbol_entry_price = clean_price(symbol_entry_price_raw)
-                    symbol_target_price = clean_price(signal.get('target_price', 0))
-                    symbol_stop_loss_price = clean_price(signal.get('stop_loss', 0))
-                    symbol_signal_type = signal.get('type', 'ALIŞ')
-                                            
-                    # 3. ANLIK FİYAT KONTROLÜ
-                    try:
-                        ticker = await fetch_futures_24h(symbol)
-                        last_price = float(ticker['lastPrice'])
-                        is_triggered_realtime = False
-                        trigger_type_realtime = None
-                        final_price_realtime = None
-                        min_trigger_diff = 0.001  # %0.1 minimum fark
-
-                        if symbol_signal_type == "ALIŞ" or symbol_signal_type == "ALIS" or symbol_signal_type == "LONG":
-                            
-                            # TP: Fiyat hedefin üstüne çıktığında (LONG için kâr)
-                            if last_price >= symbol_target_price:
-                                is_triggered_realtime = True
-                                trigger_type_realtime = "take_profit"
-                                final_price_realtime = last_price
-                                print(f"✅ {symbol} - TP tetiklendi (LONG): ${last_price:.6f} >= ${symbol_target_price:.6f}")
-                            # SL: Fiyat stop'un altına düştüğünde (LONG için zarar)
-                            elif last_price <= symbol_stop_loss_price:
-                                is_triggered_realtime = True
-                                trigger_type_realtime = "stop_loss"
-                                final_price_realtime = last_price
-                                print(f"❌ {symbol} - SL tetiklendi (LONG): ${last_price:.6f} <= ${symbol_stop_loss_price:.6f}")
-                        elif symbol_signal_type == "SATIŞ" or symbol_signal_type == "SATIS" or symbol_signal_type == "SHORT":
-                            # SHORT pozisyonu için kapanış koşulları    
-                            # TP: Fiyat hedefin altına düştüğünde (SHORT için kâr)
-                            if last_price <= symbol_target_price:
-                                is_triggered_realtime = True
-                                trigger_type_realtime = "take_profit"
-                                final_price_realtime = last_price
-                                print(f"✅ {symbol} - TP tetiklendi (SHORT): ${last_price:.6f} <= ${symbol_target_price:.6f}")
-                            # SL: Fiyat stop'un üstüne çıktığında (SHORT için zarar)
-                            elif last_price >= symbol_stop_loss_price:
-                                is_triggered_realtime = True
-                                trigger_type_realtime = "stop_loss"
-                                final_price_realtime = last_price
-                                print(f"❌ {symbol} - SL tetiklendi (SHORT): ${last_price:.6f} >= ${symbol_stop_loss_price:.6f}")
-                        
-                        # 4. POZİSYON KAPATMA İŞLEMİ
-                        if is_triggered_realtime:
-                            print(f"💥 ANLIK TETİKLENDİ: {symbol}, Tip: {trigger_type_realtime}, Fiyat: {final_price_realtime}")
-                            
-                            # Pozisyon durumu kontrolü kaldırıldı - her tetikleme işlenmeli
-                            print(f"🔄 {symbol} - Anlık tetikleme işleniyor...")
-                            
-                            update_position_status_atomic(symbol, "closing", {"trigger_type": trigger_type_realtime, "final_price": final_price_realtime})
-                            
-                            position_data = load_position_from_db(symbol)
-                            if position_data:
-                                if position_data.get('open_price', 0) <= 0:
-                                    print(f"⚠️ {symbol} - Geçersiz pozisyon verileri, pozisyon temizleniyor")
-                                    mongo_collection.delete_one({"_id": f"position_{symbol}"})
-                                    mongo_collection.delete_one({"_id": f"active_signal_{symbol}"})
-                                    active_signals.pop(symbol, None)
-                                    continue
-                            else:
-                                print(f"❌ {symbol} pozisyon verisi yüklenemedi!")
-                                continue
-
-                            # Race condition kontrolü: signal_processing_loop bu pozisyonu işliyorsa atla
-                            current_time = datetime.now()
-                            if symbol in position_processing_flags:
-                                flag_time = position_processing_flags[symbol]
-                                if isinstance(flag_time, datetime) and (current_time - flag_time).seconds < 30:
-                                    print(f"⏳ {symbol} signal_processing_loop tarafından işleniyor, bekleniyor...")
-                                    continue
-
-                            await close_position(symbol, trigger_type_realtime, final_price_realtime, signal, position_data)
-                            # close_position zaten active_signals'dan kaldırıyor, burada tekrar yapmaya gerek yok
-                            continue # Bu sembol bitti, sonraki sinyale geç.
-                            
-                    except Exception as e:
-                        print(f"⚠️ {symbol} - Anlık ticker fiyatı alınamadı: {e}")
-                    
-                    try:
-                        url = f"https://fapi.binance.com/fapi/v1/klines?symbol={symbol}&interval=1m&limit=100"
-                        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=10)) as session:
-                            klines = await api_request_with_retry(session, url, ssl=False)
-                        
-                    except Exception as e:
-                        print(f"⚠️ {symbol} - Mum verisi alınamadı (retry sonrası): {e}")
-                        continue
-
-                    if not klines:
-                        continue
-                    
-                    is_triggered, trigger_type, final_price = check_klines_for_trigger(signal, klines)
-                    
-                    if is_triggered:
-                        print(f"💥 MUM TETİKLEDİ: {symbol}, Tip: {trigger_type}, Fiyat: {final_price}")
-                        
-                        # Pozisyon durumu kontrolü kaldırıldı - her tetikleme işlenmeli
-                        print(f"🔄 {symbol} - Mum tetikleme işleniyor...")
-                        
-                        update_position_status_atomic(symbol, "closing", {"trigger_type": trigger_type, "final_price": final_price})
-                        position_data = load_position_from_db(symbol)
-
-                        if position_data:
-                            if position_data.get('open_price', 0) <= 0:
-                                print(f"⚠️ {symbol} - Geçersiz pozisyon verileri, pozisyon temizleniyor")
-                                # Geçersiz pozisyonu temizle
-                                mongo_collection.delete_one({"_id": f"position_{symbol}"})
-                                mongo_collection.delete_one({"_id": f"active_signal_{symbol}"})
-                                del active_signals[symbol]
-                                continue
-                        else:
-                            print(f"❌ {symbol} pozisyon verisi yüklenemedi!")
-                            continue
-
-                        # Race condition kontrolü: signal_processing_loop bu pozisyonu işliyorsa atla
-                        current_time = datetime.now()
-                        if symbol in position_processing_flags:
-                            flag_time = position_processing_flags[symbol]
-                            if isinstance(flag_time, datetime) and (current_time - flag_time).seconds < 30:
-                                print(f"⏳ {symbol} signal_processing_loop tarafından işleniyor, bekleniyor...")
-                                continue
-
-                        await close_position(symbol, trigger_type, final_price, signal, position_data)
-                        # close_position zaten active_signals'dan kaldırıyor, burada tekrar yapmaya gerek yok
-                        
-                        print(f"✅ {symbol} izleme listesinden kaldırıldı. Bir sonraki sinyale geçiliyor.")
-                        continue # Bir sonraki sinyale geç
-                    else:
-                        # Tetikleme yoksa, anlık fiyatı güncelle
-                        if final_price:
-                            active_signals[symbol]['current_price'] = format_price(final_price, signal.get('entry_price_float'))
-                            active_signals[symbol]['current_price_float'] = final_price
-                            active_signals[symbol]['last_update'] = str(datetime.now())
-                            # DB'ye anlık fiyatı kaydetmek için (opsiyonel ama iyi bir pratik)
-                            save_data_to_db(f"active_signal_{symbol}", active_signals[symbol])
-                        else:
-                            # Tetikleme yoksa pozisyon hala aktif
-                            print(f"🔍 {symbol} - Mum verisi ile pozisyon hala aktif")
-                    
-                except Exception as e:
-                    print(f"❌ {symbol} sinyali işlenirken döngü içinde hata oluştu: {e}")
-                    if symbol in active_signals:
-                        del active_signals[symbol]
-                    continue
-
-            await asyncio.sleep(CONFIG["MONITOR_LOOP_SLEEP_SECONDS"]) # Daha hızlı kontrol için 3 saniye
+                    metric_observe("monitor_schedule_lag_seconds", max(0.0, time.monotonic() - monitor_next_check.get(symbol, now)))
+                    with metric_timer("monitor_check_seconds"):
+                        await check_monitored_position(symbol, signal)
+                    schedule_monitor_check(symbol)
+                
+                now = time.monotonic()
+                if now >= housekeeping_deadline:
+                    break
+                next_due = min((monitor_next_check.get(s, now) for s in active_signals), default=housekeeping_deadline)
+                await asyncio.sleep(max(0.0, min(next_due, housekeeping_deadline) - now))
         
         except Exception as e:
             print(f"❌ Ana sinyal izleme döngüsü hatası: {e}")
             await asyncio.sleep(CONFIG["MONITOR_SLEEP_ERROR"])  # Hata durumunda bekle
             active_signals = load_active_signals_from_db()
 
+# ---------------------------------------------------------------------------
+# Event loop gecikme izleyicisi: bir task düzenli aralıklarla uyanıp planlanan ile
+# gerçekleşen uyanma arasındaki farkı ölçer. Ayrı bir örnekleyici thread, loop
+# eşikten uzun süre uyanamazsa o an loop thread'inde çalışan kodun yığınını alır
+# (pymongo / pandas çağrılarının loop'u ne kadar bloke ettiğini kanıtlamak için).
+loop_lag_samples = deque(maxlen=CONFIG["LOOP_LAG_WINDOW_SAMPLES"])
+loop_stall_events = deque(maxlen=CONFIG["LOOP_STALL_HISTORY"])  # [{"started_at", "blocked_seconds", "location", "stack"}]
+loop_watchdog = {"due": None, "loop_thread_id": None, "pending_stall": None, "stop": None, "thread": None}
+
+def loop_lag_percentiles():
+    """Son penceredeki gecikme yüzdelikleri (saniye); ölçüm yoksa boş sözlük"""
+    if not loop_lag_samples:
+        return {}
+    samples = np.fromiter(loop_lag_samples, dtype=float)
+    p50, p95, p99 = np.quantile(samples, [0.5, 0.95, 0.99])
+    return {"0.5": float(p50), "0.95": float(p95), "0.99": float(p99), "max": float(samples.max())}
+
+def summarize_frame_stack(frame, limit=15):
+    """Yığını dıştan içe 'fonksiyon (dosya:satır)' listesine çevirir; en içteki bu dosyadaki konumu da döner"""
+    entries = traceback.extract_stack(frame)[-limit:]
+    stack = [f"{entry.name} ({os.path.basename(entry.filename)}:{entry.lineno})" for entry in entries]
+    own = [f"{entry.name}:{entry.lineno}" for entry in entries if entry.filename == __file__]
+    location = own[-1] if own else (f"{entries[-1].name}:{entries[-1].lineno}" if entries else "?")
+    return stack, location
+
+def _loop_stall_sampler():
+    """Örnekleyici thread: loop planlanan uyanmayı eşikten fazla kaçırdıysa yığını kaydeder"""
+    stop = loop_watchdog["stop"]
+    while not stop.wait(CONFIG["LOOP_STALL_SAMPLE_SECONDS"]):
+        due = loop_watchdog["due"]
+        if due is None or loop_watchdog["pending_stall"] is not None:
+            continue
+        late = time.monotonic() - due
+        if late < CONFIG["LOOP_STALL_THRESHOLD_SECONDS"]:
+            continue
+        frame = sys._current_frames().get(loop_watchdog["loop_thread_id"])
+        if frame is None:
+            continue
+        stack, location = summarize_frame_stack(frame)
+        event = {"started_at": datetime.now() - timedelta(seconds=late), "blocked_seconds": late, "location": location, "stack": stack}
+        loop_watchdog["pending_stall"] = event
+        loop_stall_events.append(event)
+
+async def loop_lag_monitor():
+    """Event loop gecikmesini sürekli ölçer; eşiği aşan bloklamaları yığınıyla raporlar"""
+    if not CONFIG["LOOP_LAG_MONITOR_ENABLED"]:
+        return
+    interval = CONFIG["LOOP_LAG_INTERVAL_SECONDS"]
+    loop_watchdog["loop_thread_id"] = threading.get_ident()
+    loop_watchdog["stop"] = threading.Event()
+    loop_watchdog["thread"] = threading.Thread(target=_loop_stall_sampler, name="loop-stall-sampler", daemon=True)
+    loop_watchdog["thread"].start()
+    try:
+        while True:
+            loop_watchdog["due"] = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.monotonic() - loop_watchdog["due"])
+            loop_lag_samples.append(lag)
+            metric_observe("event_loop_lag_seconds", lag)
+            if lag >= CONFIG["LOOP_STALL_THRESHOLD_SECONDS"]:
+                event = loop_watchdog["pending_stall"]
+                location = event["location"] if event else "?"
+                if event:
+                    event["blocked_seconds"] = lag
+                metric_inc("event_loop_stalls_total", location=location)
+                print(f"🐢 Event loop {lag:.2f}s bloke oldu - {location}")
+            loop_watchdog["pending_stall"] = None
+    finally:
+        loop_watchdog["due"] = None
+        loop_watchdog["stop"].set()
+
+# ---------------------------------------------------------------------------
+# Durum API'si: panolar MongoDB yerine bu salt okunur uç noktaları okur.
+# Yanıtlar yalnızca süreç belleğinden üretilir; ETag / If-None-Match ile değişmeyen
+# içerik 304 olarak döner, istenirse gzip ile sıkıştırılır.
+status_api_runner = None
+status_api_started_at = None
+
+def _accepts_gzip(request):
+    """İstemcinin Accept-Encoding başlığı gzip'i (q=0 olmadan) kabul ediyor mu"""
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() in ("gzip", "x-gzip"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+def status_api_response(request, payload, status=200):
+    """JSON yanıtı; içerik özeti ETag olarak kullanılır"""
+    body = json.dumps(payload, default=str, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if CONFIG["STATUS_API_GZIP"]:
+        headers["Vary"] = "Accept-Encoding"
+    if_none_match = request.headers.get("If-None-Match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return web.Response(status=304, headers=headers)
+    response = web.Response(status=status, body=body, content_type="application/json", charset="utf-8", headers=headers)
+    if CONFIG["STATUS_API_GZIP"] and len(body) > 512 and _accepts_gzip(request):
+        # Argümansız enable_compression deflate seçebilir; bu API sadece gzip sunar
+        response.enable_compression(web.ContentCoding.gzip)
+    return response
+
+async def status_positions(request):
+    return status_api_response(request, {"count": len(global_positions), "positions": global_positions})
+
+async def status_signals(request):
+    active = bot_snapshot["active_signals"]
+    return status_api_response(request, {"count": len(active), "version": bot_snapshot["version"], "signals": active})
+
+async def status_cooldowns(request):
+    return status_api_response(request, {"count": len(global_stop_cooldown), "cooldowns": global_stop_cooldown})
+
+async def status_stats(request):
+    return status_api_response(request, {"stats": bot_snapshot["stats"] or global_stats, "updated_at": bot_snapshot["updated_at"]})
+
+async def status_universe(request):
+    return status_api_response(request, {"count": len(global_scan_universe["symbols"]), **global_scan_universe})
+
+async def status_health(request):
+    # Bayatlık son yayından ölçülür: sessiz ama çalışan bot içerik değişmese de her turda yayınlar
+    now = datetime.now()
+    published_at, updated_at = bot_snapshot["published_at"], bot_snapshot["updated_at"]
+    heartbeat_age = (now - published_at).total_seconds() if published_at else None
+    age = (now - updated_at).total_seconds() if updated_at else None
+    breakers = get_circuit_breaker_status()
+    if heartbeat_age is None or heartbeat_age > CONFIG["STATUS_API_STALE_SECONDS"]:
+        state = "stale"
+    elif any(value != "closed" for value in breakers.values()):
+        state = "degraded"
+    else:
+        state = "ok"
+    payload = {
+        "status": state,
+        "uptime_seconds": round(time.monotonic() - status_api_started_at, 1) if status_api_started_at else None,
+        "snapshot_version": bot_snapshot["version"],
+        "snapshot_age_seconds": round(age, 1) if age is not None else None,
+        "last_published_seconds": round(heartbeat_age, 1) if heartbeat_age is not None else None,
+        "circuit_breakers": breakers,
+        "universe_updated_at": global_scan_universe["updated_at"],
+        "monitored_prices": len(monitor_last_prices),
+    }
+    return status_api_response(request, payload, status=503 if state == "stale" else 200)
+
+async def status_metrics(request):
+    return web.Response(body=render_metrics().encode("utf-8"), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+async def start_status_api():
+    """Durum API'sini / metrik ucunu botla aynı event loop üzerinde başlatır"""
+    global status_api_runner, status_api_started_at
+    if not CONFIG["STATUS_API_ENABLED"] and not CONFIG["METRICS_ENABLED"]:
+        return
+    status_app = web.Application()
+    if CONFIG["STATUS_API_ENABLED"]:
+        status_app.router.add_get("/positions", status_positions)
+        status_app.router.add_get("/signals", status_signals)
+        status_app.router.add_get("/cooldowns", status_cooldowns)
+        status_app.router.add_get("/stats", status_stats)
+        status_app.router.add_get("/universe", status_universe)
+        status_app.router.add_get("/health", status_health)
+    if CONFIG["METRICS_ENABLED"]:
+        status_app.router.add_get("/metrics", status_metrics)
+    status_api_runner = web.AppRunner(status_app, access_log=None)
+    await status_api_runner.setup()
+    site = web.TCPSite(status_api_runner, CONFIG["STATUS_API_HOST"], CONFIG["STATUS_API_PORT"])
+    await site.start()
+    status_api_started_at = time.monotonic()
+    print(f"🌐 Durum API'si başlatıldı: http://{CONFIG['STATUS_API_HOST']}:{CONFIG['STATUS_API_PORT']}")
+
+async def stop_status_api():
+    global status_api_runner
+    if status_api_runner is not None:
+        await status_api_runner.cleanup()
+        status_api_runner = None
+
 async def main():
     load_allowed_users()
+    rebuild_subscriber_index()
+    publish_snapshot(load_active_signals_from_db(), load_stats_from_db() or global_stats)
     await setup_bot()
     await app.initialize()
     await app.start()
@@ -4273,11 +6941,23 @@ async def main():
     except Exception as e:
         print(f"Bot polling hatası: {e}")
 
+    try:
+        await start_status_api()
+    except Exception as e:
+        print(f"⚠️ Durum API'si başlatılamadı: {e}")
+
+    if CONFIG["MEMORY_TRACEMALLOC_ENABLED"]:
+        start_memory_trace()
+        print("🔎 tracemalloc açık (MEMORY_TRACEMALLOC_ENABLED)")
+
     signal_task = asyncio.create_task(signal_processing_loop())
     monitor_task = asyncio.create_task(monitor_signals())
+    outbox_task = asyncio.create_task(outbox_sender_loop())
+    dashboard_task = asyncio.create_task(dashboard_loop())
+    loop_lag_task = asyncio.create_task(loop_lag_monitor())
     try:
         # Tüm task'ları bekle
-        await asyncio.gather(signal_task, monitor_task)
+        await asyncio.gather(signal_task, monitor_task, outbox_task, dashboard_task, loop_lag_task)
     except KeyboardInterrupt:
         print("\n⚠️ Bot kapatılıyor...")
     except asyncio.CancelledError:
@@ -4288,12 +6968,44 @@ async def main():
             signal_task.cancel()
         if not monitor_task.done():
             monitor_task.cancel()
+        if not outbox_task.done():
+            outbox_task.cancel()
+        if not dashboard_task.done():
+            dashboard_task.cancel()
+        if not loop_lag_task.done():
+            loop_lag_task.cancel()
         
         try:
-            await asyncio.gather(signal_task, monitor_task, return_exceptions=True)
+            await asyncio.gather(signal_task, monitor_task, outbox_task, dashboard_task, loop_lag_task, return_exceptions=True)
         except Exception:
             pass
 
+        try:
+            await stop_status_api()
+        except Exception as e:
+            print(f"⚠️ Durum API'si kapatma hatası: {e}")
+
+        try:
+            await close_telegram_session()
+        except Exception as e:
+            print(f"⚠️ Telegram oturumu kapatma hatası: {e}")
+
+        try:
+            await stop_candle_store()
+            await close_binance_session()
+        except Exception as e:
+            print(f"⚠️ Mum deposu kapatma hatası: {e}")
+
+        try:
+            await close_monitor_session()
+        except Exception as e:
+            print(f"⚠️ İzleme oturumu kapatma hatası: {e}")
+
+        try:
+            shutdown_indicator_workers()
+        except Exception as e:
+            print(f"⚠️ İndikatör işçileri kapatma hatası: {e}")
+
         try:
             await app.updater.stop()
             print("✅ Telegram bot polling durduruldu")
@@ -4427,6 +7139,7 @@ async def clear_all_command(update, context):
             global_stats.update(new_stats)
         else:
             global_stats = new_stats
+        publish_snapshot({}, new_stats, replace_stats=True)
         
         # Son kontrol - kalan dokümanları say
         try:
@@ -4459,17 +7172,414 @@ async def clear_all_command(update, context):
     except Exception as e:
         await send_command_response(update, f"❌ ClearAll hatası: {e}")
 
+# ---------------------------------------------------------------------------
+# Örnekleyici profil: /profile ile çalışan süreçte (yeniden başlatmadan) süre sınırlı
+# profil alınır. Bir thread tüm thread yığınlarını (~100 Hz) örnekler; loop içinden de
+# askıdaki asyncio task'larının await zincirleri örneklenir. Çıktı flamegraph.pl /
+# speedscope ile açılabilen collapsed-stack formatındadır.
+PROFILER_IDLE_LEAVES = {"select", "poll", "wait", "_wait_for_tstate_lock", "sleep"}
+profiler_state = {"running": False, "task": None}
+
+def _profile_frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _frame_to_stack(frame):
+    """Frame zincirini dıştan içe fonksiyon adlarına çevirir"""
+    names = []
+    while frame is not None:
+        names.append(_profile_frame_name(frame.f_code))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+def _coroutine_stack(coro):
+    """Task'ın await zincirini (dıştan içe) çıkarır"""
+    names = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        names.append(_profile_frame_name(frame.f_code))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return names
+
+def _profile_threads(stop, interval, samples):
+    """Profil thread'i: kendisi hariç tüm thread'lerin yığınlarını sayar"""
+    own_id = threading.get_ident()
+    while not stop.wait(interval):
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_id:
+                continue
+            key = (f"thread:{thread_names.get(ident, ident)}", *_frame_to_stack(frame))
+            samples[key] = samples.get(key, 0) + 1
+
+async def _profile_tasks(stop_at, interval, samples):
+    current = asyncio.current_task()
+    while time.monotonic() < stop_at:
+        for task in asyncio.all_tasks():
+            if task is current or task.done():
+                continue
+            stack = _coroutine_stack(task.get_coro())
+            if stack:
+                key = (f"task:{stack[0].split(' ')[0]}", *stack)
+                samples[key] = samples.get(key, 0) + 1
+        await asyncio.sleep(interval)
+
+async def run_sampling_profile(seconds):
+    """Süre boyunca thread ve task yığınlarını örnekler -> (thread örnekleri, task örnekleri)"""
+    stop = threading.Event()
+    thread_samples, task_samples = {}, {}
+    sampler = threading.Thread(target=_profile_threads, args=(stop, CONFIG["PROFILER_INTERVAL_SECONDS"], thread_samples),
+                               name="sampling-profiler", daemon=True)
+    sampler.start()
+    try:
+        await _profile_tasks(time.monotonic() + seconds, CONFIG["PROFILER_TASK_INTERVAL_SECONDS"], task_samples)
+    finally:
+        stop.set()
+        await asyncio.to_thread(sampler.join)
+    return thread_samples, task_samples
+
+def collapse_profile_samples(*sample_sets):
+    """Örnekleri collapsed-stack satırlarına çevirir ('kök;f1;f2 sayı')"""
+    lines = []
+    for samples in sample_sets:
+        for stack, count in sorted(samples.items(), key=lambda item: -item[1]):
+            lines.append(f"{';'.join(stack)} {count}")
+    return "\n".join(lines) + "\n"
+
+def summarize_profile(thread_samples, top_n):
+    """Boşta bekleme dışındaki thread örneklerinden en sıcak fonksiyonlar (kendi süresi; kapsayıcı
+    süre yalnızca bu modülün fonksiyonları için - asyncio/threading çerçeveleri her yığında vardır)"""
+    own_file = f"({os.path.basename(__file__)}:"
+    busy = {stack: count for stack, count in thread_samples.items() if stack[-1].split(" ")[0] not in PROFILER_IDLE_LEAVES}
+    total = sum(thread_samples.values())
+    busy_total = sum(busy.values())
+    self_counts, inclusive_counts = {}, {}
+    for stack, count in busy.items():
+        self_counts[stack[-1]] = self_counts.get(stack[-1], 0) + count
+        for name in set(stack[1:]):
+            if own_file in name:
+                inclusive_counts[name] = inclusive_counts.get(name, 0) + count
+    lines = [f"Toplam {total} örnek, {busy_total} meşgul (%{busy_total / total * 100 if total else 0:.0f})"]
+    lines.append("\nEn sıcak (kendi süresi):")
+    for name, count in sorted(self_counts.items(), key=lambda item: -item[1])[:top_n]:
+        lines.append(f"{count / busy_total * 100:5.1f}%  {name}")
+    lines.append("\nEn sıcak (kapsayıcı, bu modül):")
+    for name, count in sorted(inclusive_counts.items(), key=lambda item: -item[1])[:top_n]:
+        lines.append(f"{count / busy_total * 100:5.1f}%  {name}")
+    return "\n".join(lines)
+
+async def profile_and_report(bot, chat_id, seconds):
+    try:
+        thread_samples, task_samples = await run_sampling_profile(seconds)
+        summary = summarize_profile(thread_samples, CONFIG["PROFILER_TOP_N"])
+        started = datetime.now() - timedelta(seconds=seconds)
+        filename = f"profile_{started.strftime('%Y%m%d_%H%M%S')}_{seconds}s.folded"
+        document = io.BytesIO(collapse_profile_samples(thread_samples, task_samples).encode("utf-8"))
+        await acquire_telegram_slot(chat_id, "info")
+        await bot.send_document(chat_id=chat_id, document=document, filename=filename,
+                                caption=f"🔬 {seconds}s profil (flamegraph.pl / speedscope ile açılabilir)")
+        await send_telegram_message(f"<pre>{summary[:3900]}</pre>", chat_id)
+        print(f"🔬 Profil tamamlandı: {filename}")
+    except Exception as e:
+        print(f"❌ Profil hatası: {e}")
+        await send_telegram_message(f"❌ Profil alınamadı: {e}", chat_id)
+    finally:
+        profiler_state["running"] = False
+
+async def profile_command(update, context):
+    """Süre sınırlı örnekleyici profil başlatır: /profile [saniye] (sadece bot sahibi)"""
+    user_id, is_authorized = validate_user_command(update, require_owner=True)
+    if not is_authorized:
+        return
+    
+    seconds = CONFIG["PROFILER_DEFAULT_SECONDS"]
+    if context.args:
+        try:
+            seconds = int(context.args[0])
+        except ValueError:
+            await send_command_response(update, "❌ Kullanım: /profile [saniye]")
+            return
+    seconds = max(1, min(seconds, CONFIG["PROFILER_MAX_SECONDS"]))
+    
+    if profiler_state["running"]:
+        await send_command_response(update, "⏳ Zaten çalışan bir profil var.")
+        return
+    profiler_state["running"] = True
+    profiler_state["task"] = asyncio.create_task(profile_and_report(context.bot, update.effective_chat.id, seconds))
+    await send_command_response(update, f"🔬 {seconds} saniyelik profil başladı, bitince dosya olarak gönderilecek.")
+
+# ---------------------------------------------------------------------------
+# Bellek muhasebesi: uzun ömürlü sözlükler periyodik olarak budanır (TTL veya aktif
+# sembollere göre), /memory ve /metrics ise RSS, sözlük boyutları, mum deposu baytları,
+# canlı DataFrame'ler ve (açıksa) tracemalloc'un en büyük ayırıcılarını gösterir.
+# ---------------------------------------------------------------------------
+
+POSITION_FLAG_TTL_SECONDS = 300  # Sembol flag'leri 30 sn kontrol edilir; daha eskisi bilgi taşımaz
+MESSAGE_SENT_FLAG_TTL_SECONDS = 28800  # close_position'daki 8 saatlik tekrar gönderim penceresi
+RECENTLY_SENT_TTL_SECONDS = 600  # check_recently_sent'in 10 dakikalık penceresi
+FIRST_MESSAGE_ATTR_PATTERN = re.compile(r"^_first_[a-z_]+_([A-Z0-9]+)$")  # signal_processing_loop._first_*_{SEMBOL}
+
+symbol_last_seen = {}  # {symbol: datetime} - sembolün tarama evreninde son görüldüğü an
+memory_housekeeping = {"next_prune_at": 0.0, "last_pruned_at": None, "previous_signals": None, "tracemalloc_baseline": None}
+memory_eviction_stats = {}  # {sözlük adı: toplam silinen kayıt}
+
+def _record_evictions(name, count):
+    if count:
+        memory_eviction_stats[name] = memory_eviction_stats.get(name, 0) + count
+        metric_inc("state_evictions_total", count, map=name)
+
+def _evict_keys(mapping, keys, name):
+    for key in keys:
+        mapping.pop(key, None)
+    _record_evictions(name, len(keys))
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+        except ValueError:
+            return None
+    return None
+
+def _first_message_attrs():
+    return [name for name in vars(signal_processing_loop) if FIRST_MESSAGE_ATTR_PATTERN.match(name)]
+
+def prune_long_lived_state(previous_signals=None, protected_symbols=(), force=False):
+    """Uzun ömürlü sözlüklerden süresi dolmuş / artık izlenmeyen kayıtları siler (MEMORY_PRUNE_INTERVAL_SECONDS'ta bir)"""
+    now_mono = time.monotonic()
+    if not force and now_mono < memory_housekeeping["next_prune_at"]:
+        return
+    memory_housekeeping["next_prune_at"] = now_mono + CONFIG["MEMORY_PRUNE_INTERVAL_SECONDS"]
+    now = datetime.now()
+    keep = set(active_signals) | set(protected_symbols)
+    
+    # Race condition flag'leri: sembol flag'leri 30 sn, message_sent_* anahtarları 8 saat anlamlı
+    stale = []
+    for key, value in position_processing_flags.items():
+        flag_time = _as_datetime(value)
+        ttl = MESSAGE_SENT_FLAG_TTL_SECONDS if key.startswith("message_sent_") else POSITION_FLAG_TTL_SECONDS
+        if flag_time is None or (now - flag_time).total_seconds() >= ttl:
+            stale.append(key)
+    _evict_keys(position_processing_flags, stale, "position_processing_flags")
+    
+    stale = [symbol for symbol, value in recently_sent_signals.items()
+             if (_as_datetime(value) is None or (now - _as_datetime(value)).total_seconds() >= RECENTLY_SENT_TTL_SECONDS)]
+    _evict_keys(recently_sent_signals, stale, "recently_sent_signals")
+    
+    # Önceki sinyaller: evrenden uzun süredir çıkmış ve pozisyonu/cooldown'u olmayan semboller
+    for symbol in global_scan_universe["symbols"]:
+        symbol_last_seen[symbol] = global_scan_universe["updated_at"] or now
+    ttl = timedelta(hours=CONFIG["MEMORY_SYMBOL_STATE_TTL_HOURS"])
+    if previous_signals is not None:
+        memory_housekeeping["previous_signals"] = previous_signals
+        stale = [symbol for symbol in previous_signals
+                 if symbol not in keep and now - symbol_last_seen.setdefault(symbol, now) >= ttl]
+        _evict_keys(previous_signals, stale, "previous_signals")
+    stale = [symbol for symbol, seen in symbol_last_seen.items() if now - seen >= ttl]
+    _evict_keys(symbol_last_seen, stale, "symbol_last_seen")
+    
+    # signal_processing_loop üzerindeki "sadece ilk kez yazdır" öznitelikleri: kapanan pozisyonlarınkiler silinir
+    stale = [name for name in _first_message_attrs() if FIRST_MESSAGE_ATTR_PATTERN.match(name).group(1) not in keep]
+    for name in stale:
+        delattr(signal_processing_loop, name)
+    _record_evictions("first_message_attrs", len(stale))
+    
+    # İzleme zamanlayıcısının sembol başına durumu sadece aktif pozisyonlar için gerekli
+    for name, mapping in (("monitor_last_prices", monitor_last_prices), ("monitor_price_live", monitor_price_live),
+                          ("monitor_clear_seen_at", monitor_clear_seen_at), ("monitor_atr", monitor_atr)):
+        _evict_keys(mapping, [symbol for symbol in mapping if symbol not in active_signals], name)
+    
+    # Süresi geçmiş sohbet hız sınırları bilgi taşımaz (get ile 0.0'a düşer)
+    _evict_keys(telegram_chat_next_send, [key for key, ready_at in telegram_chat_next_send.items() if ready_at <= now_mono], "telegram_chat_next_send")
+    
+    memory_housekeeping["last_pruned_at"] = now
+
+def process_rss_bytes():
+    """Sürecin yerleşik bellek kullanımı (Linux /proc; okunamazsa None)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+def state_map_sizes():
+    """Uzun ömürlü bellek içi sözlüklerin kayıt sayıları"""
+    previous_signals = memory_housekeeping["previous_signals"]
+    return {
+        "active_signals": len(active_signals),
+        "position_processing_flags": len(position_processing_flags),
+        "recently_sent_signals": len(recently_sent_signals),
+        "previous_signals": len(previous_signals) if previous_signals is not None else 0,
+        "symbol_last_seen": len(symbol_last_seen),
+        "first_message_attrs": len(_first_message_attrs()),
+        "monitor_last_prices": len(monitor_last_prices),
+        "monitor_price_live": len(monitor_price_live),
+        "monitor_clear_seen_at": len(monitor_clear_seen_at),
+        "monitor_atr": len(monitor_atr),
+        "monitor_next_check": len(monitor_next_check),
+        "telegram_chat_next_send": len(telegram_chat_next_send),
+        "api_retry_stats": len(api_retry_stats),
+        "circuit_breakers": len(circuit_breakers),
+        "fapi_host_latency": len(fapi_host_latency),
+        "signal_memo_cache": len(signal_memo_cache),
+        "candle_store": len(candle_store),
+        "outbox_inflight": len(outbox_inflight),
+        "dashboard_chats": len(dashboard_chats),
+        "subscriber_filters": len(subscriber_filters),
+    }
+
+def candle_store_bytes():
+    """Mum deposu halka tamponları + paylaşımlı bellek bloklarının bayt toplamı"""
+    return sum(series.nbytes for series in list(candle_store.values())) + sum(block.size for block in list(shared_candle_blocks.values()))
+
+def live_dataframe_bytes():
+    """Bellekte canlı DataFrame sayısı ve bayt toplamı (gc taraması; sadece rapor için)"""
+    count = total = 0
+    for obj in gc.get_objects():
+        if isinstance(obj, pd.DataFrame):
+            count += 1
+            try:
+                total += int(obj.memory_usage(index=True, deep=False).sum())
+            except Exception:
+                pass
+    return count, total
+
+def start_memory_trace():
+    """tracemalloc'u başlatır ve büyüme karşılaştırması için taban anlık görüntüsünü alır"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(CONFIG["MEMORY_TRACEMALLOC_FRAMES"])
+    memory_housekeeping["tracemalloc_baseline"] = tracemalloc.take_snapshot()
+
+def stop_memory_trace():
+    tracemalloc.stop()
+    memory_housekeeping["tracemalloc_baseline"] = None
+
+def _format_bytes(value):
+    for unit in ("B", "KB", "MB"):
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+def _format_traceback_line(stat):
+    frame = stat.traceback[0]
+    return f"{os.path.basename(frame.filename)}:{frame.lineno}"
+
+def build_memory_report(map_sizes, store_bytes):
+    """/memory metni: RSS, sözlük boyutları, mum deposu / DataFrame baytları, tracemalloc (thread'de çalışır).
+    Loop'un değiştirdiği sözlükler burada gezilmez; boyutları çağıran loop thread'inde okur."""
+    top_n = CONFIG["MEMORY_REPORT_TOP_N"]
+    rss = process_rss_bytes()
+    lines = [f"🧠 Bellek Raporu ({datetime.now().strftime('%H:%M:%S')})", ""]
+    lines.append(f"• RSS: {_format_bytes(rss) if rss is not None else 'bilinmiyor'}")
+    lines.append(f"• Mum deposu: {_format_bytes(store_bytes)} ({map_sizes['candle_store']} seri)")
+    df_count, df_bytes = live_dataframe_bytes()
+    lines.append(f"• Canlı DataFrame: {df_count} adet, {_format_bytes(df_bytes)}")
+    last_pruned = memory_housekeeping["last_pruned_at"]
+    lines.append(f"• Son budama: {last_pruned.strftime('%H:%M:%S') if last_pruned else 'henüz yok'}")
+    
+    lines += ["", "📦 Sözlük boyutları (kayıt):"]
+    for name, count in sorted(map_sizes.items(), key=lambda item: -item[1]):
+        evicted = memory_eviction_stats.get(name)
+        lines.append(f"  {name}: {count}" + (f" (budanan: {evicted})" if evicted else ""))
+    
+    if not tracemalloc.is_tracing():
+        lines += ["", "ℹ️ tracemalloc kapalı (/memory trace on ile aç)"]
+        return "\n".join(lines)
+    
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    lines += ["", f"🔎 tracemalloc: {_format_bytes(current)} (tepe {_format_bytes(peak)})", "En büyük ayırıcılar:"]
+    for stat in snapshot.statistics("lineno")[:top_n]:
+        lines.append(f"  {_format_traceback_line(stat)}: {_format_bytes(stat.size)} / {stat.count} nesne")
+    baseline = memory_housekeeping["tracemalloc_baseline"]
+    if baseline is not None:
+        growth = [stat for stat in snapshot.compare_to(baseline, "lineno") if stat.size_diff > 0][:top_n]
+        if growth:
+            lines += ["", "📈 İzleme başından beri büyüyenler:"]
+            for stat in growth:
+                lines.append(f"  {_format_traceback_line(stat)}: +{_format_bytes(stat.size_diff)} (+{stat.count_diff} nesne)")
+    return "\n".join(lines)
+
+async def memory_command(update, context):
+    """Bellek raporu: /memory, /memory trace on|off (admin)"""
+    user_id, is_authorized = validate_user_command(update, require_admin=True)
+    if not is_authorized:
+        return
+    
+    if context.args:
+        if len(context.args) != 2 or context.args[0].lower() != "trace" or context.args[1].lower() not in ("on", "off"):
+            await send_command_response(update, "❌ Kullanım: /memory veya /memory trace on|off", parse_mode=None)
+            return
+        if context.args[1].lower() == "on":
+            await asyncio.to_thread(start_memory_trace)
+            await send_command_response(update, "🔎 tracemalloc açıldı; büyüme bu andan itibaren raporlanır.", parse_mode=None)
+        else:
+            stop_memory_trace()
+            await send_command_response(update, "⏹️ tracemalloc kapatıldı.", parse_mode=None)
+        return
+    
+    # Sözlükler ve signal_processing_loop öznitelikleri loop thread'inde değişir: boyutlar burada okunur
+    report = await asyncio.to_thread(build_memory_report, state_map_sizes(), candle_store_bytes())
+    await send_command_response(update, report[:4000], parse_mode=None)
+
 async def calculate_signals_for_symbol(symbol, timeframes, tf_names):
     """Bir sembol için tüm zaman dilimlerinde sinyalleri hesaplar"""
-    current_signals = {}
-    
+    frames = await fetch_signal_frames(symbol, timeframes, tf_names)
+    if frames is None:
+        return None
+    return await compute_signals_from_frames(symbol, frames, timeframes, tf_names)
+
+async def fetch_signal_frames(symbol, timeframes, tf_names):
+    """Zaman dilimine göre minimum ısınma mum sayısı kadar veriyi tüm zaman dilimleri için çeker"""
+    frames = {}
     for tf_name in tf_names:
         try:
-            df = await async_get_historical_data(symbol, timeframes[tf_name], 1000)
+            df = await async_get_historical_data(symbol, timeframes[tf_name], calculate_required_lookback(tf_name))
             if df is None or df.empty:
                 return None
-            
+            frames[tf_name] = df
+        except (ScanDeadlineExceeded, CircuitOpenError):
+            raise
+        except Exception as e:
+            print(f"❌ {symbol} {tf_name} sinyal hesaplama hatası: {e}")
+            return None
+    return frames
+
+async def compute_signals_from_frames(symbol, frames, timeframes, tf_names):
+    """Çekilmiş mumlardan son mum sinyallerini hesaplar (önbellek ve ısınma kontrolü dahil)"""
+    current_signals = {}
+    
+    for tf_name in tf_names:
+        try:
+            lookback = calculate_required_lookback(tf_name)
+            df = frames[tf_name]
+
+            # Son mum değişmediyse önceki hesaplamanın sonucunu kullan
+            memo_key = signal_memo_key(symbol, tf_name, df)
+            signal = get_memoized_signal(memo_key)
+            if signal is not None:
+                current_signals[tf_name] = signal
+                continue
+
             df = calculate_full_pine_signals(df, tf_name)
+
+            # Son sinyal olayı ısınma bölgesinde kaldıysa tam geçmişle yeniden hesapla
+            if len(df) >= lookback and lookback < CONFIG["MAX_KLINE_LOOKBACK"] and not is_signal_converged(df, tf_name):
+                df = await async_get_historical_data(symbol, timeframes[tf_name], CONFIG["MAX_KLINE_LOOKBACK"])
+                if df is None or df.empty:
+                    return None
+                df = calculate_full_pine_signals(df, tf_name)
             closest_idx = -1  # Son mum
             signal = int(df.iloc[closest_idx]['signal'])
             
@@ -4479,8 +7589,11 @@ async def calculate_signals_for_symbol(symbol, timeframes, tf_names):
                     signal = 1
                 else:
                     signal = -1
+            store_memoized_signal(memo_key, signal)
             current_signals[tf_name] = signal
             
+        except (ScanDeadlineExceeded, CircuitOpenError):
+            raise
         except Exception as e:
             print(f"❌ {symbol} {tf_name} sinyal hesaplama hatası: {e}")
             return None
@@ -4493,12 +7606,100 @@ def log_signal_snapshot(symbol, tf_names, signal_values, buy_count, sell_count,
     print(f"   Sinyal değerleri: {signal_values}")
     print(f"   LONG sayısı: {buy_count}, SHORT sayısı: {sell_count}")
 
+# ---------------------------------------------------------------------------
+# Sinyal maskeleri
+# Her sembolün 7 zaman dilimi sinyali iki 7 bitlik maske olarak tutulur:
+# bit i = SIGNAL_TIMEFRAMES[i] zaman diliminde LONG (buy_mask) / SHORT (sell_mask).
+# 7/7, 6/7 ve 5/7 kuralları tek bir maske karşılaştırmasıdır.
+# ---------------------------------------------------------------------------
+
+SIGNAL_TIMEFRAMES = ['15m', '30m', '1h', '2h', '4h', '8h', '1d']
+MAJOR_COIN_SYMBOLS = ('BTCUSDT', 'ETHUSDT')
+SIGNAL_MASK_BITS = len(SIGNAL_TIMEFRAMES)
+RULE_MASK_7 = 0b1111111  # 15m, 30m, 1h, 2h, 4h, 8h, 1d
+RULE_MASK_6 = 0b0111111  # 15m, 30m, 1h, 2h, 4h, 8h
+RULE_MASK_5 = 0b0011111  # 15m, 30m, 1h, 2h, 4h
+RULE_MASKS = ((7, RULE_MASK_7), (6, RULE_MASK_6), (5, RULE_MASK_5))
+RULE_DESCRIPTIONS = {7: "tüm zaman dilimleri", 6: "15dk,30dk,1h,2h,4h,8h", 5: "15dk,30dk,1h,2h,4h"}
+_SIGNAL_BIT_WEIGHTS = (1 << np.arange(SIGNAL_MASK_BITS)).astype(np.int16)
+
+def encode_signal_masks(signals, tf_names=SIGNAL_TIMEFRAMES):
+    """{tf: 1/-1} sözlüğünü (buy_mask, sell_mask) çiftine çevirir"""
+    buy_mask = 0
+    sell_mask = 0
+    for bit, tf in enumerate(tf_names):
+        value = signals.get(tf, 0)
+        if value == 1:
+            buy_mask |= 1 << bit
+        elif value == -1:
+            sell_mask |= 1 << bit
+    return buy_mask, sell_mask
+
+def decode_signal_masks(buy_mask, sell_mask, tf_names=SIGNAL_TIMEFRAMES):
+    """(buy_mask, sell_mask) çiftini {tf: 1/-1/0} sözlüğüne çevirir"""
+    return {
+        tf: 1 if buy_mask >> bit & 1 else -1 if sell_mask >> bit & 1 else 0
+        for bit, tf in enumerate(tf_names)
+    }
+
+def pack_signals(signals):
+    """Sinyalleri tek bir 14 bitlik tamsayıya paketler (previous_signals için)"""
+    buy_mask, sell_mask = encode_signal_masks(signals)
+    return buy_mask | (sell_mask << SIGNAL_MASK_BITS)
+
+def unpack_signals(packed):
+    """pack_signals ile paketlenmiş değeri {tf: sinyal} sözlüğüne çevirir"""
+    if isinstance(packed, dict):
+        return packed
+    full_mask = (1 << SIGNAL_MASK_BITS) - 1
+    return decode_signal_masks(packed & full_mask, (packed >> SIGNAL_MASK_BITS) & full_mask)
+
+def build_signal_matrix(universe_signals, tf_names=SIGNAL_TIMEFRAMES):
+    """{symbol: {tf: sinyal}} yapısını (semboller × zaman dilimleri) int8 matrisine çevirir"""
+    symbols = list(universe_signals.keys())
+    matrix = np.zeros((len(symbols), len(tf_names)), dtype=np.int8)
+    for row, symbol in enumerate(symbols):
+        signals = universe_signals[symbol]
+        matrix[row] = [signals.get(tf, 0) for tf in tf_names]
+    return symbols, matrix
+
+def signal_matrix_to_masks(matrix):
+    """int8 sinyal matrisinden sembol başına buy/sell maskelerini üretir"""
+    buy_masks = (matrix == 1).astype(np.int16) @ _SIGNAL_BIT_WEIGHTS
+    sell_masks = (matrix == -1).astype(np.int16) @ _SIGNAL_BIT_WEIGHTS
+    return buy_masks, sell_masks
+
+def evaluate_signal_rules(buy_masks, sell_masks, major_flags):
+    """
+    Tüm evren için 7/7, 6/7, 5/7 kurallarını tek seferde değerlendirir.
+    Major coinler (BTC/ETH) için 7/7 → 6/7 → 5/7, diğerleri için sadece 7/7 geçerlidir.
+    Dönüş: (yön dizisi 1/-1/0, sağlanan kural dizisi 7/6/5/0)
+    """
+    buy_masks = np.asarray(buy_masks)
+    sell_masks = np.asarray(sell_masks)
+    major_flags = np.asarray(major_flags, dtype=bool)
+    direction = np.zeros(buy_masks.shape, dtype=np.int8)
+    rule_level = np.zeros(buy_masks.shape, dtype=np.int8)
+
+    for level, mask in RULE_MASKS:
+        eligible = (rule_level == 0) & (major_flags | (level == 7))
+        buy_hit = eligible & ((buy_masks & mask) == mask)
+        sell_hit = eligible & ((sell_masks & mask) == mask)
+        direction[buy_hit] = 1
+        direction[sell_hit] = -1
+        rule_level[buy_hit | sell_hit] = level
+    return direction, rule_level
+
+def match_signal_rule(buy_mask, sell_mask, is_major_coin):
+    """Tek sembol için sağlanan kuralı döndürür: (yön 1/-1/0, kural 7/6/5/0)"""
+    direction, rule_level = evaluate_signal_rules([buy_mask], [sell_mask], [is_major_coin])
+    return int(direction[0]), int(rule_level[0])
+
 def calculate_signal_counts(signals, tf_names):
     """Sinyal sayılarını hesaplar"""
     signal_values = [signals.get(tf, 0) for tf in tf_names]
-    buy_count = sum(1 for s in signal_values if s == 1)
-    sell_count = sum(1 for s in signal_values if s == -1)
-    return buy_count, sell_count, signal_values
+    buy_mask, sell_mask = encode_signal_masks(signals, tf_names)
+    return bin(buy_mask).count('1'), bin(sell_mask).count('1'), signal_values
 
 
 def check_signal_rule(buy_count, sell_count, required_signals, symbol):
@@ -4517,43 +7718,16 @@ def check_signal_rule(buy_count, sell_count, required_signals, symbol):
 
 def check_major_coin_signal_rule(symbol, current_signals, previous_signals):
     """BTC/ETH için 5/7 kuralını kontrol eder"""
-    tf_names = ['15m', '30m', '1h', '2h', '4h', '8h', '1d']
-    
-    # Mevcut sinyal sayılarını hesapla
-    buy_count, sell_count, _ = calculate_signal_counts(current_signals, tf_names)
+    buy_mask, sell_mask = encode_signal_masks(current_signals)
+    buy_count, sell_count = bin(buy_mask).count('1'), bin(sell_mask).count('1')
     
     print(f"🔍 {symbol} → Major coin 5/7 kural kontrolü: LONG={buy_count}, SHORT={sell_count}")
     
-    # 7/7 kuralı - tüm zaman dilimleri aynı olmalı (15dk değişmiş olma şartı yok)
-    if buy_count == 7 and sell_count == 0:
-        print(f"✅ {symbol} → 7/7 kuralı sağlandı (tüm zaman dilimleri LONG)")
-        return True
-    elif sell_count == 7 and buy_count == 0:
-        print(f"✅ {symbol} → 7/7 kuralı sağlandı (tüm zaman dilimleri SHORT)")
-        return True
-    
-    # 6/7 kuralı - 15dk, 30dk, 1h, 2h, 4h, 8h aynı olmalı (15dk değişmiş olma şartı yok)
-    tf_6h = ['15m', '30m', '1h', '2h', '4h', '8h']
-    buy_count_6h = sum(1 for tf in tf_6h if current_signals.get(tf, 0) == 1)
-    sell_count_6h = sum(1 for tf in tf_6h if current_signals.get(tf, 0) == -1)
-    
-    if buy_count_6h == 6 and sell_count_6h == 0:
-        print(f"✅ {symbol} → 6/7 kuralı sağlandı (15dk,30dk,1h,2h,4h,8h LONG)")
-        return True
-    elif sell_count_6h == 6 and buy_count_6h == 0:
-        print(f"✅ {symbol} → 6/7 kuralı sağlandı (15dk,30dk,1h,2h,4h,8h SHORT)")
-        return True
-    
-    # 5/7 kuralı - 15dk, 30dk, 1h, 2h, 4h aynı olmalı (15dk değişmiş olma şartı yok)
-    tf_5h = ['15m', '30m', '1h', '2h', '4h']
-    buy_count_5h = sum(1 for tf in tf_5h if current_signals.get(tf, 0) == 1)
-    sell_count_5h = sum(1 for tf in tf_5h if current_signals.get(tf, 0) == -1)
-    
-    if buy_count_5h == 5 and sell_count_5h == 0:
-        print(f"✅ {symbol} → 5/7 kuralı sağlandı (15dk,30dk,1h,2h,4h LONG)")
-        return True
-    elif sell_count_5h == 5 and buy_count_5h == 0:
-        print(f"✅ {symbol} → 5/7 kuralı sağlandı (15dk,30dk,1h,2h,4h SHORT)")
+    # 7/7 → 6/7 → 5/7 sırasıyla maske karşılaştırması (15dk değişmiş olma şartı yok)
+    direction, rule_level = match_signal_rule(buy_mask, sell_mask, True)
+    if rule_level:
+        side_text = "LONG" if direction == 1 else "SHORT"
+        print(f"✅ {symbol} → {rule_level}/7 kuralı sağlandı ({RULE_DESCRIPTIONS[rule_level]} {side_text})")
         return True
     
     print(f"❌ {symbol} → 5/7 kuralı sağlanamadı: LONG={buy_count}, SHORT={sell_count}")
@@ -4561,6 +7735,8 @@ def check_major_coin_signal_rule(symbol, current_signals, previous_signals):
 
 def check_15m_changed(symbol, current_signals, previous_signals):
     """15dk sinyalinin değişip değişmediğini kontrol eder"""
+    if previous_signals is not None:
+        previous_signals = unpack_signals(previous_signals)
     if not previous_signals or '15m' not in previous_signals:
         print(f"🔍 {symbol} → Önceki 15dk sinyali yok, değişim kontrol edilemiyor")
         return False
@@ -5034,21 +8210,21 @@ async def close_position(symbol, trigger_type, final_price, signal, position_dat
             )
             
             # KRİTİK: Mesajı kanala ve gruba gönder (tüm kullanıcılara ve gruplara)
-            # ÖNCE MESAJ GÖNDER, SONRA POZİSYONU SİL
+            # ÖNCE MESAJI KALICI KUYRUĞA YAZ, SONRA POZİSYONU SİL - teslimatı outbox göndericisi yapar
             message_sent_successfully = False
             try:
-                message_sent_successfully = await send_signal_to_all_users(message)
-                if message_sent_successfully:
-                    print(f"✅ {symbol} → Hedef mesajı başarıyla gönderildi")
-                else:
-                    print(f"❌ {symbol} → Hedef mesajı hiçbir kanala/gruba gönderilemedi")
+                signal_key = (position_data or {}).get('entry_time') or signal.get('signal_time', '')
+                side = signal_side((position_data or {}).get('type') or signal.get('type', 'ALIŞ'))
+                message_sent_successfully = await enqueue_notification(
+                    f"take_profit_{symbol}_{signal_key}", message, "take_profit", symbol, side
+                )
             except Exception as e:
-                print(f"❌ {symbol} → Hedef mesajı gönderilirken hata oluştu: {e}")
+                print(f"❌ {symbol} → Hedef mesajı kuyruğa yazılırken hata oluştu: {e}")
                 message_sent_successfully = False
             
-            # Mesaj gönderilemediyse pozisyonu silme, hata ver
+            # Mesaj kuyruğa yazılamadıysa pozisyonu silme, hata ver
             if not message_sent_successfully:
-                print(f"⚠️ {symbol} → Mesaj gönderilemediği için pozisyon kapatılmadı, tekrar denenecek")
+                print(f"⚠️ {symbol} → Mesaj kuyruğa yazılamadığı için pozisyon kapatılmadı, tekrar denenecek")
                 return
             
             # KRİTİK: Mesaj başarıyla gönderildikten SONRA flag'leri set et (çift gönderme önleme)
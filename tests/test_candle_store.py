@@ -0,0 +1,244 @@
+"""Canlı mum deposu: yerel aiohttp WebSocket + REST sunucusuna karşı birleşik akış, halka tampon ve doldurma testleri"""
+import asyncio
+import json
+import time
+
+import pytest
+from aiohttp import web
+
+import crypto_signal as cs
+
+INTERVAL = "15m"
+INTERVAL_MS = cs.TIMEFRAME_SECONDS[INTERVAL] * 1000
+CAPACITY = 50
+
+
+def make_kline(open_time, price):
+    return [open_time, str(price), str(price + 1), str(price - 1), str(price + 0.5), "10", open_time + INTERVAL_MS - 1]
+
+
+class FakeExchange:
+    """Binance stand-in'i: /stream birleşik WebSocket akışı ve /fapi/v1/klines REST ucu"""
+
+    def __init__(self, symbols, n_bars=CAPACITY + 20, rest_delay=0.0):
+        current_open = int(time.time() * 1000) // INTERVAL_MS * INTERVAL_MS
+        self.klines = {
+            symbol: [make_kline(current_open - (n_bars - 1 - i) * INTERVAL_MS, 100.0 + i) for i in range(n_bars)]
+            for symbol in symbols
+        }
+        self.visible = n_bars  # REST'in gördüğü mum sayısı (kesinti öncesi borsayı taklit etmek için azaltılır)
+        self.rest_delay = rest_delay
+        self.rest_limits = []
+        self.rest_in_flight = 0
+        self.rest_max_in_flight = 0
+        self.rest_client_ports = set()
+        self.sockets = []
+        self.subscriptions = []
+        self.runner = None
+
+    async def klines_handler(self, request):
+        self.rest_limits.append(int(request.query["limit"]))
+        self.rest_client_ports.add(request.transport.get_extra_info("peername")[1])
+        self.rest_in_flight += 1
+        self.rest_max_in_flight = max(self.rest_max_in_flight, self.rest_in_flight)
+        try:
+            await asyncio.sleep(self.rest_delay)
+            klines = self.klines[request.query["symbol"]][:self.visible]
+            return web.json_response(klines[-int(request.query["limit"]):])
+        finally:
+            self.rest_in_flight -= 1
+
+    async def stream_handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.append(ws)
+        async for msg in ws:
+            payload = json.loads(msg.data)
+            self.subscriptions.append(payload)
+            await ws.send_json({"result": None, "id": payload["id"]})
+        return ws
+
+    async def push_kline(self, symbol, open_time, price):
+        event = {"e": "kline", "s": symbol, "k": {
+            "t": open_time, "s": symbol, "i": INTERVAL,
+            "o": str(price), "h": str(price + 1), "l": str(price - 1), "c": str(price + 0.5), "v": "10", "x": False,
+        }}
+        message = {"stream": cs.kline_stream_name(symbol, INTERVAL), "data": event}
+        for ws in [ws for ws in self.sockets if not ws.closed]:
+            await ws.send_str(json.dumps(message))
+
+    async def drop_connections(self):
+        for ws in self.sockets:
+            await ws.close()
+        self.sockets.clear()
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/stream", self.stream_handler)
+        app.router.add_get("/fapi/v1/klines", self.klines_handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return self.runner.addresses[0][1]
+
+
+async def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("koşul zaman aşımına kadar sağlanmadı")
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def store_config(monkeypatch):
+    for name, value in (("MAX_KLINE_LOOKBACK", CAPACITY), ("WS_RECONNECT_DELAYS", [0.05]), ("WS_SUBSCRIBE_INTERVAL_SECONDS", 0),
+                        ("WS_BACKFILL_WEIGHT_PER_MINUTE", 600000), ("CIRCUIT_BREAKER_ENABLED", False)):
+        monkeypatch.setitem(cs.CONFIG, name, value)
+    for state in (cs.candle_store, cs.candle_store_backfills):
+        state.clear()
+    for state in (cs.candle_store_ready, cs.candle_store_full_history):
+        state.clear()
+    cs.kline_stream_connections.clear()
+    cs.candle_backfill_limiter.update(semaphore=None, tokens=None)
+    return monkeypatch
+
+
+def run_with_exchange(monkeypatch, exchange, scenario):
+    async def main():
+        port = await exchange.start()
+        monkeypatch.setitem(cs.CONFIG, "WS_KLINE_BASE_URL", f"ws://127.0.0.1:{port}/stream")
+        monkeypatch.setitem(cs.CONFIG, "FAPI_HOSTS", [f"http://127.0.0.1:{port}"])
+        try:
+            await scenario()
+        finally:
+            await cs.stop_candle_store()
+            await cs.close_binance_session()
+            await exchange.runner.cleanup()
+    asyncio.run(main())
+
+
+def series_open_times(key):
+    open_times, _ = cs.candle_store[key].view()
+    return [int(t) for t in open_times]
+
+
+def test_combined_stream_updates_ring_buffer(store_config):
+    exchange = FakeExchange(["BTCUSDT"])
+    key = ("BTCUSDT", INTERVAL)
+
+    async def scenario():
+        await cs.update_candle_store_universe(["BTCUSDT"], [INTERVAL])
+        await wait_until(lambda: key in cs.candle_store_ready)
+        assert exchange.subscriptions[0]["method"] == "SUBSCRIBE"
+        assert exchange.subscriptions[0]["params"] == ["btcusdt@kline_15m"]
+        assert exchange.rest_limits == [CAPACITY]
+
+        last_open = cs.candle_store[key].last_open_time
+        messages = cs.candle_store_stats["messages"]
+        # Oluşan mumun güncellemesi yerinde yazılır, sonraki mum eklenir
+        await exchange.push_kline("BTCUSDT", last_open, 500.0)
+        await exchange.push_kline("BTCUSDT", last_open + INTERVAL_MS, 600.0)
+        await wait_until(lambda: cs.candle_store_stats["messages"] == messages + 2)
+
+        series = cs.candle_store[key]
+        assert len(series) == CAPACITY
+        assert series_open_times(key)[-2:] == [last_open, last_open + INTERVAL_MS]
+        frame = cs.get_store_frame("BTCUSDT", INTERVAL, 10)
+        assert list(frame["close"].iloc[-2:]) == [500.5, 600.5]
+        assert list(frame["open"].iloc[-2:]) == [500.0, 600.0]
+
+    run_with_exchange(store_config, exchange, scenario)
+
+
+def test_reconnect_backfills_only_the_gap(store_config):
+    exchange = FakeExchange(["BTCUSDT"])
+    exchange.visible -= 5  # İlk doldurmada borsa 5 mum geride
+    key = ("BTCUSDT", INTERVAL)
+
+    async def scenario():
+        await cs.update_candle_store_universe(["BTCUSDT"], [INTERVAL])
+        await wait_until(lambda: key in cs.candle_store_ready)
+        backfills = cs.candle_store_stats["backfills"]
+
+        exchange.visible += 5
+        await exchange.drop_connections()
+        await wait_until(lambda: cs.candle_store_stats["backfills"] > backfills and key in cs.candle_store_ready)
+
+        assert exchange.rest_limits[0] == CAPACITY
+        assert exchange.rest_limits[-1] < 10  # Sadece boşluk istendi
+        expected = [k[0] for k in exchange.klines["BTCUSDT"][-CAPACITY:]]
+        assert series_open_times(key) == expected
+
+    run_with_exchange(store_config, exchange, scenario)
+
+
+def test_skipped_candle_in_stream_triggers_backfill(store_config):
+    exchange = FakeExchange(["BTCUSDT"])
+    exchange.visible -= 4
+    key = ("BTCUSDT", INTERVAL)
+
+    async def scenario():
+        await cs.update_candle_store_universe(["BTCUSDT"], [INTERVAL])
+        await wait_until(lambda: key in cs.candle_store_ready)
+        backfills = cs.candle_store_stats["backfills"]
+
+        exchange.visible += 4
+        current_open = exchange.klines["BTCUSDT"][-1][0]
+        await exchange.push_kline("BTCUSDT", current_open, 900.0)
+        await wait_until(lambda: cs.candle_store_stats["backfills"] > backfills and key in cs.candle_store_ready)
+
+        assert series_open_times(key) == [k[0] for k in exchange.klines["BTCUSDT"][-CAPACITY:]]
+        assert cs.get_store_frame("BTCUSDT", INTERVAL, 1)["open"].iloc[-1] == 900.0
+
+    run_with_exchange(store_config, exchange, scenario)
+
+
+def test_backfills_are_throttled_on_a_shared_session(store_config):
+    symbols = [f"C{i}USDT" for i in range(12)]
+    exchange = FakeExchange(symbols, rest_delay=0.05)
+    store_config.setitem(cs.CONFIG, "WS_BACKFILL_CONCURRENCY", 3)
+
+    async def scenario():
+        await cs.update_candle_store_universe(symbols, [INTERVAL])
+        await wait_until(lambda: len(cs.candle_store_ready) == len(symbols))
+        assert len(exchange.rest_limits) == len(symbols)
+        assert exchange.rest_max_in_flight <= 3
+        # Keep-alive bağlantılar yeniden kullanılır: eşzamanlılıktan fazla TCP bağlantısı açılmaz
+        assert len(exchange.rest_client_ports) <= 3
+
+    run_with_exchange(store_config, exchange, scenario)
+
+
+def test_backfill_weight_budget_paces_requests(store_config):
+    store_config.setitem(cs.CONFIG, "WS_BACKFILL_WEIGHT_PER_MINUTE", 60)  # saniyede 1 ağırlık, 10 birikim
+
+    async def scenario():
+        started = time.monotonic()
+        for _ in range(12):
+            await cs._acquire_backfill_weight(1)
+        assert time.monotonic() - started >= 1.5
+
+    asyncio.run(scenario())
+
+
+def test_backfill_succeeds_after_scan_deadline_expired(store_config):
+    exchange = FakeExchange(["BTCUSDT"])
+    key = ("BTCUSDT", INTERVAL)
+
+    async def scenario():
+        # Evren güncellemesi taramanın içinde yapılır; bütçe dolduktan sonra başlayan
+        # doldurma ve yeniden bağlanma işleri bütçeyi miras almamalı
+        cs.start_scan_budget(0.01)
+        await asyncio.sleep(0.05)
+        assert cs.remaining_scan_budget() < 0
+        await cs.update_candle_store_universe(["BTCUSDT"], [INTERVAL])
+        await wait_until(lambda: key in cs.candle_store_ready)
+
+        backfills = cs.candle_store_stats["backfills"]
+        await exchange.drop_connections()
+        await wait_until(lambda: cs.candle_store_stats["backfills"] > backfills and key in cs.candle_store_ready)
+        cs.clear_scan_budget()
+
+    run_with_exchange(store_config, exchange, scenario)
@@ -0,0 +1,71 @@
+"""Isınma lookback'i ile hesaplanan son mum sinyali 1000 mumla hesaplananla aynı olmalı"""
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import crypto_signal as cs
+
+TIMEFRAMES = list(cs.PINE_TIMEFRAME_PARAMS)
+FULL_BARS = 1000
+
+
+def synthetic_ohlcv(seed, n_bars):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.005, n_bars))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.005, n_bars))
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=n_bars, freq="15min"),
+        "open": open_, "high": high, "low": low, "close": close,
+        "volume": rng.uniform(100, 1000, n_bars),
+    })
+
+
+def crossover_fixtures(timeframe, seed, count=4):
+    """Son mumu MACD kesişiminde (veya hemen öncesinde) biten 1000 mumluk dilimler"""
+    long_df = synthetic_ohlcv(seed, FULL_BARS + 400)
+    computed = cs.calculate_full_pine_signals(long_df, timeframe)
+    spread = np.sign(computed["macd"].values - computed["macd_signal"].values)
+    crossings = [pos for pos in np.flatnonzero(spread[1:] != spread[:-1]) + 1 if pos >= FULL_BARS]
+    fixtures = []
+    for pos in crossings[:count]:
+        for end in (pos, pos + 1):
+            fixtures.append(long_df.iloc[end - FULL_BARS:end].reset_index(drop=True))
+    return fixtures
+
+
+def last_bar_signal(timeframe, frame, full_frame, monkeypatch):
+    """Üretimdeki yolu çalıştırır; yakınsamayan sinyal için tam geçmiş isteği full_frame ile yanıtlanır"""
+    async def fake_history(symbol, interval, lookback):
+        assert lookback == cs.CONFIG["MAX_KLINE_LOOKBACK"]
+        return full_frame
+
+    monkeypatch.setattr(cs, "async_get_historical_data", fake_history)
+    cs.signal_memo_cache.clear()
+    signals = asyncio.run(cs.compute_signals_from_frames("TESTUSDT", {timeframe: frame}, {timeframe: timeframe}, [timeframe]))
+    return signals[timeframe]
+
+
+@pytest.mark.parametrize("timeframe", TIMEFRAMES)
+def test_warmup_signal_matches_full_history(timeframe, monkeypatch):
+    lookback = cs.calculate_required_lookback(timeframe)
+    assert lookback < FULL_BARS
+
+    fixtures = [synthetic_ohlcv(seed, FULL_BARS) for seed in range(8)]
+    fixtures += crossover_fixtures(timeframe, seed=100)
+    assert len(fixtures) > 8
+
+    for full_frame in fixtures:
+        expected = last_bar_signal(timeframe, full_frame, full_frame, monkeypatch)
+        trimmed = full_frame.tail(lookback).reset_index(drop=True)
+        assert last_bar_signal(timeframe, trimmed, full_frame, monkeypatch) == expected
+
+
+def test_warmup_bars_follow_runtime_tolerance(monkeypatch):
+    default_bars = cs.calculate_warmup_bars("15m")
+    monkeypatch.setitem(cs.CONFIG, "WARMUP_TOLERANCE", 1e-2)
+    assert cs.calculate_warmup_bars("15m") < default_bars
+    assert cs.calculate_warmup_bars("15m", 1e-3) == default_bars